@@ -0,0 +1,115 @@
+# Live mirror of the board for phones: Server-Sent Events fed by the render task
+import json
+import uasyncio as asyncio
+
+from display_board import _row_cells
+
+RING = 4  # encoded updates kept for subscribers that are a little behind
+WRITE_TIMEOUT_S = 5  # a subscriber that cannot take a frame this fast is dropped
+HEARTBEAT_S = 30  # comment line on quiet streams, so dead clients are noticed
+
+
+class BoardBroadcaster:
+    """Encodes each board update once and fans the same bytes out to subscribers.
+
+    publish() is called by the render task with the rows it just drew; it
+    diffs them against the previous rows and encodes only the changed ones as
+    one SSE frame into a small shared ring. Subscribers keep a cursor into the
+    ring instead of a queue of their own, so a subscriber that falls more than
+    RING frames behind (or stalls a write for WRITE_TIMEOUT_S) is disconnected
+    rather than buffered.
+    """
+
+    def __init__(self, max_rows=20, max_subscribers=4):
+        self.max_rows = max_rows
+        self.max_subscribers = max_subscribers
+        self.rows = []  # cell tuples currently on the board
+        self.seq = 0
+        self._ring = [None] * RING
+        self._full = None  # (seq, frame) snapshot for new subscribers
+        self._waiters = []  # one Event per subscriber
+        # instrumentation
+        self.published = 0
+        self.bytes_encoded = 0
+        self.dropped = 0
+
+    def subscribers(self):
+        return len(self._waiters)
+
+    def _frame(self, event, rows, changed):
+        data = {"seq": self.seq, "n": len(rows), "rows": [[i] + list(rows[i]) for i in changed]}
+        frame = ("id: %d\nevent: %s\ndata: %s\n\n" % (self.seq, event, json.dumps(data))).encode()
+        self.bytes_encoded += len(frame)
+        return frame
+
+    def publish(self, timetable):
+        """Record the rows now on the board and wake subscribers if any changed."""
+        rows = [_row_cells(r) for r in timetable[:self.max_rows]]
+        old = self.rows
+        changed = [i for i in range(len(rows)) if i >= len(old) or rows[i] != old[i]]
+        if not changed and len(rows) == len(old):
+            return
+        self.rows = rows
+        self.seq += 1
+        self.published += 1
+        # no one listening: skip the encoding, new subscribers start from a snapshot
+        if self._waiters:
+            self._ring[self.seq % RING] = self._frame("rows", rows, changed)
+            for ev in self._waiters:
+                ev.set()
+
+    def snapshot(self):
+        """SSE frame with every row, shared by all subscribers joining at this seq."""
+        if self._full is None or self._full[0] != self.seq:
+            self._full = (self.seq, self._frame("full", self.rows, range(len(self.rows))))
+        return self._full[1]
+
+    def subscribe(self):
+        """Reserve a subscriber slot; return its handle, or None when at the cap."""
+        if len(self._waiters) >= self.max_subscribers:
+            return None
+        ev = asyncio.Event()
+        self._waiters.append(ev)
+        return ev
+
+    def unsubscribe(self, ev):
+        if ev in self._waiters:
+            self._waiters.remove(ev)
+
+    async def serve(self, writer, ev):
+        """Stream updates to one subscribed client until it disconnects, stalls or falls behind.
+
+        The caller has already sent the response headers. The slot is
+        released when this returns.
+        """
+        try:
+            cursor = self.seq
+            await asyncio.wait_for(writer.awrite(self.snapshot()), WRITE_TIMEOUT_S)
+            while True:
+                try:
+                    await asyncio.wait_for(ev.wait(), HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    await asyncio.wait_for(writer.awrite(b":\n\n"), WRITE_TIMEOUT_S)
+                    continue
+                ev.clear()
+                while cursor < self.seq:
+                    if self.seq - cursor > RING:
+                        # the frames it missed are gone; it reconnects for a fresh snapshot
+                        self.dropped += 1
+                        return
+                    cursor += 1
+                    await asyncio.wait_for(writer.awrite(self._ring[cursor % RING]), WRITE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+        except OSError:
+            pass
+        finally:
+            self.unsubscribe(ev)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._waiters),
+            "published": self.published,
+            "bytes_encoded": self.bytes_encoded,
+            "dropped": self.dropped,
+        }
@@ -4,3 +4,10 @@ WEB_ADMIN=False
 
 # Virtual time speed multiplier. 60.0 -> 1 real sec = 1 simulated minute
 TIME_FACTOR=60.0
+
+# Scroll over-long Über/Ziel text; frame budget of the marquee animation in ms
+MARQUEE=True
+MARQUEE_FRAME_MS=100
+
+# Live board mirror (/board, /events): phones watching at once
+SSE_MAX_SUBSCRIBERS=4
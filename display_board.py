@@ -1,25 +1,46 @@
-from util import fit_text
+from util import fit_text, invalidate_text_cache
 
 # Layout tuned for Pico Display 2 (320x240)
 # Each column: (header_label, width_px, reverse_colors)
 COLS = [("Zeit", 35, False), ("", 55, True), ("Über", 105, False), ("Ziel", 95, False), ("Gleis", 35, False)]  # widths sum to 320
+# COLS widths are designed for this screen width; on other screens the
+# FLEX_COLS absorb the difference so times and tracks never get squeezed
+DESIGN_W = 320
+FLEX_COLS = ("Über", "Ziel")
 HEADER_H = 22
 ROW_H = 18
 MARGIN_Y = 4
+FONT = "bitmap8"
 SCALE = 1  # bitmap8 @ scale 1
 GLYPH_H = 8 * SCALE  # bitmap8 glyph height in pixels
 HIGHLIGHT_MARGIN = 2
 
+# Screen geometries the layout compiler is used with: name -> (width, height)
+GEOMETRIES = {
+    "pico_display": (240, 135),
+    "pico_display_2": (320, 240),
+    "hub75_384x192": (384, 192),  # 3x3 chain of 128x64 panels
+}
+
+
+def set_font(font):
+    """Switch the board font; cached text fits depend on it, so they are dropped."""
+    global FONT
+    if font != FONT:
+        FONT = font
+        invalidate_text_cache()
+
 
 def safe_text(display, s, x, y, w, scale=1):
     if w <= 0 or x >= 320 or y >= 240:
         return
-    s = fit_text(display, s, min(w - 2, 320 - x - 1), scale)
+    s = fit_text(display, s, min(w - 2, 320 - x - 1), scale, FONT)
     display.text(s, x + 2, y + 2, scale=scale)
 
 
 def _truncate_to_width(text, px_w):
     # bitmap8 is ~6 px per glyph at scale=1 (tight); use ~6 to be safe
+    # (a len() and a slice is cheaper than a cache lookup, so this is not cached)
     max_chars = max(0, px_w // 6)
     t = str(text or "")
     if len(t) <= max_chars:
@@ -31,84 +52,291 @@ def _truncate_to_width(text, px_w):
     return t[:max_chars - len(ell)] + ell
 
 
-def render_board(display, timetable, fg_pen, bg_pen):
-    # background
-    display.set_pen(bg_pen)
-    display.clear()
+# Display-list opcodes; pens are resolved at draw time (0 = fg, 1 = bg)
+OP_PEN = 0
+OP_RECT = 1
+OP_TEXT = 2
+OP_LINE = 3
+_FG = 0
+_BG = 1
 
-    # header bar
-    display.set_pen(fg_pen)
-    display.set_font("bitmap8")
+
+class Layout:
+    """Fixed draw plan for one screen geometry, built once by compile_layout().
+
+    header_ops is the baked static header as a display list. cols holds one
+    (x, width, reverse, text_avail) slot per column; a frame only has to fill
+    the text of max_rows x len(cols) slots starting at rows_y.
+    """
+
+    def __init__(self, width, height, row_h, cols, header_ops, rows_y, max_rows, names=()):
+        self.width = width
+        self.height = height
+        self.row_h = row_h
+        self.cols = cols
+        self.header_ops = header_ops
+        self.rows_y = rows_y
+        self.max_rows = max_rows
+        self.names = names  # header label per column slot
+        self.text_dy = max(0, (row_h - GLYPH_H) // 2)
+
+
+def _highlight(txt, avail, tx, ty):
+    txt_px = min(avail, len(txt) * 6 * SCALE)
+    return (OP_RECT, tx - HIGHLIGHT_MARGIN, ty - HIGHLIGHT_MARGIN,
+            txt_px + 2 * HIGHLIGHT_MARGIN, GLYPH_H + 2 * HIGHLIGHT_MARGIN)
+
+
+def compile_layout(width=320, height=240, cols=None, header_h=HEADER_H, row_h=ROW_H):
+    """Compile column geometry, the header and row slots for a width x height screen."""
+    cols = COLS if cols is None else cols
+    extra = width - DESIGN_W
+    flex_w = sum(w for name, w, _rev in cols if name in FLEX_COLS)
+    slots = []
+    ops = []
     x = 0
     y = MARGIN_Y
-    for name, w, rev in COLS:
+    given = 0
+    n_flex = len([c for c in cols if c[0] in FLEX_COLS])
+    for name, w, rev in cols:
+        if name in FLEX_COLS and flex_w:
+            # share the width difference between flexible columns, last one takes the rounding
+            n_flex -= 1
+            share = extra - given if not n_flex else (extra * w) // flex_w
+            given += share
+            w = max(0, w + share)
+        slots.append((x, w, rev, w - 3))
+
         # base header background (ensure consistent color)
-        display.set_pen(bg_pen)
-        display.rectangle(x, y, w, HEADER_H)
+        ops.append((OP_PEN, _BG))
+        ops.append((OP_RECT, x, y, w, header_h))
         # header text
-        avail = w - (3 if name in ("Über", "Ziel") else 4)
+        avail = w - (3 if name in FLEX_COLS else 4)
         txt = _truncate_to_width(name, avail)
         tx = x + 2
         ty = y + 3
         # draw small highlight for reversed columns
         if rev and txt:
-            txt_px = min(avail, len(txt) * 6 * SCALE)
-            display.set_pen(fg_pen)
-            display.rectangle(tx - HIGHLIGHT_MARGIN, ty - HIGHLIGHT_MARGIN,
-                              txt_px + 2 * HIGHLIGHT_MARGIN, GLYPH_H + 2 * HIGHLIGHT_MARGIN)
-            display.set_pen(bg_pen)
+            ops.append((OP_PEN, _FG))
+            ops.append(_highlight(txt, avail, tx, ty))
+            ops.append((OP_PEN, _BG))
         else:
-            display.set_pen(fg_pen)
-        display.text(txt, tx, ty, scale=SCALE)
-        # column separator line under header (simple rule)
-        # draw a 1px horizontal line
-        display.set_pen(fg_pen)
-        display.line(0, y + HEADER_H, 319, y + HEADER_H)
+            ops.append((OP_PEN, _FG))
+        ops.append((OP_TEXT, txt, tx, ty))
         x += w
+    # separator line under header (simple rule); later header cells never cover it, so draw it once
+    ops.append((OP_PEN, _FG))
+    ops.append((OP_LINE, 0, y + header_h, width - 1, y + header_h))
 
-    # rows
-    y = MARGIN_Y + HEADER_H + 2
-
+    rows_y = MARGIN_Y + header_h + 2
     # how many rows fit?
-    max_rows = max(0, (240 - y - 2) // ROW_H)
-    rows = timetable[:max_rows]
-
-    for row in rows:
-        x = 0
-        cells = [
-            row.get("time", ""),
-            row.get("train", ""),
-            row.get("via", ""),
-            row.get("dest", ""),
-            row.get("track", ""),
-        ]
-        # vertically center text within the row cell (leave header unchanged)
-        row_text_y = y + max(0, (ROW_H - GLYPH_H) // 2)
+    max_rows = max(0, (height - rows_y - 2) // row_h)
+    return Layout(width, height, row_h, slots, _drop_redundant_pens(ops), rows_y, max_rows,
+                  [name for name, _w, _rev in cols])
+
+
+def _drop_redundant_pens(ops):
+    out = []
+    pen = None
+    for op in ops:
+        if op[0] == OP_PEN:
+            if op[1] == pen:
+                continue
+            pen = op[1]
+        out.append(op)
+    return out
+
+
+def _run_ops(display, ops, fg_pen, bg_pen):
+    for op in ops:
+        code = op[0]
+        if code == OP_PEN:
+            display.set_pen(fg_pen if op[1] == _FG else bg_pen)
+        elif code == OP_RECT:
+            display.rectangle(op[1], op[2], op[3], op[4])
+        elif code == OP_TEXT:
+            display.text(op[1], op[2], op[3], scale=SCALE)
+        else:
+            display.line(op[1], op[2], op[3], op[4])
+
+
+def _draw_header(display, layout, fg_pen, bg_pen):
+    display.set_font(FONT)
+    _run_ops(display, layout.header_ops, fg_pen, bg_pen)
+
+
+def _draw_cell(display, layout, c, y, cell, fg_pen, bg_pen):
+    x, w, rev, avail = layout.cols[c]
+    # base cell background
+    display.set_pen(bg_pen)
+    display.rectangle(x, y, w, layout.row_h)
+    # text and optional highlight, vertically centered within the row cell
+    txt = _truncate_to_width(cell, avail)
+    tx = x + 2
+    ty = y + layout.text_dy
+    if rev and txt:
+        op = _highlight(txt, avail, tx, ty)
+        display.set_pen(fg_pen)
+        display.rectangle(op[1], op[2], op[3], op[4])
+        display.set_pen(bg_pen)
+    else:
+        display.set_pen(fg_pen)
+    display.text(txt, tx, ty, scale=SCALE)
+
+
+def text_width(text):
+    # same ~6 px per bitmap8 glyph estimate _truncate_to_width uses
+    return len(text) * 6 * SCALE
+
+
+def draw_scrolled_cell(display, layout, c, y, text, offset, fg_pen, bg_pen):
+    """Repaint one cell with `text` shifted left by `offset` px, clipped to the cell.
+
+    Leaves the cell's underline row alone, so only the text area is touched.
+    """
+    x, w, _rev, _avail = layout.cols[c]
+    h = layout.row_h - 1
+    display.set_clip(x, y, w, h)
+    display.set_pen(bg_pen)
+    display.rectangle(x, y, w, h)
+    display.set_pen(fg_pen)
+    display.text(text, x + 2 - offset, y + layout.text_dy, scale=SCALE)
+    display.remove_clip()
+
+
+def _row_cells(row):
+    return (
+        row.get("time", ""),
+        row.get("train", ""),
+        row.get("via", ""),
+        row.get("dest", ""),
+        row.get("track", ""),
+    )
+
+
+def _take(timetable, n):
+    # timetable may be a list or a lazy iterator (tt.iter_departures); pull only what fits
+    rows = []
+    if n > 0:
+        for row in timetable:
+            rows.append(row)
+            if len(rows) >= n:
+                break
+    return rows
+
+
+# Plan for the Pico Display 2 the board ships with
+LAYOUT = compile_layout(*GEOMETRIES["pico_display_2"])
+
+
+def render_board(display, timetable, fg_pen, bg_pen, layout=None):
+    layout = LAYOUT if layout is None else layout
+    # background
+    display.set_pen(bg_pen)
+    display.clear()
+
+    # header bar (baked into the layout)
+    _draw_header(display, layout, fg_pen, bg_pen)
+
+    # rows
+    y = layout.rows_y
+    n_cols = len(layout.cols)
+    for row in _take(timetable, layout.max_rows):
+        cells = _row_cells(row)
         # draw each cell
-        for ((name, w, rev), cell) in zip(COLS, cells):
-            # base cell background
-            display.set_pen(bg_pen)
-            display.rectangle(x, y, w, ROW_H)
-            # text and optional highlight
-            avail = w - 3
-            txt = _truncate_to_width(cell, avail)
-            tx = x + 2
-            ty = row_text_y
-            if rev and txt:
-                txt_px = min(avail, len(txt) * 6 * SCALE)
-                display.set_pen(fg_pen)
-                display.rectangle(tx - HIGHLIGHT_MARGIN, ty - HIGHLIGHT_MARGIN,
-                                  txt_px + 2 * HIGHLIGHT_MARGIN, GLYPH_H + 2 * HIGHLIGHT_MARGIN)
-                display.set_pen(bg_pen)
-            else:
-                display.set_pen(fg_pen)
-            display.text(txt, tx, ty, scale=SCALE)
-            x += w
+        for c in range(n_cols):
+            _draw_cell(display, layout, c, y, cells[c], fg_pen, bg_pen)
         # row underline
         display.set_pen(fg_pen)
-        display.line(0, y + ROW_H - 1, 319, y + ROW_H - 1)
-        y += ROW_H
+        display.line(0, y + layout.row_h - 1, layout.width - 1, y + layout.row_h - 1)
+        y += layout.row_h
 
     display.update()
 
 
+class BoardRenderer:
+    """Retained-mode board renderer that repaints only cells whose text changed.
+
+    Remembers the last text drawn in every (row, column) cell. The first
+    render (and any after invalidate()) is a full redraw; later renders touch
+    only changed cells and, where the display supports partial_update(), push
+    only the dirty rectangle.
+    """
+
+    def __init__(self, display, fg_pen, bg_pen, layout=None):
+        self.display = display
+        self.fg_pen = fg_pen
+        self.bg_pen = bg_pen
+        self.layout = LAYOUT if layout is None else layout
+        self.last_redrawn = 0  # cells repainted by the last render()
+        self.frames = 0
+        self.cells_redrawn = 0
+        self._cells = None  # list of rows, each a list of cell strings (None = blank row)
+
+    def invalidate(self):
+        """Forget what is on screen; the next render() is a full redraw."""
+        self._cells = None
+
+    def cells(self):
+        """Cell text currently on screen: one list per row, None for blank rows."""
+        return self._cells or ()
+
+    def render(self, timetable):
+        """Draw `timetable` and return the number of cells repainted."""
+        display = self.display
+        fg_pen = self.fg_pen
+        bg_pen = self.bg_pen
+        layout = self.layout
+        max_rows = layout.max_rows
+        row_h = layout.row_h
+        screen_w = layout.width
+        rows = _take(timetable, max_rows)
+        full = self._cells is None
+        if full:
+            display.set_pen(bg_pen)
+            display.clear()
+            _draw_header(display, layout, fg_pen, bg_pen)
+            self._cells = [None] * max_rows
+
+        redrawn = 0
+        # dirty bounding box (x0, y0, x1, y1), exclusive end
+        x0 = y0 = 1 << 16
+        x1 = y1 = 0
+        y = layout.rows_y
+        for r in range(max_rows):
+            old = self._cells[r]
+            if r < len(rows):
+                new = [str(c) for c in _row_cells(rows[r])]
+            elif old is None:
+                y += row_h
+                continue
+            else:
+                new = None
+            for c in range(len(layout.cols)):
+                if full or old is None or new is None or old[c] != new[c]:
+                    x, w = layout.cols[c][0], layout.cols[c][1]
+                    _draw_cell(display, layout, c, y, new[c] if new else "", fg_pen, bg_pen)
+                    if new is not None:
+                        # row underline segment lives inside the cell rectangle
+                        display.set_pen(fg_pen)
+                        display.line(x, y + row_h - 1, min(x + w, screen_w) - 1, y + row_h - 1)
+                    redrawn += 1
+                    x0 = min(x0, x)
+                    y0 = min(y0, y)
+                    x1 = max(x1, min(x + w, screen_w))
+                    y1 = max(y1, y + row_h)
+            self._cells[r] = new
+            y += row_h
+
+        if full:
+            display.update()
+        elif redrawn:
+            if hasattr(display, "partial_update"):
+                display.partial_update(x0, y0, x1 - x0, y1 - y0)
+            else:
+                display.update()
+
+        self.last_redrawn = redrawn
+        self.frames += 1
+        self.cells_redrawn += redrawn
+        return redrawn
@@ -1,14 +1,18 @@
 from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY_2
 import uasyncio as asyncio
 import network
-import time
 from settings import SSID, PASS
-from config import WEB_ADMIN, TIME_FACTOR
+from config import WEB_ADMIN, TIME_FACTOR, MARQUEE, MARQUEE_FRAME_MS, SSE_MAX_SUBSCRIBERS
 from wifi import connect
 from mdns_announce import announce_http
-from display_board import render_board
+from display_board import BoardRenderer, compile_layout
+from marquee import Marquee
 import timetable as tt
-from web_ui import create_handler
+import route_store
+from vclock import VirtualClock
+from render_queue import RenderQueue
+from board_events import BoardBroadcaster
+from web_ui import create_handler, LISTEN_BACKLOG
 
 # ---------- Display (unchanged) ----------
 display = PicoGraphics(display=DISPLAY_PICO_DISPLAY_2)
@@ -36,15 +40,36 @@ async def main():
     display.update()
 
     # virtual clock starting at midnight
-    start_ms = time.ticks_ms()
+    clock = VirtualClock(TIME_FACTOR)
 
-    def current_minutes():
-        elapsed_ms = time.ticks_diff(time.ticks_ms(), start_ms)
-        sim_minutes = int((elapsed_ms / 1000.0) * (TIME_FACTOR / 60.0))
-        return sim_minutes % (24 * 60)
+    # routes saved through the web UI survive power cycles; defaults otherwise
+    saved = route_store.load_routes()
+    if saved is not None:
+        tt.set_routes(saved)
+    print("Routes:", "flash" if saved is not None else "defaults")
 
-    # initial render
-    render_board(display, tt.generate_timetable(tt.ROUTES, current_minutes(), 20), fg, bg)
+    # departure index is compiled by set_routes(); report its budget
+    print("Departure index:", tt.index_report())
+
+    # the render task owns the display; the window slides along with the virtual clock
+    window = tt.TimetableWindow(20)
+    board = BoardRenderer(display, fg, bg, compile_layout(*display.get_bounds()))
+    # phones mirror the rows the render task draws, via /events
+    events = BoardBroadcaster(board.layout.max_rows, SSE_MAX_SUBSCRIBERS) if WEB_ADMIN else None
+    renderer = RenderQueue(board, window, clock, events.publish if events else None)
+    renderer.request()  # initial render
+    asyncio.create_task(renderer.run())
+
+    # scroll long via/destination text on its own frame budget; the render task draws the frames
+    if MARQUEE:
+        marquee = Marquee(board, frame_ms=MARQUEE_FRAME_MS, queue=renderer)
+        asyncio.create_task(marquee.run())
+
+    # ask for a frame at each virtual-minute boundary
+    async def updater():
+        while True:
+            await clock.wait()
+            renderer.request()
 
     if WEB_ADMIN:
         # Bonjour announce (no bind)
@@ -52,32 +77,14 @@ async def main():
         asyncio.create_task(announce_http("Trainboard", f"{MY_NAME}.local", ip_bytes, port=80))
 
         # HTTP server
-        handle = create_handler(display, fg, bg)
-        server = await asyncio.start_server(handle, "0.0.0.0", 80, backlog=2)
+        handle = create_handler(display, fg, bg, renderer, events=events)
+        server = await asyncio.start_server(handle, "0.0.0.0", 80, backlog=LISTEN_BACKLOG)
         print("Serving on", MY_IP, "as", f"{MY_NAME}.local")
-        # periodic update of board based on virtual time
-        async def updater():
-            last_min = -1
-            while True:
-                now_min = current_minutes()
-                if now_min != last_min:
-                    last_min = now_min
-                    render_board(display, tt.generate_timetable(tt.ROUTES, now_min, 20), fg, bg)
-                await asyncio.sleep_ms(200)
 
         asyncio.create_task(updater())
         await asyncio.Event().wait()
     else:
-        # No web admin: just idle
-        # periodic update even without web UI
-        async def updater():
-            last_min = -1
-            while True:
-                now_min = current_minutes()
-                if now_min != last_min:
-                    last_min = now_min
-                    render_board(display, tt.generate_timetable(tt.ROUTES, now_min, 20), fg, bg)
-                await asyncio.sleep_ms(200)
+        # No web admin: update even without web UI
         await updater()
 
 
@@ -0,0 +1,126 @@
+# Marquee scrolling for over-long Über/Ziel cells on the board
+import time
+import uasyncio as asyncio
+
+from display_board import FLEX_COLS, draw_scrolled_cell, text_width
+
+
+class Marquee:
+    """Scrolls cells whose text does not fit, repainting only those cells.
+
+    Runs as a uasyncio task on a fixed frame budget. When the loop is busy
+    (minute render, HTTP request) and a frame slot has passed, the frame is
+    dropped instead of queued: the scroll position still advances, so speed
+    stays constant, and the task always idles min_idle_ms between frames so
+    it never starves the updater or the web handler.
+
+    With a RenderQueue the task only keeps time: frames are handed to the
+    queue, whose task draws them, so the marquee never paints between the
+    rows of a full render. Without one it draws from its own task.
+    """
+
+    def __init__(self, board, frame_ms=100, step_px=2, gap="   ", columns=FLEX_COLS, min_idle_ms=10,
+                 queue=None):
+        self.board = board
+        self.queue = queue
+        self.frame_ms = frame_ms
+        self.step_px = step_px
+        self.gap = gap
+        self.columns = columns
+        self.min_idle_ms = min_idle_ms
+        self.running = False
+        # counters
+        self.frames = 0
+        self.dropped = 0
+        self.cells_drawn = 0
+        self.last_frame_us = 0
+        self.max_frame_us = 0
+        self._offsets = {}  # (row, col) -> (text, offset px)
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "cells_drawn": self.cells_drawn,
+            "last_frame_us": self.last_frame_us,
+            "max_frame_us": self.max_frame_us,
+        }
+
+    def step(self, advance=1):
+        """Move every overflowing cell on by `advance` frames and repaint just those cells.
+
+        Returns the number of cells repainted.
+        """
+        board = self.board
+        display = board.display
+        layout = board.layout
+        cols = [c for c in range(len(layout.cols)) if layout.names[c] in self.columns]
+        offsets = {}
+        drawn = 0
+        x0 = y0 = 1 << 16
+        x1 = y1 = 0
+        y = layout.rows_y
+        for r, row in enumerate(board.cells()):
+            if row is not None:
+                for c in cols:
+                    text = row[c]
+                    if text_width(text) <= layout.cols[c][3]:
+                        continue
+                    prev = self._offsets.get((r, c))
+                    period = text_width(text + self.gap)
+                    if prev is None or prev[0] != text:
+                        offset = 0
+                    else:
+                        offset = (prev[1] + self.step_px * advance) % period
+                    offsets[(r, c)] = (text, offset)
+                    # text twice so the loop point scrolls in seamlessly
+                    draw_scrolled_cell(display, layout, c, y, text + self.gap + text, offset,
+                                       board.fg_pen, board.bg_pen)
+                    drawn += 1
+                    x, w = layout.cols[c][0], layout.cols[c][1]
+                    x0 = min(x0, x)
+                    y0 = min(y0, y)
+                    x1 = max(x1, min(x + w, layout.width))
+                    y1 = max(y1, y + layout.row_h - 1)
+            y += layout.row_h
+        self._offsets = offsets
+
+        if drawn:
+            if hasattr(display, "partial_update"):
+                display.partial_update(x0, y0, x1 - x0, y1 - y0)
+            else:
+                display.update()
+        self.cells_drawn += drawn
+        return drawn
+
+    def frame(self, advance=1):
+        """Draw one timed frame `advance` frames on; the RenderQueue task calls this."""
+        t0 = time.ticks_us()
+        self.step(advance)
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        self.frames += 1
+        self.last_frame_us = dt
+        if dt > self.max_frame_us:
+            self.max_frame_us = dt
+
+    async def run(self):
+        self.running = True
+        frame_ms = self.frame_ms
+        next_t = time.ticks_add(time.ticks_ms(), frame_ms)
+        while self.running:
+            late = time.ticks_diff(time.ticks_ms(), next_t)
+            if late < 0:
+                await asyncio.sleep_ms(-late)
+                continue
+            # slots that already passed are dropped, not replayed
+            missed = late // frame_ms
+            self.dropped += missed
+            if self.queue is not None:
+                self.queue.scroll(self, missed + 1)
+            else:
+                self.frame(missed + 1)
+            next_t = time.ticks_add(next_t, (missed + 1) * frame_ms)
+            await asyncio.sleep_ms(self.min_idle_ms)
+
+    def stop(self):
+        self.running = False
@@ -1,71 +1,385 @@
-# Announce-only Bonjour for _http._tcp (no bind -> no EADDRINUSE)
-import socket, uasyncio as asyncio
+# Bonjour for _http._tcp: answers mDNS queries, announces on the RFC 6762 schedule
+import socket, time, uasyncio as asyncio
 
 _MDNS_GRP = "224.0.0.251"
 _MDNS_PORT = 5353
 
-def _lab(s): return bytes([len(s)]) + s.encode()
-def _q(name): return b"".join(_lab(p) for p in name.split(".")) + b"\x00"
+TYPE_A = 1
+TYPE_PTR = 12
+TYPE_TXT = 16
+TYPE_SRV = 33
+TYPE_ANY = 255
+CLASS_IN = 1
+CACHE_FLUSH = 0x8000  # rrclass bit on records only we own
+QU = 0x8000  # qclass bit: querier asks for a unicast reply
 
-def _fqdn(s):
-    s = s if s.endswith(".") else s + "."
-    return s
+HOST_TTL = 120  # SRV and A, per RFC 6762 section 10
+OTHER_TTL = 4500  # PTR and TXT
+LEGACY_TTL = 10  # cap for one-shot resolvers not on port 5353
+ANNOUNCE_GAPS_S = (1, 2)  # three announcements, gaps doubling (RFC 6762 section 8.3)
+FALLBACK_INTERVAL_S = 60  # re-announce period when we cannot listen for queries
+RATE_LIMIT_MS = 1000  # a record is multicast at most once per second
+MAX_PACKET = 1500
 
-def build_http_announcement(instance, host_local, ip_bytes, port=80, ttl=120, txt_kv=None):
-    """
-    Returns one mDNS response containing:
-      PTR: _http._tcp.local -> <instance>._http._tcp.local
-      SRV: <instance>._http._tcp.local -> host_local:port
-      TXT: (optional key=val list)
-      A  : host_local -> ip_bytes
+# record slots; bit i of a mask stands for record i
+PTR, SRV, TXT, A, ENUM = 0, 1, 2, 3, 4
+_ALL = (1 << PTR) | (1 << SRV) | (1 << TXT) | (1 << A)
+
+def _labels(name):
+    return tuple(p.encode() for p in name.rstrip(".").split("."))
+
+def _key(labels):
+    return tuple(l.lower() for l in labels)
+
+def _read_name(buf, off):
+    """Decode a possibly compressed name at off; return (lowercased labels, offset after it)."""
+    labels = []
+    end = None
+    hops = 0
+    while True:
+        n = buf[off]
+        if n & 0xC0 == 0xC0:
+            if end is None:
+                end = off + 2
+            hops += 1
+            if hops > 16:
+                raise ValueError("pointer loop")
+            off = ((n & 0x3F) << 8) | buf[off + 1]
+            continue
+        if n & 0xC0:
+            raise ValueError("bad label")
+        off += 1
+        if n == 0:
+            return tuple(labels), off if end is None else end
+        labels.append(bytes(buf[off:off + n]).lower())
+        off += n
+
+
+class _Writer:
+    """DNS message builder that compresses every repeated name suffix."""
+
+    def __init__(self, header):
+        self.buf = bytearray(header)
+        self._names = {}  # lowercased label suffix -> offset
+
+    def name(self, labels):
+        for i in range(len(labels)):
+            key = _key(labels[i:])
+            off = self._names.get(key)
+            if off is not None:
+                self.buf += (0xC000 | off).to_bytes(2, "big")
+                return
+            if len(self.buf) < 0x3FFF:
+                self._names[key] = len(self.buf)
+            self.buf.append(len(labels[i]))
+            self.buf += labels[i]
+        self.buf.append(0)
+
+    def record(self, labels, rtype, rclass, ttl, rdata_names, rdata_prefix=b"", rdata=b""):
+        self.name(labels)
+        self.buf += rtype.to_bytes(2, "big") + rclass.to_bytes(2, "big") + ttl.to_bytes(4, "big")
+        at = len(self.buf)
+        self.buf += b"\x00\x00" + rdata_prefix
+        if rdata_names is not None:
+            self.name(rdata_names)
+        self.buf += rdata
+        self.buf[at:at + 2] = (len(self.buf) - at - 2).to_bytes(2, "big")
+
+
+class MdnsResponder:
+    """Answers mDNS queries for one _http._tcp service and its host name.
+
+    handle() turns one received datagram into the replies to send, so the
+    protocol logic needs no sockets; serve() is the uasyncio loop around it
+    on the board. Replies honour known-answer suppression (records the
+    querier already holds with at least half their TTL left are left out),
+    the QU bit (unicast when the records were multicast within a quarter of
+    their TTL) and legacy one-shot resolvers (unicast, query id echoed, TTL
+    capped). Multicast replies are limited to one per record per second.
+    Reply packets are name-compressed once per record combination and
+    cached, so answering a repeat query is a dict lookup.
     """
-    svc = "_http._tcp.local"
-    inst = f"{instance}._http._tcp.local"
-    host = _fqdn(host_local)
-
-    # DNS header: QR=1, AA=1, 0 questions, 4 answers
-    hdr = b"\x00\x00" + b"\x84\x00" + b"\x00\x00\x00\x04\x00\x00\x00\x00"
-
-    # PTR (_http._tcp.local -> <instance>._http._tcp.local)
-    ans = (
-        _q(svc) + b"\x00\x0c\x00\x01" + ttl.to_bytes(4,"big") +
-        len(_q(inst)).to_bytes(2,"big") + _q(inst)
-    )
-
-    # SRV (<instance> -> host:port), class IN|cache-flush (0x8001)
-    srv_rdata = b"\x00\x00\x00\x00" + port.to_bytes(2,"big") + _q(host)
-    ans += (
-        _q(inst) + b"\x00\x21\x80\x01" + ttl.to_bytes(4,"big") +
-        len(srv_rdata).to_bytes(2,"big") + srv_rdata
-    )
-
-    # TXT (optional), class IN|cache-flush
-    txt = b""
-    if txt_kv:
-        for k, v in txt_kv.items():
+
+    def __init__(self, instance, host_local, ip_bytes, port=80, txt_kv=None,
+                 group=(_MDNS_GRP, _MDNS_PORT), mdns_port=_MDNS_PORT):
+        self.group = group
+        self.mdns_port = mdns_port
+        svc = _labels("_http._tcp.local")
+        inst = _labels(instance) + svc
+        host = _labels(host_local)
+        enum = _labels("_services._dns-sd._udp.local")
+        txt = b""
+        for k, v in (txt_kv or {}).items():
             kv = f"{k}={v}".encode()
             txt += bytes([len(kv)]) + kv
-    ans += _q(inst) + b"\x00\x10\x80\x01" + ttl.to_bytes(4,"big") + len(txt).to_bytes(2,"big") + txt
+        txt = txt or b"\x00"  # an empty TXT record still holds one empty string
+        srv_prefix = b"\x00\x00\x00\x00" + port.to_bytes(2, "big")
+        ip = bytes(ip_bytes)
+        # (owner, type, class, ttl, name in rdata, rdata before it, rdata after it)
+        self._records = (
+            (svc, TYPE_PTR, CLASS_IN, OTHER_TTL, inst, b"", b""),
+            (inst, TYPE_SRV, CLASS_IN | CACHE_FLUSH, HOST_TTL, host, srv_prefix, b""),
+            (inst, TYPE_TXT, CLASS_IN | CACHE_FLUSH, OTHER_TTL, None, b"", txt),
+            (host, TYPE_A, CLASS_IN | CACHE_FLUSH, HOST_TTL, None, b"", ip),
+            (enum, TYPE_PTR, CLASS_IN, OTHER_TTL, svc, b"", b""),
+        )
+        # what a known answer must match to stand in for each record
+        self._known_keys = (
+            (_key(svc), TYPE_PTR, _key(inst)),
+            (_key(inst), TYPE_SRV, (srv_prefix, _key(host))),
+            (_key(inst), TYPE_TXT, txt),
+            (_key(host), TYPE_A, ip),
+            (_key(enum), TYPE_PTR, _key(svc)),
+        )
+        # (name, qtype) -> (answer mask, additional mask); ANY is matched per name
+        self._answers = {}
+        for name, qtype, ans, add in (
+            (svc, TYPE_PTR, 1 << PTR, (1 << SRV) | (1 << TXT) | (1 << A)),
+            (inst, TYPE_SRV, 1 << SRV, 1 << A),
+            (inst, TYPE_TXT, 1 << TXT, 0),
+            (host, TYPE_A, 1 << A, 0),
+            (enum, TYPE_PTR, 1 << ENUM, 0),
+        ):
+            k = _key(name)
+            self._answers[(k, qtype)] = (ans, add)
+            a0, d0 = self._answers.get((k, TYPE_ANY), (0, 0))
+            self._answers[(k, TYPE_ANY)] = (a0 | ans, (d0 | add) & ~(a0 | ans))
+        self._packets = {}  # (answer mask, additional mask) -> reply bytes
+        self._sent_ms = [None] * len(self._records)  # last multicast of each record
+        # instrumentation
+        self.queries = 0
+        self.answered = 0
+        self.suppressed = 0
+        self.unicast = 0
+        self.rate_limited = 0
+        self.ignored = 0
+        self.sent = 0
+        self.sent_bytes = 0
+
+    def packet(self, answers, additional=0):
+        """Reply carrying the records in the two masks; built once, then cached."""
+        key = (answers, additional)
+        pkt = self._packets.get(key)
+        if pkt is None:
+            pkt = self._build(answers, additional)
+            self._packets[key] = pkt
+        return pkt
+
+    def announcement(self):
+        return self.packet(_ALL)
+
+    def _build(self, answers, additional, qid=0, questions=(), ttl_cap=None):
+        counts = [0, 0]
+        for i in range(len(self._records)):
+            counts[0] += (answers >> i) & 1
+            counts[1] += (additional >> i) & 1
+        w = _Writer(qid.to_bytes(2, "big") + b"\x84\x00" + len(questions).to_bytes(2, "big")
+                    + counts[0].to_bytes(2, "big") + b"\x00\x00" + counts[1].to_bytes(2, "big"))
+        for labels, qtype in questions:
+            w.name(labels)
+            w.buf += qtype.to_bytes(2, "big") + CLASS_IN.to_bytes(2, "big")
+        for mask in (answers, additional):
+            for i, (owner, rtype, rclass, ttl, rnames, prefix, rdata) in enumerate(self._records):
+                if mask & (1 << i):
+                    if ttl_cap is not None:
+                        # legacy resolvers get plain IN, never the cache-flush bit
+                        rclass, ttl = CLASS_IN, min(ttl, ttl_cap)
+                    w.record(owner, rtype, rclass, ttl, rnames, prefix, rdata)
+        return bytes(w.buf)
+
+    def _parse(self, data):
+        """Return (id, [(labels, qtype, unicast)], known-answer mask), or None if not a query."""
+        if len(data) < 12 or data[2] & 0xF8:  # a response, or not a standard query
+            return None
+        qd = (data[4] << 8) | data[5]
+        an = (data[6] << 8) | data[7]
+        off = 12
+        questions = []
+        for _ in range(qd):
+            labels, off = _read_name(data, off)
+            qtype = (data[off] << 8) | data[off + 1]
+            qclass = (data[off + 2] << 8) | data[off + 3]
+            off += 4
+            questions.append((labels, qtype, bool(qclass & QU)))
+        known = 0
+        for _ in range(an):
+            labels, off = _read_name(data, off)
+            rtype = (data[off] << 8) | data[off + 1]
+            ttl = int.from_bytes(data[off + 4:off + 8], "big")
+            rdlen = (data[off + 8] << 8) | data[off + 9]
+            off += 10
+            end = off + rdlen
+            if end > len(data):
+                raise ValueError("truncated record")
+            if rtype == TYPE_PTR:
+                value = _read_name(data, off)[0]
+            elif rtype == TYPE_SRV:
+                value = (bytes(data[off:off + 6]), _read_name(data, off + 6)[0])
+            else:
+                value = bytes(data[off:end])
+            for i, (kname, ktype, kvalue) in enumerate(self._known_keys):
+                if (labels, rtype, value) == (kname, ktype, kvalue) and ttl * 2 >= self._records[i][3]:
+                    known |= 1 << i
+            off = end
+        return (data[0] << 8) | data[1], questions, known
 
-    # A (host_local -> ip), class IN|cache-flush
-    a = _q(host) + b"\x00\x01\x80\x01" + ttl.to_bytes(4,"big") + b"\x00\x04" + bytes(ip_bytes)
+    def handle(self, data, addr, now=None):
+        """Return the (packet, destination) replies for one received datagram."""
+        try:
+            query = self._parse(data)
+        except (IndexError, ValueError):
+            query = None
+        if query is None:
+            self.ignored += 1
+            return []
+        self.queries += 1
+        qid, questions, known = query
+        answers = additional = 0
+        asked = []
+        for labels, qtype, _unicast in questions:
+            ans, add = self._answers.get((labels, qtype), (0, 0))
+            if ans:
+                answers |= ans
+                additional |= add
+                asked.append((self._records[_low_bit(ans)][0], qtype))
+        if not answers:
+            return []
+        if answers & known:
+            self.suppressed += 1
+        answers &= ~known
+        additional &= ~(answers | known)
+        if not answers:
+            return []
+        self.answered += 1
 
-    return hdr + ans + a
+        if addr[1] != self.mdns_port:
+            # legacy unicast resolver (RFC 6762 section 6.7): one-off reply, not cached
+            self.unicast += 1
+            return [(self._build(answers, additional, qid, asked, LEGACY_TTL), addr)]
 
-async def announce_http(instance, hostname_local, ip_bytes, port=80, interval=60, burst=3, burst_gap=1):
+        now = time.ticks_ms() if now is None else now
+        if all(q[2] for q in questions) and self._recent(answers, now, True) == answers:
+            # QU and every record was multicast within a quarter of its TTL
+            self.unicast += 1
+            return [(self.packet(answers, additional), addr)]
+        limited = self._recent(answers | additional, now)
+        if answers & ~limited == 0:
+            self.rate_limited += 1
+            return []
+        answers &= ~limited
+        additional &= ~limited
+        self._mark(answers | additional, now)
+        return [(self.packet(answers, additional), self.group)]
+
+    def _recent(self, mask, now, quarter_ttl=False):
+        """Records in mask multicast within RATE_LIMIT_MS (or a quarter of their TTL)."""
+        recent = 0
+        for i, sent in enumerate(self._sent_ms):
+            if mask & (1 << i) and sent is not None:
+                window = self._records[i][3] * 250 if quarter_ttl else RATE_LIMIT_MS
+                if time.ticks_diff(now, sent) < window:
+                    recent |= 1 << i
+        return recent
+
+    def _mark(self, mask, now):
+        for i in range(len(self._sent_ms)):
+            if mask & (1 << i):
+                self._sent_ms[i] = now
+
+    def send(self, sock, pkt, dest):
+        try:
+            sock.sendto(pkt, dest)
+        except OSError:
+            return  # Wi-Fi dropped; the next announcement or query retries
+        self.sent += 1
+        self.sent_bytes += len(pkt)
+
+    def receive(self, sock, now=None):
+        """Answer the datagram waiting on sock."""
+        try:
+            data, addr = sock.recvfrom(MAX_PACKET)
+        except OSError:
+            return
+        for pkt, dest in self.handle(data, addr, now):
+            self.send(sock, pkt, dest)
+
+    async def serve(self, sock):
+        while True:
+            await _readable(sock)
+            self.receive(sock)
+
+    async def announce(self, sock, forever=False):
+        """Multicast everything on the startup schedule; with forever, keep going.
+
+        forever is for when no queries can reach us: the gap keeps doubling
+        up to FALLBACK_INTERVAL_S so caches are refreshed before records expire.
+        """
+        gap = 0
+        gaps = list(ANNOUNCE_GAPS_S)
+        while True:
+            self.send(sock, self.announcement(), self.group)
+            self._mark(_ALL, time.ticks_ms())
+            if gaps:
+                gap = gaps.pop(0)
+            elif forever:
+                gap = min(gap * 2, FALLBACK_INTERVAL_S)
+            else:
+                return
+            await asyncio.sleep(gap)
+
+    def open_socket(self):
+        """Bound, group-joined socket and True; or an unbound one and False.
+
+        The firmware's own mDNS may already hold port 5353, in which case
+        we can only announce.
+        """
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind(("0.0.0.0", self.mdns_port))
+            mreq = bytes(int(p) for p in self.group[0].split(".")) + self._records[A][6]
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        except (OSError, AttributeError):
+            s.close()
+            return socket.socket(socket.AF_INET, socket.SOCK_DGRAM), False
+        s.setblocking(False)
+        return s, True
+
+    def stats(self):
+        return {
+            "queries": self.queries,
+            "answered": self.answered,
+            "suppressed": self.suppressed,
+            "unicast": self.unicast,
+            "rate_limited": self.rate_limited,
+            "ignored": self.ignored,
+            "sent": self.sent,
+            "sent_bytes": self.sent_bytes,
+            "cached_packets": len(self._packets),
+        }
+
+
+def _low_bit(mask):
+    i = 0
+    while not mask & (1 << i):
+        i += 1
+    return i
+
+
+async def _readable(sock):
+    # park until a datagram arrives, as uasyncio's own streams wait on sockets
+    yield asyncio.core._io_queue.queue_read(sock)
+
+
+async def announce_http(instance, hostname_local, ip_bytes, port=80):
     """
-    Periodically multicast the service announcement. Sends a small burst on startup
-    for fast discovery, then every `interval` seconds.
+    Answer queries for the service from port 5353, after the startup
+    announcements. If the port is taken, announce only, backing off to
+    every FALLBACK_INTERVAL_S.
     """
-    pkt = build_http_announcement(instance, hostname_local, ip_bytes, port=port, txt_kv={"path": "/"})
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # no bind
-    # startup burst
-    for _ in range(burst):
-        try: s.sendto(pkt, (_MDNS_GRP, _MDNS_PORT))
-        except Exception: pass
-        await asyncio.sleep(burst_gap)
-    # steady-state announce
-    while True:
-        try: s.sendto(pkt, (_MDNS_GRP, _MDNS_PORT))
-        except Exception: pass
-        await asyncio.sleep(interval)
+    responder = MdnsResponder(instance, hostname_local, ip_bytes, port=port, txt_kv={"path": "/"})
+    sock, listening = responder.open_socket()
+    if not listening:
+        await responder.announce(sock, forever=True)
+    asyncio.create_task(responder.announce(sock))
+    await responder.serve(sock)
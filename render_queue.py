@@ -0,0 +1,71 @@
+# Single writer for the board: one task renders, everyone else just asks
+import uasyncio as asyncio
+
+
+class RenderQueue:
+    """Coalescing render requests for the task that owns the display.
+
+    Producers (the minute tick, /save) call request(), which never blocks and
+    never touches the display. The run() task wakes, takes the latest state
+    (routes + virtual time) and draws one frame for however many requests
+    piled up meanwhile. The marquee asks for its scroll frames through
+    scroll(), so this task is the only one drawing to the display.
+    """
+
+    def __init__(self, board, window, clock, on_frame=None):
+        self.board = board
+        self.window = window
+        self.clock = clock
+        # called with the rows after each frame, e.g. BoardBroadcaster.publish
+        self.on_frame = on_frame
+        self._event = asyncio.Event()
+        self._pending = False
+        self._marquee = None
+        self._scroll = 0  # marquee frames asked for since the last one was drawn
+        # instrumentation
+        self.requested = 0
+        self.rendered = 0
+        self.wakeups = 0
+        self.scrolled = 0
+
+    def request(self):
+        """Ask for a frame of the current state; safe to call from any task."""
+        self.requested += 1
+        self._pending = True
+        self._event.set()
+
+    def scroll(self, marquee, advance=1):
+        """Ask for `marquee` to move on by `advance` frames; several asks become one repaint."""
+        self._marquee = marquee
+        self._scroll += advance
+        self._event.set()
+
+    async def run(self):
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            if self._pending:
+                self._pending = False
+                self.wakeups += 1
+                # only redraw when the departures on screen actually changed
+                if self.window.advance(self.clock.current_minutes()):
+                    self.board.render(self.window.rows)
+                    self.rendered += 1
+                    if self.on_frame is not None:
+                        self.on_frame(self.window.rows)
+            # after a full frame too, so scrolled cells keep their place
+            if self._scroll:
+                advance, self._scroll = self._scroll, 0
+                self._marquee.frame(advance)
+                self.scrolled += 1
+            # let a burst of producers finish before looking again
+            await asyncio.sleep_ms(0)
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "wakeups": self.wakeups,
+            "rendered": self.rendered,
+            "coalesced": self.requested - self.wakeups,
+            "marquee_frames": self.scrolled,
+        }
@@ -0,0 +1,182 @@
+# Bulk route import/export as CSV, streamed one line at a time
+#
+# Our own export writes the columns in CSV_COLUMNS. Imports also accept the
+# GTFS names below, so a routes/frequencies join can be fed in as is;
+# unknown columns are ignored. Quoted fields ("a, b", "say ""hi""") work,
+# but a quoted field may not span lines.
+
+CSV_COLUMNS = ("id", "train", "via", "dest", "frequency", "track", "offset")
+
+_ALIASES = {
+    "id": "id",
+    "train": "train",
+    "route_short_name": "train",
+    "via": "via",
+    "route_long_name": "via",
+    "dest": "dest",
+    "trip_headsign": "dest",
+    "frequency": "frequency",
+    "headway_secs": "headway_secs",
+    "track": "track",
+    "platform_code": "track",
+    "offset": "offset",
+    "start_time": "start_time",
+}
+
+MAX_LINE_BYTES = 512
+MAX_ERRORS = 5  # skipped lines reported back, to keep the summary small
+
+
+def split_line(line):
+    """Split one CSV line into fields, honouring double quotes."""
+    if '"' not in line:
+        return line.split(",")
+    fields = []
+    i = 0
+    n = len(line)
+    while True:
+        if i < n and line[i] == '"':
+            # quoted field: copy up to each quote, "" stands for one quote
+            parts = []
+            j = i + 1
+            while True:
+                q = line.find('"', j)
+                if q < 0:
+                    raise ValueError("unterminated quote")
+                parts.append(line[j:q])
+                if q + 1 < n and line[q + 1] == '"':
+                    parts.append('"')
+                    j = q + 2
+                    continue
+                break
+            head = "".join(parts)
+            i = q + 1
+        else:
+            head = ""
+        c = line.find(",", i)
+        if c < 0:
+            fields.append(head + line[i:])
+            return fields
+        fields.append(head + line[i:c])
+        i = c + 1
+
+
+def _quote(value):
+    s = str(value)
+    if "," in s or '"' in s or "\n" in s or s != s.strip():
+        return '"' + s.replace('"', '""') + '"'
+    return s
+
+
+def _minutes(hms):
+    # GTFS times are H:MM:SS and may run past 24:00:00
+    parts = hms.strip().split(":")
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+class CsvRouteReader:
+    """Incremental CSV -> route dicts.
+
+    feed() takes the file in chunks of any size and calls on_route(route)
+    for every valid line, so only the line being parsed is held. Lines
+    without a usable frequency are skipped and counted; the first few are
+    kept in `errors` as (line number, message). A header without a
+    frequency (or headway_secs) column raises ValueError, as does a line
+    longer than max_line bytes.
+    """
+
+    def __init__(self, on_route, max_line=MAX_LINE_BYTES):
+        self.on_route = on_route
+        self.max_line = max_line
+        self.lines = 0
+        self.routes = 0
+        self.skipped = 0
+        self.errors = []
+        self._columns = None  # our field name (or None) per CSV column
+        self._partial = b""
+
+    def _header(self, line):
+        if line.startswith("\ufeff"):
+            line = line[1:]  # BOM from spreadsheet exports
+        self._columns = [_ALIASES.get(name.strip().lower()) for name in split_line(line)]
+        if "frequency" not in self._columns and "headway_secs" not in self._columns:
+            raise ValueError("CSV header has no frequency or headway_secs column")
+
+    def _skip(self, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((self.lines, message))
+
+    def _line(self, raw):
+        self.lines += 1
+        line = raw.decode("utf-8", "ignore").rstrip("\r")
+        if self._columns is None:
+            self._header(line)
+            return
+        if not line.strip():
+            return
+        try:
+            fields = split_line(line)
+        except ValueError as e:
+            self._skip(str(e))
+            return
+        route = {}
+        for name, value in zip(self._columns, fields):
+            if name is not None:
+                route[name] = value.strip()
+        try:
+            if "headway_secs" in route:
+                freq = (int(route.pop("headway_secs")) + 30) // 60
+                if not route.get("frequency"):
+                    route["frequency"] = freq
+            route["frequency"] = int(route.get("frequency") or 0)
+            if "start_time" in route:
+                start = _minutes(route.pop("start_time"))
+                if not route.get("offset"):
+                    route["offset"] = start
+            route["offset"] = int(route.get("offset") or 0)
+        except (ValueError, IndexError):
+            self._skip("bad number")
+            return
+        if not 0 < route["frequency"] <= 0xFFFF or not 0 <= route["offset"] <= 0x7FFF:
+            self._skip("frequency/offset out of range")
+            return
+        self.routes += 1
+        self.on_route(route)
+
+    def feed(self, data):
+        start = 0
+        nl = data.find(b"\n")
+        if nl >= 0 and self._partial:
+            self._line(self._partial + data[:nl])
+            self._partial = b""
+            start = nl + 1
+            nl = data.find(b"\n", start)
+        while nl >= 0:
+            self._line(data[start:nl])
+            start = nl + 1
+            nl = data.find(b"\n", start)
+        self._partial = self._partial + data[start:] if self._partial else data[start:]
+        if len(self._partial) > self.max_line:
+            raise ValueError("CSV line %d too long" % (self.lines + 1))
+
+    def close(self):
+        if self._partial:
+            self._line(self._partial)
+            self._partial = b""
+        if self._columns is None:
+            raise ValueError("empty CSV")
+
+    def summary(self):
+        return {"routes": self.routes, "skipped": self.skipped, "errors": self.errors}
+
+
+def iter_csv(routes):
+    """Yield `routes` (a RouteTable) as CSV text, header first, one line per piece.
+
+    Reads a snapshot, so routes deleted while the CSV streams do not cut it short.
+    """
+    routes = routes.snapshot()
+    yield ",".join(CSV_COLUMNS) + "\r\n"
+    for i in range(len(routes)):
+        yield ",".join(_quote(routes.field(i, key)) for key in CSV_COLUMNS) + "\r\n"
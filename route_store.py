@@ -0,0 +1,158 @@
+# Persistent route storage on flash in a compact length-prefixed binary format
+#
+# Layout (little-endian), version 2:
+#   header : magic b"TBRT", u8 version, u8 flags, u16 n_strings, u16 n_routes, u16 next_id
+#   strings: n_strings x (u16 byte length + UTF-8 bytes)      -> RouteTable.strings
+#   routes : n_routes x (u16 id, u16 train, via, dest, track string index,
+#                        u16 frequency, i16 offset)
+#   trailer: u32 CRC-32 of everything before it
+#
+# Version 1 files (no ids, no next_id) still load; their routes are numbered 1..n.
+import struct
+
+try:
+    import os
+except ImportError:
+    import uos as os
+
+try:
+    from binascii import crc32
+except ImportError:
+    from ubinascii import crc32
+
+import timetable as tt
+
+ROUTES_PATH = "routes.bin"
+
+_MAGIC = b"TBRT"
+_VERSION = 2
+_HEADER = "<4sBBHHH"
+_HEADER_SIZE = struct.calcsize(_HEADER)
+_RECORD = "<HHHHHHh"
+_RECORD_SIZE = struct.calcsize(_RECORD)
+_HEADER_V1 = "<4sBBHH"
+_RECORD_V1 = "<HHHHHh"
+
+
+class _CrcWriter:
+    """File wrapper that keeps a running CRC-32 of what it writes."""
+
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def write(self, data):
+        self.crc = crc32(data, self.crc)
+        self.f.write(data)
+
+
+def dump_routes(routes, f):
+    """Write `routes` (a RouteTable or list of route dicts) to an open binary file."""
+    if not isinstance(routes, tt.RouteTable):
+        routes = tt.RouteTable(routes)
+    out = _CrcWriter(f)
+    out.write(struct.pack(_HEADER, _MAGIC, _VERSION, 0, len(routes.strings), len(routes),
+                          min(routes.next_id, 0xFFFF)))
+    for s in routes.strings:
+        b = s.encode()
+        out.write(struct.pack("<H", len(b)))
+        out.write(b)
+    rec = bytearray(_RECORD_SIZE)
+    for i in range(len(routes)):
+        struct.pack_into(_RECORD, rec, 0, routes.ids[i], routes.train[i], routes.via[i],
+                         routes.dest[i], routes.track[i], routes.frequency[i], routes.offset[i])
+        out.write(rec)
+    f.write(struct.pack("<I", out.crc))
+
+
+def parse_routes(data):
+    """Return a RouteTable from the bytes of a route file, or None if it is invalid."""
+    if len(data) < struct.calcsize(_HEADER_V1) + 4:
+        return None
+    mv = memoryview(data)
+    magic, version = struct.unpack_from("<4sB", data, 0)
+    if magic != _MAGIC or version not in (1, _VERSION):
+        return None
+    if version == 1:
+        header, record = _HEADER_V1, _RECORD_V1
+        _m, _v, _flags, n_strings, n_routes = struct.unpack_from(header, data, 0)
+        next_id = n_routes + 1
+    else:
+        if len(data) < _HEADER_SIZE + 4:
+            return None
+        header, record = _HEADER, _RECORD
+        _m, _v, _flags, n_strings, n_routes, next_id = struct.unpack_from(header, data, 0)
+    record_size = struct.calcsize(record)
+    if struct.unpack_from("<I", data, len(data) - 4)[0] != crc32(mv[:len(data) - 4]):
+        return None
+    end = len(data) - 4
+    table = tt.RouteTable()
+    # file string index -> pool index (identical unless the file holds duplicates)
+    remap = []
+    pos = struct.calcsize(header)
+    for _ in range(n_strings):
+        if pos + 2 > end:
+            return None
+        n = struct.unpack_from("<H", data, pos)[0]
+        pos += 2
+        if pos + n > end:
+            return None
+        try:
+            remap.append(table.intern(str(mv[pos:pos + n], "utf-8")))
+        except (UnicodeError, ValueError):
+            return None  # a CRC only proves the bytes arrived, not that they are text
+        pos += n
+    if pos + n_routes * record_size != end:
+        return None
+    try:
+        last = 0
+        for i in range(n_routes):
+            if version == 1:
+                train, via, dest, track, freq, offset = struct.unpack_from(record, data, pos)
+                rid = i + 1
+            else:
+                rid, train, via, dest, track, freq, offset = struct.unpack_from(record, data, pos)
+                if rid <= last:
+                    return None  # ids must be increasing
+            last = rid
+            table.ids.append(rid)
+            table.train.append(remap[train])
+            table.via.append(remap[via])
+            table.dest.append(remap[dest])
+            table.track.append(remap[track])
+            table.frequency.append(freq)
+            table.offset.append(offset)
+            pos += record_size
+    except IndexError:
+        return None
+    table.next_id = max(next_id, last + 1)
+    return table
+
+
+def save_routes(routes, path=ROUTES_PATH):
+    """Atomically replace the route file: write a temp file, then rename it over."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        dump_routes(routes, f)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # some filesystems refuse to rename onto an existing file
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        os.rename(tmp, path)
+
+
+def load_routes(path=ROUTES_PATH):
+    """Return the stored RouteTable, or None if the file is missing or corrupt."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        return parse_routes(data)
+    except Exception:
+        return None
@@ -0,0 +1,22 @@
+const tbody = document.querySelector('#tt tbody');
+function mkRow() {
+  const tr = document.createElement('tr');
+  tr.innerHTML = `
+    <td><input type="hidden" name="id[]"><input name="train[]" required></td>
+    <td><input name="via[]"></td>
+    <td><input name="dest[]"></td>
+    <td><input name="frequency[]" style="width:6em" required></td>
+    <td><input name="track[]" style="width:4em"></td>
+    <td><input name="offset[]" style="width:6em"></td>
+    <td><button type="button" class="del">Delete</button></td>`;
+  return tr;
+}
+document.getElementById('add').addEventListener('click', () => {
+  tbody.appendChild(mkRow());
+});
+tbody.addEventListener('click', (e) => {
+  if (e.target.classList.contains('del')) {
+    const tr = e.target.closest('tr');
+    tr.parentNode.removeChild(tr);
+  }
+});
@@ -0,0 +1,18 @@
+const body = document.querySelector('#board tbody');
+function setRow(r) {
+  while (body.rows.length <= r[0]) {
+    const tr = body.insertRow();
+    for (let c = 1; c < r.length; c++) tr.insertCell();
+  }
+  const tr = body.rows[r[0]];
+  for (let c = 1; c < r.length; c++) tr.cells[c - 1].textContent = r[c];
+}
+function apply(e, full) {
+  const d = JSON.parse(e.data);
+  if (full) body.textContent = '';
+  d.rows.forEach(setRow);
+  while (body.rows.length > d.n) body.deleteRow(-1);
+}
+const es = new EventSource('/events');
+es.addEventListener('full', (e) => apply(e, true));
+es.addEventListener('rows', (e) => apply(e, false));
@@ -0,0 +1,13 @@
+# Generated by tools/build_static.py from static/; do not edit.
+# path: (content type, etag, gzip bytes, plain bytes)
+ASSETS = {
+    '/static/board.css': ('text/css; charset=utf-8', 'f7c14887ddd6',
+        b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\x03E\x8e\xd1j\x850\x10D\xdf\xfd\n\xe1\xd2\xb7\xc6\x9ar[\xe8\xe6k\xd6l\x8c\xa11\t\xc9\xda*\xc1\x7f\xbf\x8a\xb7\x94y\xd9\x1d833D\xda\xea\x18\x03\x83\xfcL\xeb\x9b\xec\xeem\xd9\n\x9bY,N\xcd\x98\xad\x0b\xf0\x9e\xcd\xac\xf6\x86q\xf0\xa6\x0e1\x93\xc9BG\xef1\x15\x03\x7f\x87\xfau\xc4\x13\xc8\xbe\x7f9\xb8U\\\xefW\xdf\xa7\xf5@\xa7W\xa6'\n2\xadm\x89\xdeQ{\xd3Z\xab\x84D.X\xe8\xeeg\xcd\x8f\xc9\xec4z\x81\xde\xd9\x00\x1c\xd3I\x1b\xa4\x96\xa7:\xa0\xfe\xb69.\x81\xe06~\x9c\xda\x1b\x17\xd2\xc2\xf5\xbf|o:\xd4\xecb(\xf5\x9a/\x8e\x0c\x90g6\xb9\x92<n0z\xb3*\x8b\x97\xbb7\x0f\xc2\\~\xa9\x03\x01\x00\x00",
+        b'body{font:16px/1.4 system-ui;margin:2rem;}\ntable{border-collapse:collapse;width:100%;max-width:900px}\nth,td{border:1px solid #ccc;padding:.4rem;vertical-align:top}\nthead th{background:#f5f5f5}\ninput{width:100%}\n.actions{margin-top:1rem;display:flex;gap:1rem}\n'),
+    '/static/board.js': ('application/javascript; charset=utf-8', 'bdcfbb8a53a0',
+        b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\x03\x8dR\xcbN\xc30\x10\xbc\xe7+\xacpp"\xa1\xf4\x828\xd0\xc7\x01\xa8\x04R\xe1\x00\xdc\x10R]{C\xad&vjoZE\xa8\xff\xce&.\xa5\x14\n\x1cbi\xd73\xb3\xeb\xccHk<2\x9cY\xd5\xb0!SV\xd6%\x18\xcc\x965\xb8\xe6\x11\n\x90h]\xc2Op\x8b\xe1i?\xcak#Q[\xc3\xca\xc5\x83]\'){\x8b\x18\x93A\xc7\xed\x8bH\x07\x02a\\@[%\x1c]\xcbf\x04\xca\xb41\xe0n\x9e\xee&\x04\x9fR\x8b\xb1\x01\xaa\xd1@\x9b\xaa&\x91\xa6\x82a<\xd7J\x81\x89\x99\x11%UZ=\xbf\xc4\x1f\x80\xd0B\'\xb4\xa1.s\xb0\xac\xb5\x03\xe2\xf7H\xe4P-\x80WZt\x02\xc7\x11\n<\xfe\x01\xc9\xdbI`d\xd3N\xf5\xd8\x14\xd4[k\x85\xf3\x8bs(\xff\xb7\x07--\x17\xdf\xe8gD\xff\x8de\xf3\xdc\x03\xfe8\xf5\x906\xab\x11\xc9\x9a\xf0\x0fC\x113Y\x08\xef\xdb\'\x16\xf1\xe8\x9aLE\x18\xf4\xc2]\xa0O[[\x1c`\xed\x88\xe9\xfa\xd1&\xday\xf8\n\xb85\xf0\xb2\xb9U\t\x17J\xf14\xa3s\xbc\xa2\xdeD{\x04\xb22\xe1\xb2\xd0r\xc1O\x19\xc5a8\xea\x12\xd1\xe5%\x13U\x05F]\xcdu\xa1\x92m^(\x04\x1b\xfa\xb6\xf7\xc7\x95`\'\xa5s\xaa2\x14\x8e\xb6\xc9\xba\xc7\xb4\xf0\x8c2\x87\x94\x01\x9fpz\x19OC\x10\xbfDq\x8fd=\x19\xfc\x19\xc2.\x86\x95p4\xfa\xde*\xc8\x1c\x94v\x05aOt\x1dd\xd3\xad\xf9\x0es\x94\xef\x9c!\x03\x00\x00',
+        b'const tbody = document.querySelector(\'#tt tbody\');\nfunction mkRow() {\n  const tr = document.createElement(\'tr\');\n  tr.innerHTML = `\n    <td><input type="hidden" name="id[]"><input name="train[]" required></td>\n    <td><input name="via[]"></td>\n    <td><input name="dest[]"></td>\n    <td><input name="frequency[]" style="width:6em" required></td>\n    <td><input name="track[]" style="width:4em"></td>\n    <td><input name="offset[]" style="width:6em"></td>\n    <td><button type="button" class="del">Delete</button></td>`;\n  return tr;\n}\ndocument.getElementById(\'add\').addEventListener(\'click\', () => {\n  tbody.appendChild(mkRow());\n});\ntbody.addEventListener(\'click\', (e) => {\n  if (e.target.classList.contains(\'del\')) {\n    const tr = e.target.closest(\'tr\');\n    tr.parentNode.removeChild(tr);\n  }\n});\n'),
+    '/static/live.js': ('application/javascript; charset=utf-8', '6f3cc5a39d6b',
+        b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\x03\x8d\x91Ok\x021\x10\xc5\xef~\x8a\x81\x1e6\x8b\x9a\xd6\xb3\x7f.\xe2\xa5\x94\x16\xeaQ<\xc4d\xb6.\xa4\x89Mf\xbb\x95\xe2w\xef$\x11\xa4\xb4\x82\xa7%\xec\xef\xbdy\xf3F{\x17\tv\xde\x1ca\x0e\xc6\xeb\xee\x1d\x1d\xc9\x8f\x0e\xc3q\x8d\x165\xf9 \xaa\xbb\x9dW\xc1\x00%\xac\xaa\xa7\x83\xa6s\x9aZ\xef "\xbd\xfa^\x84\x1a\xbe\x07\x00\xfd\xbe\xb5\x08"Q2\xf8>J\x8b\xee\x8d\xf60\x9bC\xd8<l\x0b\x04\xa0\xf3H\n<0\xa3\xad\x8b\x18\xb2\x0f[\'\xa0\xf1\x01\x84E\x02\xcd\xc8d\xca\x9f\x19\x84\xb3\x19\xbf\x86\xc3\x9a\xd5g\xd9\x12\xad-\xba\xd3\xe0\xafuJ\xb1I\xb3\xb7\x89\xb8\xcdW\xb3c\xdch\x18\xc3d+\t\xbfh\xe9\x1dq)\x90\xb6\xd0lt\xba\xec\xaf\x0e\x07{\x148\x82\xa6\xb3\xb6\xecW"\x18\xa6\x1f\xd7/\xcf\xf2\xa0BD\x81\xd2(R9f\xdb\x80(tN\xf8{@U%\xc4\x94\xf68\xeeJ\xe9\xbd(%g\xf1\xb5\x86\x17\xacqgG\xc3g#Lu\x8e\'uJ[\x12ad\x7f\x87=\xac>y\xd6\xdawA\xa3\xa8\xee1\xbdb:*F\xa9\x8c\xc9\x7f\x9f\xda\xc8\x81\x90/\x9f\x92V#\x10X\xc3|qY\x97B\x87\xf55M\n\xf6\x8f\xa6Q6f\xd1\x0f\xa0\xa0{\x18s\x02\x00\x00',
+        b"const body = document.querySelector('#board tbody');\nfunction setRow(r) {\n  while (body.rows.length <= r[0]) {\n    const tr = body.insertRow();\n    for (let c = 1; c < r.length; c++) tr.insertCell();\n  }\n  const tr = body.rows[r[0]];\n  for (let c = 1; c < r.length; c++) tr.cells[c - 1].textContent = r[c];\n}\nfunction apply(e, full) {\n  const d = JSON.parse(e.data);\n  if (full) body.textContent = '';\n  d.rows.forEach(setRow);\n  while (body.rows.length > d.n) body.deleteRow(-1);\n}\nconst es = new EventSource('/events');\nes.addEventListener('full', (e) => apply(e, true));\nes.addEventListener('rows', (e) => apply(e, false));\n"),
+}
@@ -1,3 +1,10 @@
+from array import array
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
 # Timetable model: list[dict]
 # Provide a simple generated 24h timetable based on ROUTES below
 
@@ -18,6 +25,7 @@ TIMETABLE_OLD = [
 
 # Backing structure: routes drive the generated timetable
 # Each route: {"train": str, "via": str, "dest": str, "frequency": int, "track": str, "offset": int}
+# set_routes() below packs this list into a RouteTable at import time.
 ROUTES = [
     {"train": "ICE 511", "via": "Frankfurt(Main)Flugh., Mannheim", "dest": "Stuttgart Hbf", "frequency": 120, "track": "7", "offset": 10},
     {"train": "RE 10123", "via": "Leverkusen Mitte, Düsseldorf", "dest": "Duisburg Hbf", "frequency": 60, "track": "10", "offset": 22},
@@ -33,6 +41,15 @@ ROUTES = [
 
 TIMETABLE = []
 
+# Compiled 24h departure index for ROUTES (None -> fall back to generate_timetable)
+INDEX = None
+
+# Bumped by every set_routes(); lets callers cache anything derived from ROUTES
+ROUTES_VERSION = 0
+
+# Heap budget for the compiled index: two array('H') buffers -> 4 bytes per departure
+INDEX_MAX_BYTES = 16 * 1024
+
 
 def _time_key(row):
     try:
@@ -56,62 +73,637 @@ def filter_after_time(timetable, minutes_since_midnight):
         return timetable
 
 
-def generate_timetable(routes, start_minutes=0, limit=20):
-    """Generate next `limit` departures starting at or after start_minutes.
+def _route_timing(route):
+    """Return (frequency, offset) in minutes for a route, or None if it never departs."""
+    try:
+        freq = int(route.get("frequency", 60))
+    except Exception:
+        freq = 60
+    if freq <= 0:
+        return None
+    try:
+        offset = int(route.get("offset", 0)) % freq
+    except Exception:
+        offset = 0
+    return freq, offset
 
-    Repeats over routes as needed; does not build a full 24h list.
-    Uses the route's fixed track for consistency.
+
+def _fmt_time(minutes):
+    mm_tot = minutes % (24 * 60)
+    return f"{mm_tot // 60:02d}:{mm_tot % 60:02d}"
+
+
+def _clamp(v, lo, hi):
+    return lo if v < lo else hi if v > hi else v
+
+
+class RouteTable:
+    """Compact route storage: parallel arrays plus one interned string pool.
+
+    frequency/offset are stored as numbers, train/via/dest/track as indexes
+    into `strings`, so text shared by several routes is held once. Indexing or
+    iterating yields RouteView objects that answer .get() like the old route
+    dicts, which keeps render_board and web_ui.render_page working.
+
+    Every route also has a stable id (1..65535) for the JSON API. Ids are
+    handed out in increasing order and removal keeps the order, so `ids` is
+    always sorted and find() is a bisect. A table replacing another is
+    built with the old table's next_id, so ids deleted from it are not
+    handed out again.
+
+    remove() and the string-pool compaction build new columns instead of
+    shifting the old ones, so a snapshot() taken before them keeps reading
+    the routes as they were; streamed responses iterate one.
     """
-    start = int(start_minutes) % (24 * 60)
-    # Initialize next time for each route at the first multiple of freq >= start, factoring route offset
-    next_times = []  # list of (next_time_abs_minutes, route_index, freq)
-    for idx, route in enumerate(routes):
+
+    def __init__(self, routes=(), next_id=1):
+        self.strings = []
+        self._pool = {}  # str -> index into strings
+        self.ids = array("H")
+        self.next_id = next_id
+        self.train = array("H")
+        self.via = array("H")
+        self.dest = array("H")
+        self.track = array("H")
+        self.frequency = array("H")  # 0 -> never departs
+        self.offset = array("h")
+        for route in routes:
+            self.append(route)
+
+    def intern(self, s):
+        s = str(s)
+        i = self._pool.get(s)
+        if i is None:
+            i = len(self.strings)
+            self.strings.append(s)
+            self._pool[s] = i
+        return i
+
+    def _packed(self, route):
+        timing = _route_timing(route)
         try:
-            freq = int(route.get("frequency", 60))
+            offset = int(route.get("offset", 0))
         except Exception:
-            freq = 60
-        if freq <= 0:
-            continue
+            offset = 0
+        freq = _clamp(timing[0], 0, 0xFFFF) if timing else 0
+        if not -0x8000 <= offset <= 0x7FFF:
+            # too big for the column; only offset % freq moves departures, so store
+            # that (shifted down one period if needed to fit 'h') rather than clamp
+            offset = offset % freq if freq else 0
+            if offset > 0x7FFF:
+                offset -= freq
+        return (self.intern(route.get("train", "")), self.intern(route.get("via", "")),
+                self.intern(route.get("dest", "")), self.intern(route.get("track", "")),
+                freq, offset)
+
+    def append(self, route):
+        """Add a route given as a dict (or anything with .get()); return its id.
+
+        A route's own "id" is kept when it is above every id in the table
+        (as when re-saving the admin form), otherwise it gets next_id.
+        """
         try:
-            offset = int(route.get("offset", 0)) % freq
+            rid = int(route.get("id") or 0)
         except Exception:
-            offset = 0
+            rid = 0
+        last = self.ids[-1] if self.ids else 0
+        if not last < rid <= 0xFFFF:
+            rid = self.next_id
+        if rid > 0xFFFF:
+            raise ValueError("route ids exhausted")
+        train, via, dest, track, freq, offset = self._packed(route)
+        self.ids.append(rid)
+        self.next_id = max(self.next_id, rid + 1)
+        self.train.append(train)
+        self.via.append(via)
+        self.dest.append(dest)
+        self.track.append(track)
+        self.frequency.append(freq)
+        self.offset.append(offset)
+        return rid
+
+    def find(self, rid):
+        """Position of the route with id `rid`, or -1."""
+        i = _bisect_left(self.ids, rid)
+        return i if i < len(self.ids) and self.ids[i] == rid else -1
+
+    def set(self, i, route):
+        """Overwrite route `i` in place, keeping its id."""
+        (self.train[i], self.via[i], self.dest[i], self.track[i],
+         self.frequency[i], self.offset[i]) = self._packed(route)
+        self._maybe_compact()
+
+    def remove(self, i):
+        """Drop route `i`; later routes move up one position (in new columns, see snapshot())."""
+        for name in _COLUMNS:
+            a = getattr(self, name)
+            setattr(self, name, a[:i] + a[i + 1:])
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        # edits leave strings nobody refers to; rebuild the pool once they dominate
+        if len(self.strings) <= 4 * len(self) + 16:
+            return
+        old = self.strings
+        self.strings = []
+        self._pool = {}
+        for name in _TEXT_COLUMNS:
+            setattr(self, name, array("H", [self.intern(old[k]) for k in getattr(self, name)]))
+
+    def snapshot(self):
+        """A table sharing the current columns, unaffected by later removals and swaps.
+
+        In-place edits (set(), append()) still show through; positions stay valid.
+        """
+        snap = RouteTable((), self.next_id)
+        snap.strings = self.strings
+        snap._pool = self._pool
+        for name in _COLUMNS:
+            setattr(snap, name, getattr(self, name))
+        return snap
+
+    def __len__(self):
+        return len(self.frequency)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.frequency)
+        if not 0 <= i < len(self.frequency):
+            raise IndexError("route index out of range")
+        return RouteView(self, i)
+
+    def __iter__(self):
+        # routes deleted while a caller is still iterating (a streamed page) do not shift it
+        snap = self.snapshot()
+        for i in range(len(snap.frequency)):
+            yield RouteView(snap, i)
+
+    def field(self, i, key, default=None):
+        """Field `key` of route `i`, in the same types the route dicts used."""
+        if key == "id":
+            return self.ids[i]
+        if key == "frequency":
+            return self.frequency[i]
+        if key == "offset":
+            return self.offset[i]
+        if key in ("train", "via", "dest", "track"):
+            return self.strings[getattr(self, key)[i]]
+        return default
+
+    def to_dicts(self):
+        return [{k: self.field(i, k) for k in _ROUTE_KEYS} for i in range(len(self))]
+
+
+_ROUTE_KEYS = ("train", "via", "dest", "frequency", "track", "offset")
+_TEXT_COLUMNS = ("train", "via", "dest", "track")
+_COLUMNS = ("ids",) + _TEXT_COLUMNS + ("frequency", "offset")
+
+
+class RouteView:
+    """Read-only dict-like view of one route in a RouteTable."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def get(self, key, default=None):
+        return self.table.field(self.index, key, default)
+
+    def __getitem__(self, key):
+        if key not in _ROUTE_KEYS:
+            raise KeyError(key)
+        return self.table.field(self.index, key)
+
+
+class DepartureView:
+    """One timetable row backed by a RouteTable; replaces a freshly built dict."""
+
+    __slots__ = ("table", "index", "minutes")
+
+    def __init__(self, table, index, minutes):
+        self.table = table
+        self.index = index
+        self.minutes = minutes
+
+    def get(self, key, default=None):
+        if key == "time":
+            return _fmt_time(self.minutes)
+        if key in ("train", "via", "dest", "track"):
+            return self.table.field(self.index, key)
+        return default
+
+    def __getitem__(self, key):
+        if key not in _ROW_KEYS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __eq__(self, other):
+        if isinstance(other, DepartureView):
+            return (self.table is other.table and self.index == other.index
+                    and self.minutes % (24 * 60) == other.minutes % (24 * 60))
+        return NotImplemented
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+
+_ROW_KEYS = ("time", "train", "via", "dest", "track")
+
+
+def _row(routes, route_idx, minutes):
+    if isinstance(routes, RouteTable):
+        return DepartureView(routes, route_idx, minutes)
+    route = routes[route_idx]
+    return {
+        "time": _fmt_time(minutes),
+        "train": route.get("train", ""),
+        "via": route.get("via", ""),
+        "dest": route.get("dest", ""),
+        "track": str(route.get("track", "")),
+    }
+
+
+def _timings(routes):
+    """Yield (route_index, frequency, offset) for every route that departs."""
+    if isinstance(routes, RouteTable):
+        freqs = routes.frequency
+        offsets = routes.offset
+        for idx in range(len(freqs)):
+            freq = freqs[idx]
+            if freq:
+                yield idx, freq, offsets[idx] % freq
+        return
+    for idx, route in enumerate(routes):
+        timing = _route_timing(route)
+        if timing is not None:
+            yield idx, timing[0], timing[1]
+
+
+def _heap_stream(routes, start_minutes=0):
+    """Yield (absolute_minute, route_index) forever, merging routes with a min-heap.
+
+    Ties keep the lowest route index first. Absolute minutes keep counting past
+    midnight (1440 is 00:00 of the next day), but every day is the same: a
+    route restarts from its offset at midnight, as in the compiled index.
+    """
+    day = 24 * 60
+    start = int(start_minutes) % day
+    # Initialize next time for each route at the first multiple of freq >= start, factoring route offset
+    heap = []  # list of (next_time_abs_minutes, route_index, freq, offset)
+    for idx, freq, offset in _timings(routes):
+        if offset >= day:
+            continue  # first departure would be tomorrow, which starts over
         # Align to the next multiple of freq at/after start considering offset
         base = ((max(0, start - offset) // freq) * freq) + offset
         if base < start:
             base += freq
-        next_times.append([base, idx, freq])
+        if base >= day:
+            base = day + offset
+        heap.append((base, idx, freq, offset))
+    if not heap:
+        return
+    heapq.heapify(heap)
+
+    while True:
+        # Earliest next time sits at the top of the heap
+        dep_time, route_idx, freq, offset = heapq.heappop(heap)
+        yield dep_time, route_idx
+        # Advance this route's next time by its frequency, or to its offset the next day
+        nxt = dep_time + freq
+        if nxt // day != dep_time // day:
+            nxt = (dep_time // day + 1) * day + offset
+        heapq.heappush(heap, (nxt, route_idx, freq, offset))
+
+
+def iter_departures(routes, start_minutes=0):
+    """Yield departure rows in order, at or after start_minutes, forever.
+
+    Rolls over midnight into the following days, so callers pull exactly as
+    many rows as they show. Served from the compiled index when it was built
+    for `routes`, otherwise merged on the fly with a min-heap.
+    """
+    for dep_time, route_idx in _stream(routes, start_minutes):
+        yield _row(routes, route_idx, dep_time)
+
+
+def generate_timetable(routes, start_minutes=0, limit=20):
+    """Generate next `limit` departures starting at or after start_minutes.
+
+    Repeats over routes as needed; does not build a full 24h list.
+    Uses the route's fixed track for consistency.
 
+    Thin wrapper that collects `limit` rows from iter_departures().
+    """
     entries = []
-    if not next_times:
+    if limit <= 0:
         return entries
+    for row in iter_departures(routes, start_minutes):
+        entries.append(row)
+        if len(entries) >= limit:
+            break
+    return entries
 
-    while len(entries) < limit:
-        # Find the earliest next time among routes
-        min_i = 0
-        min_t = next_times[0][0]
-        for i in range(1, len(next_times)):
-            if next_times[i][0] < min_t:
-                min_t = next_times[i][0]
-                min_i = i
-        dep_time, route_idx, freq = next_times[min_i]
-        route = routes[route_idx]
-        mm_tot = dep_time % (24 * 60)
-        hh = mm_tot // 60
-        mm = mm_tot % 60
-        entries.append({
-            "time": f"{hh:02d}:{mm:02d}",
-            "train": route.get("train", ""),
-            "via": route.get("via", ""),
-            "dest": route.get("dest", ""),
-            "track": str(route.get("track", "")),
-        })
-        # Advance this route's next time by its frequency
-        next_times[min_i][0] = dep_time + freq
 
-    return entries
+def _bisect_left(arr, x):
+    # MicroPython has no bisect module
+    lo, hi = 0, len(arr)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if arr[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _count_daily(routes):
+    """Number of departures `routes` produce in one 24h day."""
+    total = 0
+    for _, freq, offset in _timings(routes):
+        total += (24 * 60 - offset + freq - 1) // freq
+    return total
+
+
+class DepartureIndex:
+    """All departures of one 24h day, sorted by (minute, route index).
+
+    Held as two parallel array('H') buffers so a lookup is a bisect followed
+    by a sequential walk. The day repeats, so a route whose frequency does
+    not divide 24h restarts from its offset at midnight, just as
+    _heap_stream() does when the index is over budget.
+    """
+
+    def __init__(self, routes, minutes, route_ids):
+        self.routes = routes
+        self.minutes = minutes
+        self.route_ids = route_ids
+
+    def __len__(self):
+        return len(self.minutes)
+
+    def nbytes(self):
+        return len(self.minutes) * self.minutes.itemsize + len(self.route_ids) * self.route_ids.itemsize
+
+    def stream(self, start_minutes=0):
+        """Yield (absolute_minute, route_index) forever from start_minutes, repeating the day."""
+        minutes = self.minutes
+        route_ids = self.route_ids
+        n = len(minutes)
+        if not n:
+            return
+        i = _bisect_left(minutes, int(start_minutes) % (24 * 60))
+        day = 0
+        while True:
+            if i >= n:
+                i = 0
+                day += 24 * 60
+            yield day + minutes[i], route_ids[i]
+            i += 1
+
+    def count(self, route_idx):
+        n = 0
+        for r in self.route_ids:
+            if r == route_idx:
+                n += 1
+        return n
+
+    def replace_route(self, route_idx, times=()):
+        """Swap route_idx's departures for `times` (sorted minutes) in one merge pass."""
+        minutes = array("H")
+        route_ids = array("H")
+        j = 0
+        nt = len(times)
+        old_ids = self.route_ids
+        for k, m in enumerate(self.minutes):
+            r = old_ids[k]
+            if r == route_idx:
+                continue
+            # ties are ordered by route index, as compile_index() does
+            while j < nt and (times[j] < m or (times[j] == m and route_idx < r)):
+                minutes.append(times[j])
+                route_ids.append(route_idx)
+                j += 1
+            minutes.append(m)
+            route_ids.append(r)
+        while j < nt:
+            minutes.append(times[j])
+            route_ids.append(route_idx)
+            j += 1
+        self.minutes = minutes
+        self.route_ids = route_ids
+
+    def remove_route(self, route_idx):
+        """Drop route_idx's departures and shift later route indexes down by one."""
+        self.replace_route(route_idx)
+        route_ids = self.route_ids
+        for k in range(len(route_ids)):
+            if route_ids[k] > route_idx:
+                route_ids[k] -= 1
+
+
+def compile_index(routes, max_bytes=None):
+    """Compile `routes` into a DepartureIndex, or return None if it would exceed max_bytes."""
+    if max_bytes is None:
+        max_bytes = INDEX_MAX_BYTES
+    if len(routes) > 0xFFFF or _count_daily(routes) * 4 > max_bytes:
+        return None
+    minutes = array("H")
+    route_ids = array("H")
+    # k-way merge of each route's first departure of the day, stopping at midnight
+    heap = [(offset, idx, freq) for idx, freq, offset in _timings(routes) if offset < 24 * 60]
+    heapq.heapify(heap)
+    while heap:
+        dep_time, route_idx, freq = heapq.heappop(heap)
+        minutes.append(dep_time)
+        route_ids.append(route_idx)
+        if dep_time + freq < 24 * 60:
+            heapq.heappush(heap, (dep_time + freq, route_idx, freq))
+    return DepartureIndex(routes, minutes, route_ids)
+
+
+def index_report():
+    """Memory budget of the compiled index for the current ROUTES."""
+    departures = _count_daily(ROUTES)
+    return {
+        "routes": len(ROUTES),
+        "departures": departures,
+        "bytes": INDEX.nbytes() if INDEX is not None else departures * 4,
+        "max_bytes": INDEX_MAX_BYTES,
+        "compiled": INDEX is not None,
+    }
+
+
+def set_routes(routes):
+    """Replace ROUTES (packed into a RouteTable) and recompile the departure index."""
+    global ROUTES, INDEX, ROUTES_VERSION
+    if not isinstance(routes, RouteTable):
+        routes = RouteTable(routes)
+    ROUTES = routes
+    INDEX = compile_index(routes)
+    ROUTES_VERSION += 1
+
+
+def _daily_times(routes, route_idx):
+    freq = routes.frequency[route_idx]
+    if not freq:
+        return ()
+    return range(routes.offset[route_idx] % freq, 24 * 60, freq)
+
+
+def _reindex(route_idx, old_count=0):
+    """Patch INDEX after route_idx of ROUTES changed, instead of recompiling."""
+    global INDEX
+    if INDEX is None or INDEX.routes is not ROUTES:
+        # over budget before; the change may have made it fit
+        INDEX = compile_index(ROUTES)
+        return
+    times = _daily_times(ROUTES, route_idx)
+    if (len(INDEX) - old_count + len(times)) * 4 > INDEX_MAX_BYTES:
+        INDEX = None
+        return
+    INDEX.replace_route(route_idx, times)
+
+
+def add_route(route):
+    """Append one route to ROUTES and merge its departures into INDEX; return its id."""
+    global ROUTES_VERSION
+    rid = ROUTES.append(route)
+    _reindex(len(ROUTES) - 1)
+    ROUTES_VERSION += 1
+    return rid
+
+
+def update_route(rid, route):
+    """Replace the route with id `rid`; return False if there is none."""
+    global ROUTES_VERSION
+    i = ROUTES.find(rid)
+    if i < 0:
+        return False
+    timing = (ROUTES.frequency[i], ROUTES.offset[i])
+    old_count = INDEX.count(i) if INDEX is not None else 0
+    ROUTES.set(i, route)
+    # text-only edits leave the departure times alone
+    if timing != (ROUTES.frequency[i], ROUTES.offset[i]) or INDEX is None:
+        _reindex(i, old_count)
+    ROUTES_VERSION += 1
+    return True
+
+
+def delete_route(rid):
+    """Remove the route with id `rid`; return False if there is none."""
+    global INDEX, ROUTES_VERSION
+    i = ROUTES.find(rid)
+    if i < 0:
+        return False
+    ROUTES.remove(i)
+    if INDEX is not None and INDEX.routes is ROUTES:
+        INDEX.remove_route(i)
+    else:
+        INDEX = compile_index(ROUTES)
+    ROUTES_VERSION += 1
+    return True
+
+
+def _stream(routes, start_minutes=0):
+    # Prefer the compiled index when it was built for these routes
+    if INDEX is not None and INDEX.routes is routes:
+        return INDEX.stream(start_minutes)
+    return _heap_stream(routes, start_minutes)
+
+
+class TimetableWindow:
+    """Rolling view of the next `size` departures that follows the virtual clock.
+
+    advance() drops departed rows from the head and pulls only the new ones
+    onto the tail, instead of regenerating the whole window every minute.
+    """
+
+    def __init__(self, size=20):
+        self.size = size
+        self.rows = []
+        self.resets = 0
+        self._times = []  # absolute minute of each row
+        self._routes = None
+        self._version = None  # ROUTES_VERSION the rows were built from
+        self._stream = None
+        self._now = None  # absolute virtual minute of the last advance
+
+    def invalidate(self):
+        """Force a full rebuild on the next advance()."""
+        self._routes = None
+
+    def _fill(self):
+        rows = self.rows
+        times = self._times
+        routes = self._routes
+        while len(rows) < self.size:
+            try:
+                dep_time, route_idx = next(self._stream)
+            except StopIteration:
+                break
+            times.append(dep_time)
+            rows.append(_row(routes, route_idx, dep_time))
+
+    def reset(self, now_minutes, routes=None):
+        """Rebuild the window from scratch; return every row position, old or new.
+
+        Positions of rows that went away count as changed, so emptying the
+        routes still redraws the board; the first build always reports one.
+        """
+        old = len(self.rows) if self._now is not None else 1
+        self._routes = ROUTES if routes is None else routes
+        self._version = ROUTES_VERSION
+        self._now = int(now_minutes) % (24 * 60)
+        self._stream = _stream(self._routes, self._now)
+        self.rows = []
+        self._times = []
+        self.resets += 1
+        self._fill()
+        return list(range(max(old, len(self.rows))))
+
+    def advance(self, now_minutes, routes=None):
+        """Move the window to now_minutes (0..1439); return the row positions that changed.
+
+        The clock is assumed to only move forward, so a smaller minute means it
+        wrapped past midnight. Changed routes (a new ROUTES list or an edit in
+        place) or a jump past the whole window trigger a full reset.
+        """
+        routes = ROUTES if routes is None else routes
+        if routes is not self._routes or self._version != ROUTES_VERSION or self._now is None:
+            return self.reset(now_minutes, routes)
+        delta = (int(now_minutes) - self._now) % (24 * 60)
+        if not delta:
+            return []
+        now = self._now + delta
+        times = self._times
+        if not times or times[-1] < now:
+            return self.reset(now_minutes, routes)
+        self._now = now
+
+        # Drop departed rows from the head
+        k = 0
+        while times[k] < now:
+            k += 1
+        if not k:
+            return []
+        old = self.rows
+        del times[:k]
+        self.rows = old[k:]
+        self._fill()
+        rows = self.rows
+        n = min(len(rows), len(old))
+        return [i for i in range(max(len(rows), len(old))) if i >= n or rows[i] != old[i]]
+
+
+def upcoming(start_minutes=0, limit=20):
+    """Next `limit` departures of ROUTES, from the index when compiled."""
+    return generate_timetable(ROUTES, start_minutes, limit)
 
 
 # Initialize from default routes with a small upcoming window
-TIMETABLE = generate_timetable(ROUTES, 0, 20)
+set_routes(ROUTES)
+TIMETABLE = upcoming(0, 20)
 
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Check route ids and persistence through web_ui's handler, with in-memory requests.
+
+Drives /save, the JSON API and the bulk imports the way the admin page and
+a dispatcher would, then checks that ids stay stable (a deleted id is never
+handed out again) and that a burst of edits is saved to flash once. Runs in
+a temporary directory, so no routes.bin is touched. Streamed responses
+are also read by a slow client while routes are deleted under them. Exits 1 if any check
+fails. Usage:
+    python3 tools/api_check.py [-v]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+from urllib.parse import urlencode
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+import board_events  # noqa: E402
+import route_store  # noqa: E402
+import timetable as tt  # noqa: E402
+import web_ui  # noqa: E402
+from bench_web_cache import MemoryWriter  # noqa: E402
+
+ROUTES = [
+    {"train": "RE 1", "via": "Bonn", "dest": "Koblenz", "frequency": 60, "track": "1", "offset": 0},
+    {"train": "RE 5", "via": "Köln", "dest": "Emmerich", "frequency": 30, "track": "2", "offset": 10},
+    {"train": "S 12", "via": "Troisdorf", "dest": "Au", "frequency": 20, "track": "3", "offset": 5},
+]
+
+
+class _Renderer:
+    def request(self):
+        pass
+
+
+class SlowWriter(MemoryWriter):
+    """A client that takes its time over every write, so requests overlap the stream."""
+
+    async def awrite(self, data):
+        await asyncio.sleep(0.001)
+        await super().awrite(data)
+
+
+async def call(handle, method, path, body=b"", ctype="application/json", writer=None):
+    """One request through the handler; return (status, body bytes)."""
+    reader = asyncio.StreamReader()
+    reader.feed_data(f"{method} {path} HTTP/1.1\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+    reader.feed_eof()
+    writer = writer or MemoryWriter()
+    await handle(reader, writer)
+    head, _, rest = bytes(writer.data).partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), rest
+
+
+def unchunk(body):
+    """Decode a chunked body; None if it is cut off before the last chunk."""
+    out = bytearray()
+    while True:
+        size, sep, body = body.partition(b"\r\n")
+        if not sep:
+            return None
+        n = int(size, 16)
+        if not n:
+            return bytes(out) if body == b"\r\n" else None
+        out += body[:n]
+        body = body[n + 2:]
+
+
+def save_form(rows):
+    fields = []
+    for r in rows:
+        fields += [("id[]", r.get("id", "")), ("train[]", r["train"]), ("via[]", r["via"]),
+                   ("dest[]", r["dest"]), ("frequency[]", r["frequency"]), ("track[]", r["track"]),
+                   ("offset[]", r["offset"])]
+    return urlencode(fields).encode()
+
+
+async def run_checks(check):
+    handle = web_ui.create_handler(None, 0, 0, _Renderer())
+
+    # admin page: delete the last row and add one in the same save
+    tt.set_routes(ROUTES)
+    rows = [dict(r, id=rid) for r, rid in zip(ROUTES[:2], tt.ROUTES.ids)]
+    rows.append({"train": "RB 26", "via": "Remagen", "dest": "Mainz", "frequency": 60, "track": "4", "offset": 7})
+    status, _ = await call(handle, "POST", "/save", save_form(rows), "application/x-www-form-urlencoded")
+    check("save with delete + add", status == 303, status)
+    check("  kept ids, new row gets a fresh id", list(tt.ROUTES.ids) == [1, 2, 4], list(tt.ROUTES.ids))
+    status, _ = await call(handle, "PATCH", "/api/routes/3", b'{"track": "9"}')
+    check("  PATCH of the deleted id is 404", status == 404, status)
+
+    # offsets past the 16-bit column keep their departures (offset % frequency)
+    rows = [dict(ROUTES[0], offset=40007, frequency=60), dict(ROUTES[1], offset=99999, frequency=40000)]
+    status, _ = await call(handle, "POST", "/save", save_form(rows), "application/x-www-form-urlencoded")
+    got = [tt.ROUTES.offset[i] % tt.ROUTES.frequency[i] for i in range(len(tt.ROUTES))]
+    check("save with offsets above 32767", status == 303 and got == [40007 % 60, 99999 % 40000], got)
+    tt.set_routes(ROUTES)
+
+    # a burst of single-route edits is written to flash once
+    writes = []
+    save = route_store.save_routes
+    route_store.save_routes = lambda routes, *a: writes.append(len(routes))
+    try:
+        for track in "567":
+            await call(handle, "PATCH", "/api/routes/1", json.dumps({"track": track}).encode())
+        await asyncio.sleep(web_ui.SAVE_DELAY_MS / 1000 + 0.1)
+    finally:
+        route_store.save_routes = save
+    check("three PATCHes, one write of routes.bin", writes == [3], writes)
+
+    # bulk imports
+    tt.set_routes(ROUTES)
+    status, _ = await call(handle, "DELETE", "/api/routes/3")
+    csv = "train,via,dest,frequency,track,offset\r\n" + "".join(
+        f"{r['train']},{r['via']},{r['dest']},{r['frequency']},{r['track']},{r['offset']}\r\n" for r in ROUTES)
+    status, _ = await call(handle, "PUT", "/api/routes.csv", csv.encode(), "text/csv")
+    check("CSV import after DELETE 3", status == 200, status)
+    check("  rows without ids skip the deleted id", 3 not in tt.ROUTES.ids, list(tt.ROUTES.ids))
+
+    before = list(tt.ROUTES.ids)
+    status, body = await call(handle, "PUT", "/api/routes.csv", b"train,via,dest,frequency,track,offset\r\n", "text/csv")
+    check("header-only CSV is refused", status == 400, (status, body))
+    check("  and leaves the routes alone", list(tt.ROUTES.ids) == before, list(tt.ROUTES.ids))
+
+    buf = io.BytesIO()
+    route_store.dump_routes(tt.RouteTable([dict(ROUTES[0], train="QQQQ")]), buf)
+    data = bytearray(buf.getvalue()[:-4]).replace(b"QQQQ", b"\xff\xfeQQ")
+    data += struct.pack("<I", zlib.crc32(data))
+    status, body = await call(handle, "PUT", "/api/routes.bin", bytes(data), "application/octet-stream")
+    check("route file with bad UTF-8 and good CRC is 400", status == 400, (status, body))
+    check("  and leaves the routes alone", list(tt.ROUTES.ids) == before, list(tt.ROUTES.ids))
+
+    # deletes and a whole-table swap while a slow client is still reading a stream
+    many = [dict(ROUTES[i % 3], train="RE %d" % i) for i in range(60)]
+    for path, count in (("/", lambda b: b.count(b'name="train[]"')),
+                        ("/api/routes.csv", lambda b: b.count(b"\r\n") - 1),
+                        ("/api/routes", lambda b: len(json.loads(b)))):
+        tt.set_routes(many)
+        ids = list(tt.ROUTES.ids)
+        stream = asyncio.ensure_future(call(handle, "GET", path, writer=SlowWriter()))
+        await asyncio.sleep(0.01)
+        for rid in ids[-3:]:
+            await call(handle, "DELETE", "/api/routes/%d" % rid)
+            await asyncio.sleep(0.005)
+        await call(handle, "POST", "/save", save_form(ROUTES), "application/x-www-form-urlencoded")
+        status, body = await stream
+        body = unchunk(body)
+        check("GET %s while routes are deleted" % path, body is not None and status == 200, status)
+        check("  rows as of the start of the stream", body is not None and count(body) == len(ids),
+              body and count(body))
+
+    # HTTP/1.0 has no chunked encoding: bare body, then the connection closes (no second response)
+    tt.set_routes(many)
+    web_ui._page_cache = None
+    bare = {"/": web_ui.render_page(),
+            "/api/routes.csv": "".join(web_ui.route_csv.iter_csv(tt.ROUTES)).encode(),
+            "/api/routes": "".join(web_ui._iter_routes_json()).encode()}
+    for path, expected in bare.items():
+        reader = asyncio.StreamReader()
+        get = f"GET {path} HTTP/1.0\r\nConnection: keep-alive\r\n\r\n".encode()
+        reader.feed_data(get + get)  # a second request on the same connection
+        reader.feed_eof()
+        writer = MemoryWriter()
+        await handle(reader, writer)
+        head, _, rest = bytes(writer.data).partition(b"\r\n\r\n")
+        head = head.decode().lower()
+        check("HTTP/1.0 GET %s is not chunked" % path,
+              "transfer-encoding" not in head and "connection: close" in head, head)
+        check("  body is the bare content, connection closed", rest == expected, rest[:40] + b"..." + rest[-40:])
+
+    # /events at the subscriber cap: 503, and the slot is given back right away
+    full = web_ui.create_handler(None, 0, 0, _Renderer(), events=board_events.BoardBroadcaster(4, 0))
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"GET /events HTTP/1.1\r\nHost: trainboard\r\n\r\n")  # no EOF: the client stays
+    writer = MemoryWriter()
+    try:
+        await asyncio.wait_for(full(reader, writer), web_ui.KEEPALIVE_TIMEOUT_S / 3)
+        closed = True
+    except asyncio.TimeoutError:
+        closed = False
+    head = bytes(writer.data).split(b"\r\n\r\n", 1)[0].decode().lower()
+    check("/events over the subscriber cap is 503", head.startswith("http/1.1 503"), head)
+    check("  and closes instead of idling on a slot",
+          closed and "keep-alive" not in head and web_ui._slots.value == web_ui.MAX_CONNECTIONS,
+          (closed, head, web_ui._slots.value))
+
+
+def run(verbose=False):
+    results = []
+
+    def check(label, ok, detail=""):
+        results.append(ok)
+        print(f"{label:<48} {'ok' if ok else 'FAIL'}{'  ' + repr(detail) if verbose or not ok else ''}")
+
+    web_ui.SAVE_DELAY_MS = 100  # keep the coalescing window short for the check
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # route_store saves routes.bin in the working directory
+        try:
+            asyncio.run(run_checks(check))
+        finally:
+            os.chdir(cwd)
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show details for passing checks too.")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.verbose) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Peak heap and time to read + parse a /save form body: buffered versus streamed.
+
+The buffered path is the original read_request body loop (`body += chunk`)
+followed by the original parse_form()/_urldecode(); the streamed path is
+web_ui.read_form() over a RequestBody. The body sits in the stream buffer
+before measuring starts, as it would in the socket. Usage:
+    python3 tools/bench_form.py [--sizes 10,100,1000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import urlencode
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+import web_ui  # noqa: E402
+from bench_route_mem import make_route_dicts  # noqa: E402
+
+
+def _urldecode_reference(s):
+    s = s.replace("+", " ")
+    out = bytearray()
+    i = 0
+    bs = s.encode() if isinstance(s, str) else s
+    while i < len(bs):
+        c = bs[i]
+        if c == 37 and i + 2 < len(bs):  # '%'
+            try:
+                out.append(int(bs[i + 1:i + 3].decode(), 16))
+                i += 3
+                continue
+            except Exception:
+                pass
+        out.append(c)
+        i += 1
+    return out.decode("utf-8", "ignore")
+
+
+def parse_form_reference(body_bytes):
+    """Copy of parse_form() before the streaming parser."""
+    qs = body_bytes.decode("utf-8", "ignore")
+    out = {}
+    if not qs:
+        return out
+    for pair in qs.split("&"):
+        if not pair:
+            continue
+        if "=" in pair:
+            k, v = pair.split("=", 1)
+        else:
+            k, v = pair, ""
+        k = _urldecode_reference(k)
+        v = _urldecode_reference(v)
+        out.setdefault(k, []).append(v)
+    return out
+
+
+def form_body(n):
+    fields = []
+    for r in make_route_dicts(n):
+        fields += [("id[]", ""), ("train[]", r["train"]), ("via[]", r["via"]), ("dest[]", r["dest"]),
+                   ("frequency[]", r["frequency"]), ("track[]", r["track"]), ("offset[]", r["offset"])]
+    return urlencode(fields).encode()
+
+
+async def buffered(reader, length):
+    body = b""
+    remaining = length
+    while remaining > 0:
+        chunk = await reader.read(min(remaining, 1024))
+        if not chunk:
+            break
+        body += chunk
+        remaining -= len(chunk)
+    return parse_form_reference(body)
+
+
+async def streamed(reader, length):
+    form = {}
+    await web_ui.read_form(web_ui.RequestBody(reader, length),
+                           lambda k, v: form.setdefault(k, []).append(v))
+    return form
+
+
+def measure(parse, body):
+    """Return (peak bytes above the buffered body, seconds, parsed form).
+
+    Timed on a second, untraced run so tracemalloc does not skew it.
+    """
+    result = []
+
+    async def run(traced):
+        reader = asyncio.StreamReader()
+        reader.feed_data(body)
+        reader.feed_eof()
+        if traced:
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        form = await parse(reader, len(body))
+        dt = time.perf_counter() - t0
+        if traced:
+            result.append(tracemalloc.get_traced_memory()[1] - base)
+            tracemalloc.stop()
+        else:
+            result.append(dt)
+            result.append(form)
+
+    asyncio.run(run(True))
+    asyncio.run(run(False))
+    return tuple(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated route counts.")
+    args = parser.parse_args()
+
+    print(f"{'routes':>7} {'body bytes':>11} {'buffered peak':>14} {'streamed peak':>14}"
+          f" {'buffered ms':>12} {'streamed ms':>12}  same")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        body = form_body(n)
+        b_peak, b_dt, b_form = measure(buffered, body)
+        s_peak, s_dt, s_form = measure(streamed, body)
+        print(f"{n:>7} {len(body):>11} {b_peak:>14} {s_peak:>14}"
+              f" {b_dt * 1e3:>12.2f} {s_dt * 1e3:>12.2f}  {b_form == s_form}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Throughput of a GTFS-like bulk import: desktop conversion, then the push to the board.
+
+Generates an N-line feed (GTFS column names, every service repeated over
+many trips), streams it through tools/gtfs_routes.convert_feed(), and then
+replays the upload through web_ui's handler in memory, as the compact
+route file and as the equivalent CSV. The board-side figures are CPython
+timings of the same code, not Pico timings. Usage:
+    python3 tools/bench_gtfs.py [--lines 100000] [--services 400]
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+import route_store  # noqa: E402
+import timetable as tt  # noqa: E402
+import web_ui  # noqa: E402
+from bench_web_cache import MemoryWriter  # noqa: E402
+from gtfs_routes import convert_feed  # noqa: E402
+
+STATIONS = ["Köln Hbf", "Bonn", "Koblenz", "Mainz", "Frankfurt(M) Hbf", "Mannheim", "Basel SBB",
+            "Dortmund", "Essen", "Düsseldorf, Flughafen", "Aachen", "Siegburg/Bonn"]
+
+
+def write_feed(path, lines, services):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("route_id,route_short_name,route_long_name,trip_headsign,headway_secs,"
+                "start_time,platform_code,agency_id\n")
+        for i in range(lines - 1):
+            s = i % services
+            via = STATIONS[s % len(STATIONS)] + ", " + STATIONS[(s * 7 + 3) % len(STATIONS)]
+            f.write(f"R{s},RE {s},\"{via}\",\"{STATIONS[(s * 5 + 1) % len(STATIONS)]}\","
+                    f"{(5 + s % 12 * 5) * 60},{s % 24:02d}:{s % 60:02d}:00,{s % 14 + 1},DB\n")
+
+
+async def upload(handle, path, body):
+    reader = asyncio.StreamReader()
+    reader.feed_data(f"PUT {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+    reader.feed_eof()
+    writer = MemoryWriter()
+    t0 = time.perf_counter()
+    await handle(reader, writer)
+    return time.perf_counter() - t0, bytes(writer.data).split(b"\r\n", 1)[0].decode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100000, help="Feed lines incl. header (default 100000).")
+    parser.add_argument("--services", type=int, default=400, help="Distinct services in the feed.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = os.path.join(tmp, "feed.csv")
+        write_feed(feed, args.lines, args.services)
+        feed_bytes = os.path.getsize(feed)
+
+        t0 = time.perf_counter()
+        with open(feed, "rb") as f:
+            table, reader = convert_feed(f)
+        convert_s = time.perf_counter() - t0
+
+        packed = io.BytesIO()
+        route_store.dump_routes(table, packed)
+        packed = packed.getvalue()
+        csv = "".join(web_ui.route_csv.iter_csv(table)).encode()
+
+        print(f"feed: {reader.lines} lines, {feed_bytes} bytes, {reader.skipped} skipped")
+        print(f"convert: {convert_s:.2f} s, {reader.lines / convert_s:,.0f} lines/s,"
+              f" {feed_bytes / convert_s / 1e6:.1f} MB/s -> {len(table)} routes")
+        print(f"compact route file: {len(packed)} bytes ({len(csv)} as CSV,"
+              f" {feed_bytes / len(packed):.0f}x smaller than the feed)")
+
+        cwd = os.getcwd()
+        os.chdir(tmp)  # route_store saves routes.bin in the working directory
+        try:
+            handle = web_ui.create_handler(None, 0, 0, _Renderer())
+            for path, body in (("/api/routes.bin", packed), ("/api/routes.csv", csv)):
+                dt, status = asyncio.run(upload(handle, path, body))
+                print(f"push {path}: {len(body)} bytes, {dt * 1e3:.1f} ms, {status},"
+                      f" board has {len(tt.ROUTES)} routes")
+        finally:
+            os.chdir(cwd)
+
+
+class _Renderer:
+    def request(self):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Per-frame draw-op counts: original render_board versus the compiled layout.
+
+The original renderer only knows 320x240, so it is measured there; the
+compiled layout is measured on every geometry in display_board.GEOMETRIES.
+Usage:
+    python3 tools/bench_layout.py [--frames 120]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+import display_board as db  # noqa: E402
+import timetable as tt  # noqa: E402
+from picographics import PicoGraphics  # noqa: E402
+
+
+def render_board_reference(display, timetable, fg_pen, bg_pen):
+    """Copy of render_board before layouts were compiled (320x240 only)."""
+    display.set_pen(bg_pen)
+    display.clear()
+
+    display.set_pen(fg_pen)
+    display.set_font("bitmap8")
+    x = 0
+    y = db.MARGIN_Y
+    for name, w, rev in db.COLS:
+        display.set_pen(bg_pen)
+        display.rectangle(x, y, w, db.HEADER_H)
+        avail = w - (3 if name in ("Über", "Ziel") else 4)
+        txt = db._truncate_to_width(str(name), avail)
+        tx = x + 2
+        ty = y + 3
+        if rev and txt:
+            txt_px = min(avail, len(txt) * 6 * db.SCALE)
+            display.set_pen(fg_pen)
+            display.rectangle(tx - db.HIGHLIGHT_MARGIN, ty - db.HIGHLIGHT_MARGIN,
+                              txt_px + 2 * db.HIGHLIGHT_MARGIN, db.GLYPH_H + 2 * db.HIGHLIGHT_MARGIN)
+            display.set_pen(bg_pen)
+        else:
+            display.set_pen(fg_pen)
+        display.text(txt, tx, ty, scale=db.SCALE)
+        display.set_pen(fg_pen)
+        display.line(0, y + db.HEADER_H, 319, y + db.HEADER_H)
+        x += w
+
+    y = db.MARGIN_Y + db.HEADER_H + 2
+    max_rows = max(0, (240 - y - 2) // db.ROW_H)
+    rows = timetable[:max_rows]
+
+    for row in rows:
+        x = 0
+        cells = [row.get("time", ""), row.get("train", ""), row.get("via", ""),
+                 row.get("dest", ""), row.get("track", "")]
+        row_text_y = y + max(0, (db.ROW_H - db.GLYPH_H) // 2)
+        for ((name, w, rev), cell) in zip(db.COLS, cells):
+            display.set_pen(bg_pen)
+            display.rectangle(x, y, w, db.ROW_H)
+            avail = w - 3
+            txt = db._truncate_to_width(str(cell or ""), avail)
+            tx = x + 2
+            ty = row_text_y
+            if rev and txt:
+                txt_px = min(avail, len(txt) * 6 * db.SCALE)
+                display.set_pen(fg_pen)
+                display.rectangle(tx - db.HIGHLIGHT_MARGIN, ty - db.HIGHLIGHT_MARGIN,
+                                  txt_px + 2 * db.HIGHLIGHT_MARGIN, db.GLYPH_H + 2 * db.HIGHLIGHT_MARGIN)
+                display.set_pen(bg_pen)
+            else:
+                display.set_pen(fg_pen)
+            display.text(txt, tx, ty, scale=db.SCALE)
+            x += w
+        display.set_pen(fg_pen)
+        display.line(0, y + db.ROW_H - 1, 319, y + db.ROW_H - 1)
+        y += db.ROW_H
+
+    display.update()
+
+
+class OpCounter:
+    """Display that only counts calls, so timings exclude pixel work."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.ops = 0
+
+    def measure_text(self, s, scale=1):
+        return len(s) * 6 * scale
+
+    def __getattr__(self, name):
+        def op(*args, **kwargs):
+            self.ops += 1
+        return op
+
+
+def measure(render, width, height, timetables):
+    display = OpCounter(width, height)
+    t0 = time.perf_counter()
+    for timetable in timetables:
+        render(display, timetable)
+    dt = (time.perf_counter() - t0) / len(timetables)
+    return display.ops / len(timetables), dt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=120, help="Minute ticks to render (default 120).")
+    args = parser.parse_args()
+
+    timetables = [tt.generate_timetable(tt.ROUTES.to_dicts(), m, 20) for m in range(args.frames)]
+    fg, bg = 1, 2
+
+    print(f"{'geometry':>16} {'renderer':>10} {'rows':>5} {'header ops':>11} {'ops/frame':>10} {'us/frame':>9}")
+    ops, dt = measure(lambda d, t: render_board_reference(d, t, fg, bg), 320, 240, timetables)
+    print(f"{'pico_display_2':>16} {'original':>10} {11:>5} {'-':>11} {ops:>10.1f} {dt * 1e6:>9.1f}")
+    for name, (width, height) in db.GEOMETRIES.items():
+        layout = db.compile_layout(width, height)
+        ops, dt = measure(lambda d, t: db.render_board(d, t, fg, bg, layout), width, height, timetables)
+        print(f"{name:>16} {'layout':>10} {layout.max_rows:>5} {len(layout.header_ops):>11} "
+              f"{ops:>10.1f} {dt * 1e6:>9.1f}")
+
+    # sanity: both renderers paint the same pixels on the Pico Display 2
+    ref = PicoGraphics(width=320, height=240)
+    new = PicoGraphics(width=320, height=240)
+    for display in (ref, new):
+        display.create_pen(30, 30, 255)
+        display.create_pen(255, 255, 255)
+    render_board_reference(ref, timetables[0], 2, 1)
+    db.render_board(new, timetables[0], 2, 1)
+    print(f"identical pixels on pico_display_2: {ref.digest() == new.digest()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Render benchmarks and golden-image checks on the headless PicoGraphics.
+
+Usage:
+    python3 tools/bench_render.py             # timings + golden check
+    python3 tools/bench_render.py --update    # rewrite tools/golden/render.json
+    python3 tools/bench_render.py --dump out  # also write each golden scene as PPM
+
+Exits non-zero when a scene's framebuffer digest differs from the golden file,
+or when the partial-redraw renderer ends on a different frame than render_board.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+import display_board as db  # noqa: E402
+import timetable as tt  # noqa: E402
+from bench_route_mem import make_route_dicts  # noqa: E402
+from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY_2  # noqa: E402
+
+GOLDEN = TOOLS / "golden" / "render.json"
+
+
+def new_display(**kwargs):
+    display = PicoGraphics(display=DISPLAY_PICO_DISPLAY_2, **kwargs)
+    bg = display.create_pen(30, 30, 255)
+    fg = display.create_pen(255, 255, 255)
+    return display, fg, bg
+
+
+def stretch(routes, factor):
+    """Repeat via/dest text `factor` times to exercise truncation."""
+    out = []
+    for r in routes:
+        r = dict(r)
+        r["via"] = ", ".join([r["via"]] * factor)
+        r["dest"] = " ".join([r["dest"]] * factor)
+        out.append(r)
+    return out
+
+
+def golden_scenes():
+    """name -> timetable rows for the golden-image set."""
+    demo = tt.ROUTES.to_dicts()
+    return {
+        "demo_0000": tt.generate_timetable(demo, 0, 20),
+        "demo_0805": tt.generate_timetable(demo, 8 * 60 + 5, 20),
+        "demo_2330": tt.generate_timetable(demo, 23 * 60 + 30, 20),
+        "long_text": tt.generate_timetable(stretch(demo, 3), 12 * 60, 20),
+        "short_list": tt.generate_timetable(demo, 0, 4),
+        "empty": [],
+    }
+
+
+def check_golden(update, dump_dir):
+    digests = {}
+    scenes = [(name, rows, "pico_display_2") for name, rows in golden_scenes().items()]
+    # the other geometries the layout compiler supports
+    for geometry in db.GEOMETRIES:
+        if geometry != "pico_display_2":
+            scenes.append((f"{geometry}_0805", golden_scenes()["demo_0805"], geometry))
+    for name, rows, geometry in scenes:
+        width, height = db.GEOMETRIES[geometry]
+        display, fg, bg = new_display(width=width, height=height)
+        db.render_board(display, rows, fg, bg, db.compile_layout(width, height))
+        digests[name] = display.digest()
+        if dump_dir:
+            Path(dump_dir).mkdir(parents=True, exist_ok=True)
+            (Path(dump_dir) / f"{name}.ppm").write_bytes(display.to_ppm())
+
+    failures = 0
+    if update:
+        GOLDEN.parent.mkdir(parents=True, exist_ok=True)
+        GOLDEN.write_text(json.dumps(digests, indent=2, sort_keys=True) + "\n")
+        print(f"wrote {len(digests)} golden digests to {GOLDEN}")
+    else:
+        expected = json.loads(GOLDEN.read_text()) if GOLDEN.exists() else {}
+        for name, digest in digests.items():
+            ok = expected.get(name) == digest
+            failures += not ok
+            print(f"golden {name:<24} {'ok' if ok else 'MISMATCH'}")
+
+    # partial redraws must converge on the same frame as a full redraw
+    display, fg, bg = new_display()
+    board = db.BoardRenderer(display, fg, bg)
+    for minute in range(0, 180):
+        board.render(tt.iter_departures(tt.ROUTES, minute))
+    ref, fg, bg = new_display()
+    db.render_board(ref, tt.iter_departures(tt.ROUTES, 179), fg, bg)
+    same = display.digest() == ref.digest()
+    failures += not same
+    print(f"BoardRenderer matches render_board after 180 ticks: {same}")
+    return failures
+
+
+def bench(n_routes, stretch_factor, rows, frames):
+    """Time render_board and BoardRenderer over `frames` minute ticks."""
+    routes = tt.RouteTable(stretch(make_route_dicts(n_routes), stretch_factor))
+    timetables = [tt.generate_timetable(routes, m, rows) for m in range(frames)]
+    results = []
+    for label in ("render_board", "BoardRenderer"):
+        display, fg, bg = new_display()
+        board = db.BoardRenderer(display, fg, bg) if label == "BoardRenderer" else None
+        if board:
+            board.render(timetables[0])  # the full first frame is not what we measure
+        display.reset_counters()
+        t0 = time.perf_counter()
+        for timetable in timetables:
+            if board:
+                board.render(timetable)
+            else:
+                db.render_board(display, timetable, fg, bg)
+        dt = (time.perf_counter() - t0) / frames
+        calls = sum(display.calls.values()) / frames
+        results.append((label, dt, calls, display.pixels_touched / frames))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="Rewrite the golden digests.")
+    parser.add_argument("--dump", metavar="DIR", help="Write golden scenes as PPM files into DIR.")
+    parser.add_argument("--frames", type=int, default=60, help="Minute ticks per benchmark (default 60).")
+    parser.add_argument("--no-bench", action="store_true", help="Only run the golden checks.")
+    args = parser.parse_args()
+
+    failures = check_golden(args.update, args.dump)
+
+    if not args.no_bench:
+        print()
+        print(f"{'routes':>7} {'text':>5} {'rows':>5} {'renderer':>14} {'ms/frame':>9} {'calls/frame':>12} {'px/frame':>9}")
+        for n_routes in (10, 100, 1000):
+            for factor in (1, 3):
+                for rows in (5, 20):
+                    for label, dt, calls, px in bench(n_routes, factor, rows, args.frames):
+                        print(f"{n_routes:>7} {'x' + str(factor):>5} {rows:>5} {label:>14} "
+                              f"{dt * 1e3:>9.2f} {calls:>12.1f} {px:>9.0f}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Heap used by routes as a list of dicts versus a compact RouteTable.
+
+Measures with gc.mem_free() before/after when run under MicroPython (unix
+port), and with tracemalloc on CPython. Usage:
+    python3 tools/bench_route_mem.py [--sizes 10,100,1000]
+"""
+import gc
+import sys
+
+try:
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+except ImportError:  # MicroPython: run from the repo root instead
+    pass
+
+import timetable as tt  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def _fresh(s):
+    # Force a distinct string object, as parsing a form or file would produce
+    return s.encode().decode()
+
+
+def make_route_dicts(n):
+    base = tt.ROUTES.to_dicts()
+    routes = []
+    for i in range(n):
+        src = base[i % len(base)]
+        routes.append({
+            "train": _fresh(src["train"]),
+            "via": _fresh(src["via"]),
+            "dest": _fresh(src["dest"]),
+            "frequency": src["frequency"],
+            "track": _fresh(src["track"]),
+            "offset": (src["offset"] + i) % 60,
+        })
+    return routes
+
+
+def measure(build):
+    """Return (bytes held by the result of build(), result)."""
+    gc.collect()
+    if hasattr(gc, "mem_free"):
+        before = gc.mem_free()
+        result = build()
+        gc.collect()
+        return before - gc.mem_free(), result
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used, result
+
+
+def main():
+    sizes = (10, 100, 1000)
+    for i, arg in enumerate(sys.argv):
+        if arg == "--sizes" and i + 1 < len(sys.argv):
+            sizes = [int(s) for s in sys.argv[i + 1].split(",") if s]
+
+    source = "gc.mem_free()" if hasattr(gc, "mem_free") else "tracemalloc"
+    print("heap bytes via", source)
+    print("{:>7} {:>12} {:>12} {:>8} {:>12} {:>12}".format(
+        "routes", "dicts", "RouteTable", "ratio", "20 rows dict", "20 rows view"))
+    for n in sizes:
+        dicts_bytes, dicts = measure(lambda: make_route_dicts(n))
+        table_bytes, table = measure(lambda: tt.RouteTable(dicts))
+        rows_dict, _ = measure(lambda: tt.generate_timetable(dicts, 0, 20))
+        rows_view, _ = measure(lambda: tt.generate_timetable(table, 0, 20))
+        print("{:>7} {:>12} {:>12} {:>7.1f}x {:>12} {:>12}".format(
+            n, dicts_bytes, table_bytes, dicts_bytes / max(1, table_bytes), rows_dict, rows_view))
+        del dicts, table
+
+
+if __name__ == "__main__":
+    main()
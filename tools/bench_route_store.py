@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Boot-time route loading: binary route_store format versus JSON.
+
+Usage:
+    python3 tools/bench_route_store.py [--routes 1000] [--repeat 20]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import route_store  # noqa: E402
+import timetable as tt  # noqa: E402
+from bench_route_mem import make_route_dicts  # noqa: E402
+
+
+def load_json(path):
+    with open(path, "rb") as f:
+        return tt.RouteTable(json.load(f))
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=1000, help="Number of routes (default 1000).")
+    parser.add_argument("--repeat", type=int, default=20, help="Repetitions; the best run is reported.")
+    args = parser.parse_args()
+
+    routes = make_route_dicts(args.routes)
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_path = str(Path(tmp) / "routes.bin")
+        json_path = str(Path(tmp) / "routes.json")
+        route_store.save_routes(routes, bin_path)
+        with open(json_path, "w") as f:
+            json.dump(routes, f)
+
+        assert route_store.load_routes(bin_path).to_dicts() == load_json(json_path).to_dicts()
+
+        t_bin = best_of(lambda: route_store.load_routes(bin_path), args.repeat)
+        t_json = best_of(lambda: load_json(json_path), args.repeat)
+        size_bin = Path(bin_path).stat().st_size
+        size_json = Path(json_path).stat().st_size
+
+    print(f"{args.routes} routes")
+    print(f"{'format':>8} {'bytes':>10} {'load ms':>10}")
+    print(f"{'binary':>8} {size_bin:>10} {t_bin * 1e3:>10.2f}")
+    print(f"{'json':>8} {size_json:>10} {t_json * 1e3:>10.2f}")
+    print(f"binary is {t_json / t_bin:.1f}x faster to load and {size_json / size_bin:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
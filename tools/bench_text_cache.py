@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""measure_text calls per frame with and without the text-fit LRU cache.
+
+Fits every board cell through util.fit_text on the headless PicoGraphics,
+which counts measure_text calls, over a run of minute ticks. Nothing on the
+render path calls fit_text at the moment (render_board and BoardRenderer
+truncate by character count, uncached); this measures the cache for
+display_board.safe_text callers only.
+Usage:
+    python3 tools/bench_text_cache.py [--frames 240]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent / "headless"))
+
+import display_board as db  # noqa: E402
+import timetable as tt  # noqa: E402
+import util  # noqa: E402
+from picographics import PicoGraphics  # noqa: E402
+
+
+def run(frames, maxsize):
+    util.TEXT_CACHE = util.LRUCache(maxsize)
+    display = PicoGraphics()
+    t0 = time.perf_counter()
+    for minute in range(frames):
+        for row in tt.generate_timetable(tt.ROUTES, minute, db.LAYOUT.max_rows):
+            for (_name, w, _rev), cell in zip(db.COLS, db._row_cells(row)):
+                util.fit_text(display, str(cell), w - 3, db.SCALE, db.FONT)
+    dt = time.perf_counter() - t0
+    return display.calls.get("measure_text", 0) / frames, dt / frames, util.TEXT_CACHE.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=240, help="Minute ticks to render (default 240).")
+    parser.add_argument("--maxsize", type=int, default=128, help="Cache size for the cached run.")
+    args = parser.parse_args()
+
+    print(f"{'cache':>8} {'measure/frame':>14} {'us/frame':>9} {'hits':>7} {'misses':>7} {'size':>5}")
+    for label, maxsize in (("off", 0), ("on", args.maxsize)):
+        calls, dt, stats = run(args.frames, maxsize)
+        print(f"{label:>8} {calls:>14.1f} {dt * 1e6:>9.1f} {stats['hits']:>7} {stats['misses']:>7} {stats['size']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Compare the old linear-scan timetable engine, the heap merge engine and the compiled index.
+
+Runs on the desktop (CPython). Usage:
+    python3 tools/bench_timetable.py [--limit 20] [--repeat 5]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import timetable as tt  # noqa: E402
+
+
+def generate_timetable_scan(routes, start_minutes=0, limit=20):
+    """Reference copy of the original O(limit x routes) engine.
+
+    It keeps counting across midnight, so it only matches the current engines
+    for frequencies that divide 24h (as make_routes() picks).
+    """
+    start = int(start_minutes) % (24 * 60)
+    next_times = []
+    for idx, route in enumerate(routes):
+        try:
+            freq = int(route.get("frequency", 60))
+        except Exception:
+            freq = 60
+        if freq <= 0:
+            continue
+        try:
+            offset = int(route.get("offset", 0)) % freq
+        except Exception:
+            offset = 0
+        base = ((max(0, start - offset) // freq) * freq) + offset
+        if base < start:
+            base += freq
+        next_times.append([base, idx, freq])
+
+    entries = []
+    if not next_times:
+        return entries
+
+    while len(entries) < limit:
+        min_i = 0
+        min_t = next_times[0][0]
+        for i in range(1, len(next_times)):
+            if next_times[i][0] < min_t:
+                min_t = next_times[i][0]
+                min_i = i
+        dep_time, route_idx, freq = next_times[min_i]
+        route = routes[route_idx]
+        mm_tot = dep_time % (24 * 60)
+        hh = mm_tot // 60
+        mm = mm_tot % 60
+        entries.append({
+            "time": f"{hh:02d}:{mm:02d}",
+            "train": route.get("train", ""),
+            "via": route.get("via", ""),
+            "dest": route.get("dest", ""),
+            "track": str(route.get("track", "")),
+        })
+        next_times[min_i][0] = dep_time + freq
+
+    return entries
+
+
+def index_rows(index, routes, start_minutes, limit):
+    """Collect `limit` rows from a DepartureIndex, as iter_departures() does."""
+    rows = []
+    for dep_time, route_idx in index.stream(start_minutes):
+        rows.append(tt._row(routes, route_idx, dep_time))
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def make_routes(n, seed=1):
+    """Build `n` synthetic routes by cycling the demo routes with random timings."""
+    rnd = random.Random(seed)
+    base = tt.ROUTES
+    routes = []
+    for i in range(n):
+        src = base[i % len(base)]
+        routes.append({
+            "train": f"{src['train']}-{i}",
+            "via": src["via"],
+            "dest": src["dest"],
+            "frequency": rnd.choice((5, 10, 15, 20, 30, 60, 120, 180)),
+            "track": src["track"],
+            "offset": rnd.randrange(0, 60),
+        })
+    return routes
+
+
+def _time_per_call(fn, routes, limit, repeat):
+    starts = range(0, 24 * 60, 97)  # a spread of start minutes across the day
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for s in starts:
+            fn(routes, s, limit)
+        dt = (time.perf_counter() - t0) / len(starts)
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=20, help="Rows generated per call (default 20).")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions; the best run is reported.")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated route counts.")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    print(f"{'routes':>8} {'scan us':>12} {'heap us':>12} {'speedup':>8}  same"
+          f" {'index us':>10} {'compile ms':>11} {'index KB':>9}")
+    for n in sizes:
+        routes = make_routes(n)
+        same = all(
+            generate_timetable_scan(routes, s, args.limit) == tt.generate_timetable(routes, s, args.limit)
+            for s in (0, 59, 719, 1439)
+        )
+        scan = _time_per_call(generate_timetable_scan, routes, args.limit, args.repeat)
+        heap = _time_per_call(tt.generate_timetable, routes, args.limit, args.repeat)
+        line = f"{n:>8} {scan * 1e6:>12.1f} {heap * 1e6:>12.1f} {scan / heap:>7.1f}x  {same!s:>4}"
+
+        # Compiled index, ignoring the device heap budget so every size is measured
+        t0 = time.perf_counter()
+        index = tt.compile_index(routes, max_bytes=1 << 30)
+        compile_s = time.perf_counter() - t0
+        lookup = _time_per_call(lambda _r, s, lim: index_rows(index, routes, s, lim), routes, args.limit, args.repeat)
+        fits = "" if index.nbytes() <= tt.INDEX_MAX_BYTES else " (over budget -> fallback)"
+        line += f" {lookup * 1e6:>10.1f} {compile_s * 1e3:>11.1f} {index.nbytes() / 1024:>9.1f}{fits}"
+        print(line)
+
+    # frequencies that do not divide 24h restart at midnight in both engines
+    routes = [dict(r, frequency=f) for r, f in zip(make_routes(6, seed=2), (7, 11, 13, 100, 333, 1000))]
+    index = tt.compile_index(routes, max_bytes=1 << 30)
+    same = all(index_rows(index, routes, s, 200) == tt.generate_timetable(routes, s, 200) for s in (0, 719, 1430, 1439))
+    print(f"index and heap agree across midnight for odd frequencies: {same}")
+
+
+if __name__ == "__main__":
+    main()
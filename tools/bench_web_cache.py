@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""GET / latency through web_ui's handler: cold cache, warm cache and 304.
+
+Cold bumps tt.ROUTES_VERSION before every request (as /save does), warm
+reuses the cached page, and 304 revalidates with the ETag a browser would
+send. Requests go through the real handler with in-memory streams. Usage:
+    python3 tools/bench_web_cache.py [--requests 200] [--sizes 10,100]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+import timetable as tt  # noqa: E402
+import web_ui  # noqa: E402
+from bench_route_mem import make_route_dicts  # noqa: E402
+
+
+class MemoryWriter:
+    def __init__(self):
+        self.data = bytearray()
+
+    async def awrite(self, data):
+        self.data += data
+
+    async def aclose(self):
+        pass
+
+
+async def request(handle, path, extra=""):
+    reader = asyncio.StreamReader()
+    reader.feed_data(f"GET {path} HTTP/1.1\r\nHost: trainboard\r\n{extra}\r\n".encode())
+    reader.feed_eof()
+    writer = MemoryWriter()
+    await handle(reader, writer)
+    return bytes(writer.data)
+
+
+async def timed(handle, n, path, extra="", before=None):
+    """Return (mean ms per request, response size, status line)."""
+    total = 0.0
+    resp = b""
+    for _ in range(n):
+        if before:
+            before()
+        t0 = time.perf_counter()
+        resp = await request(handle, path, extra)
+        total += time.perf_counter() - t0
+    return total * 1e3 / n, len(resp), resp.split(b"\r\n", 1)[0].decode()
+
+
+def bump():
+    tt.ROUTES_VERSION += 1
+
+
+async def run(n, sizes):
+    handle = web_ui.create_handler(None, 0, 0)
+    print(f"{'routes':>7} {'case':<12} {'ms/req':>8} {'bytes':>8}  status")
+    for size in sizes:
+        tt.set_routes(make_route_dicts(size))
+        cases = [
+            ("cold", await timed(handle, n, "/", before=bump)),
+            ("warm", await timed(handle, n, "/")),
+            ("304", await timed(handle, n, "/", f"If-None-Match: {web_ui.page_etag()}\r\n")),
+        ]
+        for name, (ms, nbytes, status) in cases:
+            print(f"{size:>7} {name:<12} {ms:>8.3f} {nbytes:>8}  {status}")
+    css = "/static/board.css?v=" + web_ui.ASSETS["/static/board.css"][1]
+    for name, extra in (("css plain", ""), ("css gzip", "Accept-Encoding: gzip\r\n")):
+        ms, nbytes, status = await timed(handle, n, css, extra)
+        print(f"{'':>7} {name:<12} {ms:>8.3f} {nbytes:>8}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per case (default 200).")
+    parser.add_argument("--sizes", default="10,100", help="Comma-separated route counts.")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, [int(s) for s in args.sizes.split(",")]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Load test for web_ui's HTTP server on localhost: throughput, latency, errors, memory.
+
+The board side runs unchanged in a child process: create_handler() behind
+uasyncio.start_server() (tools/headless), with the render task, minute
+updater and SSE broadcaster wired as in main.py and a fast virtual clock,
+so requests overlap with rendering. Concurrent keep-alive clients then
+drive it with a weighted request mix:
+
+    page     GET /                    (cached or streamed admin page)
+    304      GET / with If-None-Match (revalidation)
+    static   GET /static/board.css    (gzip)
+    api      GET /api/routes
+    save     POST /save               (form with --save-rows routes)
+    csv      PUT /api/routes.csv      (import of --csv-rows routes)
+
+Reports requests/s, p50/p95/p99 latency per kind, status and connection
+error counts, the server's peak traced heap and the event loop's lag while
+loaded. CPython timings of the board code, not Pico timings; heap
+tracking slows the server, so take throughput from a --no-tracemalloc
+run. It runs entirely offline. Usage:
+    python3 tools/bench_web_load.py [--clients 8] [--duration 5] [--mix page=60,save=10,...]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+DEFAULT_MIX = "page=50,304=15,static=15,api=10,save=8,csv=2"
+LAG_PROBE_MS = 10
+TICKS_PERIOD = 1 << 30
+
+
+def install_ticks():
+    """Give the time module MicroPython's ticks API, on the monotonic clock."""
+    time.ticks_ms = lambda: int(time.monotonic() * 1000) % TICKS_PERIOD
+    time.ticks_us = lambda: int(time.monotonic() * 1_000_000) % TICKS_PERIOD
+    time.ticks_add = lambda t, delta: (t + delta) % TICKS_PERIOD
+    time.ticks_diff = lambda a, b: ((a - b + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+# ---------- board side (child process) ----------
+
+def serve(pipe, routes, time_factor, trace):
+    """Run the board's server until the parent asks for stats."""
+    install_ticks()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # route_store saves routes.bin in the working directory
+        if trace:
+            tracemalloc.start()
+        asyncio.run(_serve(pipe, routes, time_factor, trace))
+
+
+async def _serve(pipe, routes, time_factor, trace):
+    import uasyncio
+    import timetable as tt
+    import web_ui
+    from board_events import BoardBroadcaster
+    from bench_route_mem import make_route_dicts
+    from display_board import BoardRenderer, compile_layout
+    from picographics import PicoGraphics
+    from render_queue import RenderQueue
+    from vclock import VirtualClock
+
+    tt.set_routes(make_route_dicts(routes))
+    display = PicoGraphics()
+    bg = display.create_pen(30, 30, 255)
+    fg = display.create_pen(255, 255, 255)
+    clock = VirtualClock(time_factor)
+    board = BoardRenderer(display, fg, bg, compile_layout(*display.get_bounds()))
+    events = BoardBroadcaster(board.layout.max_rows)
+    renderer = RenderQueue(board, tt.TimetableWindow(20), clock, events.publish)
+    renderer.request()
+    tasks = [asyncio.create_task(renderer.run())]
+
+    async def updater():
+        while True:
+            await clock.wait()
+            renderer.request()
+
+    lags = []
+
+    async def lag_probe():
+        # how late a short sleep wakes up: the loop is busy with handlers or rendering
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(LAG_PROBE_MS / 1000)
+            lags.append(max(0.0, (time.perf_counter() - t0) * 1e3 - LAG_PROBE_MS))
+
+    tasks += [asyncio.create_task(updater()), asyncio.create_task(lag_probe())]
+    handle = web_ui.create_handler(display, fg, bg, renderer, events=events)
+    server = await uasyncio.start_server(handle, "127.0.0.1", 0, backlog=web_ui.LISTEN_BACKLOG)
+    pipe.send(server.sockets[0].getsockname()[1])
+
+    while not pipe.poll():
+        await asyncio.sleep(0.05)
+    pipe.recv()
+    server.close()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    lags.sort()
+    pipe.send({
+        "peak_heap_bytes": tracemalloc.get_traced_memory()[1] if trace else None,
+        "routes_at_end": len(tt.ROUTES),
+        "render": renderer.stats(),
+        "loop_lag_ms": {"p50": percentile(lags, 50), "p99": percentile(lags, 99),
+                        "max": lags[-1] if lags else 0.0},
+    })
+
+
+# ---------- clients ----------
+
+def build_requests(save_rows, csv_rows):
+    """Raw request bytes per kind; clients add If-None-Match to "304" themselves."""
+    import route_csv
+    import timetable as tt
+    import web_ui
+    from bench_form import form_body
+    from bench_route_mem import make_route_dicts
+
+    form = form_body(save_rows)
+    table = tt.RouteTable()
+    for r in make_route_dicts(csv_rows):
+        table.append(r)
+    csv = "".join(route_csv.iter_csv(table)).encode()
+    css = "/static/board.css?v=" + web_ui.ASSETS["/static/board.css"][1]
+    head = "Host: trainboard\r\n"
+    return {
+        "page": f"GET / HTTP/1.1\r\n{head}\r\n".encode(),
+        "304": f"GET / HTTP/1.1\r\n{head}\r\n".encode(),
+        "static": f"GET {css} HTTP/1.1\r\n{head}Accept-Encoding: gzip\r\n\r\n".encode(),
+        "api": f"GET /api/routes HTTP/1.1\r\n{head}\r\n".encode(),
+        "save": (f"POST /save HTTP/1.1\r\n{head}Content-Type: application/x-www-form-urlencoded\r\n"
+                 f"Content-Length: {len(form)}\r\n\r\n").encode() + form,
+        "csv": (f"PUT /api/routes.csv HTTP/1.1\r\n{head}Content-Type: text/csv\r\n"
+                f"Content-Length: {len(csv)}\r\n\r\n").encode() + csv,
+    }
+
+
+async def read_response(reader):
+    """Read one response; return (status, headers, body length)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        size = 0
+        while True:
+            n = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(n + 2)
+            size += n
+            if n == 0:
+                return status, headers, size
+    if "content-length" in headers:
+        n = int(headers["content-length"])
+        await reader.readexactly(n)
+        return status, headers, n
+    if status in (204, 304) or headers.get("connection") != "close":
+        return status, headers, 0
+    return status, headers, len(await reader.read())
+
+
+class Results:
+    def __init__(self):
+        self.latency = {}  # kind -> [ms]
+        self.statuses = {}  # status or error name -> count
+        self.connects = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def count(self, key):
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+
+async def client(port, requests, kinds, weights, deadline, limit, results, seed, keep_alive, timeout):
+    """One browser-like client: a connection reused for as long as the server allows."""
+    import uasyncio
+
+    rnd = random.Random(seed)
+    reader = writer = None
+    etag = None  # last page ETag seen, as a browser would keep it
+    while time.perf_counter() < deadline and limit[0] > 0:
+        limit[0] -= 1
+        kind = rnd.choices(kinds, weights)[0]
+        raw = requests[kind]
+        if kind == "304" and etag:
+            raw = raw.replace(b"\r\n\r\n", b"\r\nIf-None-Match: " + etag + b"\r\n\r\n", 1)
+        if not keep_alive:
+            raw = raw.replace(b"\r\n\r\n", b"\r\nConnection: close\r\n\r\n", 1)
+        t0 = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(uasyncio.open_connection("127.0.0.1", port), timeout)
+                results.connects += 1
+            await writer.awrite(raw)
+            status, headers, size = await asyncio.wait_for(read_response(reader), timeout)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, OSError) as e:
+            results.count(type(e).__name__)
+            if writer is not None:
+                await writer.aclose()
+            reader = writer = None
+            continue
+        results.latency.setdefault(kind, []).append((time.perf_counter() - t0) * 1e3)
+        results.count(status)
+        results.bytes_sent += len(raw)
+        results.bytes_received += size
+        if kind in ("page", "304") and "etag" in headers:
+            etag = headers["etag"].encode()
+        if headers.get("connection", "").lower() == "close":
+            await writer.aclose()
+            reader = writer = None
+    if writer is not None:
+        await writer.aclose()
+
+
+async def drive(port, requests, mix, clients, duration, total, keep_alive, timeout, seed):
+    results = Results()
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    limit = [total or float("inf")]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, requests, kinds, weights, t0 + duration, limit, results, seed + i, keep_alive, timeout)
+        for i in range(clients)))
+    return results, time.perf_counter() - t0
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("page", "304", "static", "api", "save", "csv"):
+            raise SystemExit(f"unknown request kind in --mix: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients (default 8).")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to run (default 5).")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests instead.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request kinds (default {DEFAULT_MIX}).")
+    parser.add_argument("--routes", type=int, default=20, help="Routes on the board at start (default 20).")
+    parser.add_argument("--save-rows", type=int, default=20, help="Routes posted by each save (default 20).")
+    parser.add_argument("--csv-rows", type=int, default=200, help="Routes in each CSV import (default 200).")
+    parser.add_argument("--no-keep-alive", action="store_true", help="One request per connection.")
+    parser.add_argument("--time-factor", type=float, default=600.0,
+                        help="Virtual clock speed; higher renders more often (default 600).")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="Skip the server's heap tracking, which slows it several times over.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    requests = build_requests(args.save_rows, args.csv_rows)
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(
+        target=serve, args=(child, args.routes, args.time_factor, not args.no_tracemalloc), daemon=True)
+    proc.start()
+    try:
+        port = parent.recv()
+        results, wall = asyncio.run(drive(
+            port, requests, mix, args.clients, args.duration, args.requests,
+            not args.no_keep_alive, args.timeout, args.seed))
+        parent.send("stop")
+        server = parent.recv()
+    finally:
+        proc.join(5)
+        if proc.is_alive():
+            proc.terminate()
+
+    done = sum(len(v) for v in results.latency.values())
+    every = sorted(ms for v in results.latency.values() for ms in v)
+    report = {
+        "clients": args.clients,
+        "keep_alive": not args.no_keep_alive,
+        "wall_seconds": round(wall, 3),
+        "requests": done,
+        "requests_per_s": round(done / wall, 1) if wall else None,
+        "connections": results.connects,
+        "bytes_sent": results.bytes_sent,
+        "bytes_received": results.bytes_received,
+        "statuses": {str(k): v for k, v in sorted(results.statuses.items(), key=str)},
+        "errors": sum(v for k, v in results.statuses.items() if not isinstance(k, int) or k >= 400),
+        "latency_ms": {},
+        "server": server,
+    }
+    for kind, values in [("all", every)] + sorted(results.latency.items()):
+        values = sorted(values)
+        report["latency_ms"][kind] = {
+            "n": len(values),
+            "p50": round(percentile(values, 50), 2),
+            "p95": round(percentile(values, 95), 2),
+            "p99": round(percentile(values, 99), 2),
+            "max": round(values[-1], 2) if values else 0.0,
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{done} requests in {wall:.2f} s from {args.clients} clients"
+          f" ({report['requests_per_s']} req/s, {results.connects} connections,"
+          f" keep-alive {'on' if report['keep_alive'] else 'off'})")
+    print(f"statuses: {report['statuses']}  errors: {report['errors']}")
+    print(f"{'kind':<8} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, s in report["latency_ms"].items():
+        print(f"{kind:<8} {s['n']:>6} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f} {s['max']:>8.2f}")
+    lag = server["loop_lag_ms"]
+    print(f"server: peak heap {server['peak_heap_bytes']} bytes, loop lag p50 {lag['p50']:.2f}"
+          f" / p99 {lag['p99']:.2f} / max {lag['max']:.2f} ms, render {server['render']},"
+          f" {server['routes_at_end']} routes at end")
+
+
+if __name__ == "__main__":
+    main()
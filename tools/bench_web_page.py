@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Peak heap of GET / versus route count: buffered page versus chunked stream.
+
+The buffered path is the original render_page() + Content-Length response;
+the streamed path is what web_ui serves now. Both write into a writer that
+drops the bytes, so only the page building is measured. Usage:
+    python3 tools/bench_web_page.py [--sizes 10,100,300,1000]
+"""
+import argparse
+import asyncio
+import sys
+import tracemalloc
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+import timetable as tt  # noqa: E402
+import web_ui  # noqa: E402
+from bench_route_mem import make_route_dicts  # noqa: E402
+
+
+class NullWriter:
+    def __init__(self):
+        self.bytes = 0
+
+    async def awrite(self, data):
+        self.bytes += len(data)
+
+
+def render_page_reference():
+    """The page built the way render_page() did before streaming."""
+    rows_html = []
+    for row in tt.ROUTES:
+        rows_html.append(web_ui._route_row(row))
+    rows = "\n".join(rows_html) or web_ui._EMPTY_ROW
+    html = f"{web_ui._PAGE_HEAD}{rows}{web_ui._PAGE_TAIL}"
+    return html.encode()
+
+
+async def serve_buffered(writer):
+    body = render_page_reference()
+    resp = web_ui.http_response(
+        "HTTP/1.1 200 OK",
+        {"Content-Type": "text/html; charset=utf-8", "Connection": "close",
+         "Content-Length": str(len(body))},
+        body,
+    )
+    await writer.awrite(resp)
+
+
+async def serve_streamed(writer):
+    resp = web_ui.http_response(
+        "HTTP/1.1 200 OK",
+        {"Content-Type": "text/html; charset=utf-8", "Connection": "close",
+         "Transfer-Encoding": "chunked"},
+        b"",
+    )
+    await writer.awrite(resp)
+    await web_ui.write_chunked(writer, web_ui.iter_page())
+
+
+def peak(serve):
+    """Return (peak bytes allocated while serving, bytes written)."""
+    writer = NullWriter()
+    result = []
+
+    async def measured():
+        # measure from inside the loop so asyncio's own setup is not counted
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        await serve(writer)
+        result.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+
+    asyncio.run(measured())
+    return result[0], writer.bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,300,1000", help="Comma-separated route counts.")
+    args = parser.parse_args()
+
+    print(f"{'routes':>7} {'page bytes':>11} {'buffered peak':>14} {'streamed peak':>14}")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        tt.set_routes(make_route_dicts(n))
+        buffered, size = peak(serve_buffered)
+        streamed, _ = peak(serve_streamed)
+        print(f"{n:>7} {size:>11} {buffered:>14} {streamed:>14}")
+
+
+if __name__ == "__main__":
+    main()
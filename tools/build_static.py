@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Pre-compress static/ into static_assets.py for the board's web server.
+
+MicroPython cannot gzip on the device, so the CSS/JS are compressed here
+and shipped as bytes literals alongside their ETags. Re-run after editing
+anything in static/:
+    python3 tools/build_static.py
+"""
+import gzip
+import hashlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCES = {
+    "board.css": "text/css; charset=utf-8",
+    "board.js": "application/javascript; charset=utf-8",
+    "live.js": "application/javascript; charset=utf-8",
+}
+
+
+def build():
+    lines = [
+        "# Generated by tools/build_static.py from static/; do not edit.",
+        "# path: (content type, etag, gzip bytes, plain bytes)",
+        "ASSETS = {",
+    ]
+    for name, ctype in SOURCES.items():
+        raw = (ROOT / "static" / name).read_bytes()
+        # mtime=0 keeps the output (and the repo diff) reproducible
+        gz = gzip.compress(raw, compresslevel=9, mtime=0)
+        etag = hashlib.sha256(raw).hexdigest()[:12]
+        lines.append(f"    {'/static/' + name!r}: ({ctype!r}, {etag!r},")
+        lines.append(f"        {gz!r},")
+        lines.append(f"        {raw!r}),")
+        print(f"{name}: {len(raw)} -> {len(gz)} bytes gzipped, etag {etag}")
+    lines.append("}")
+    (ROOT / "static_assets.py").write_text("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Check upload_to_pico.py against a stub mpremote that deploys into a temp dir.
+
+The stub is a small script handed to upload_to_pico through the MPREMOTE
+env var (or called directly by the functions). It logs its argv, applies
+cat/cp/rm to one directory per "board", lists the boards for `connect
+list` next to a non-Pico serial adapter, and can be told to be slow, to
+fail its first few copies, or to fail copies that mention a given name.
+The checks cover the incremental deploy (one chained session, no-op runs,
+deletions, board-written files left alone), the manifest handling of a
+full upload, and fleet mode (discovery, retries with backoff, the
+per-board summary and exit status). Exits 1 if any check fails. Usage:
+    python3 tools/deploy_check.py [-v]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+
+import upload_to_pico as up  # noqa: E402
+
+STUB = r'''
+import json, os, shutil, sys, time
+root = os.environ["STUB_ROOT"]
+args = sys.argv[1:]
+port = "ttyACM0"
+if args[:2] == ["connect", "list"]:
+    for name in sorted(os.listdir(os.path.join(root, "boards"))):
+        print(f"/dev/{name} e6605838{len(name):08x} 2e8a:0005 MicroPython Board in FS mode")
+    print("/dev/ttyUSB0 A10K2VXP 0403:6001 FTDI FT232R USB UART")
+    sys.exit(0)
+if args[:1] == ["connect"]:
+    port, args = os.path.basename(args[1]), args[2:]
+with open(os.path.join(root, "log"), "a") as f:
+    f.write(json.dumps([time.time(), port] + args) + "\n")
+board = os.path.join(root, "boards", port)
+if not os.path.isdir(board):
+    sys.exit(f"failed to access /dev/{port}")
+behave = {}
+if os.path.exists(os.path.join(root, "behave.json")):
+    with open(os.path.join(root, "behave.json")) as f:
+        behave = json.load(f).get(port, {})
+time.sleep(behave.get("delay", 0))
+if "cp" in args and any(behave.get("fail_cp", "\0") in a for a in args):
+    sys.exit("mpremote: could not enter raw repl")
+if "cp" in args and behave.get("fail", 0):
+    failed = os.path.join(root, port + ".failed")
+    count = int(open(failed).read()) if os.path.exists(failed) else 0
+    if count < behave["fail"]:
+        with open(failed, "w") as f:
+            f.write(str(count + 1))
+        sys.exit("mpremote: could not enter raw repl")
+session = [[]]
+for a in args:
+    if a == "+":
+        session.append([])
+    else:
+        session[-1].append(a)
+for cmd in session:
+    if cmd[:1] == ["cat"]:
+        path = os.path.join(board, cmd[1][1:])
+        if not os.path.exists(path):
+            sys.exit(f"cat: {cmd[1]}: no such file")
+        with open(path) as f:
+            sys.stdout.write(f.read())
+    elif cmd[:1] == ["cp"]:
+        *srcs, dst = cmd[1:]
+        for src in srcs:
+            name = dst[1:] if dst != ":" else os.path.basename(src)
+            shutil.copy(src, os.path.join(board, name))
+    elif cmd[:1] == ["rm"]:
+        for path in cmd[1:]:
+            try:
+                os.remove(os.path.join(board, path[1:]))
+            except OSError:
+                sys.exit(f"rm: {path}: no such file")
+    elif cmd not in ([], ["soft-reset"]):
+        sys.exit(f"stub mpremote: unsupported {cmd}")
+'''
+
+
+class StubMpremote:
+    """A stub mpremote in a temp dir: boards are directories, every call is logged."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        root.mkdir()
+        self.cmd = str(root / "mpremote")
+        (root / "mpremote").write_text(f"#!{sys.executable}\n{STUB}")
+        os.chmod(self.cmd, 0o755)
+        (root / "boards").mkdir()
+        os.environ["STUB_ROOT"] = str(root)
+
+    def add_board(self, port: str, **behave) -> Path:
+        board = self.root / "boards" / port
+        board.mkdir()
+        self.behave(port, **behave)
+        return board
+
+    def behave(self, port: str, **behave) -> None:
+        path = self.root / "behave.json"
+        table = json.loads(path.read_text()) if path.exists() else {}
+        table[port] = behave
+        path.write_text(json.dumps(table))
+
+    def calls(self, times: bool = False) -> list[list]:
+        """Logged calls as [port, *args] (with times, [start time, port, *args]); clears the log."""
+        log = self.root / "log"
+        if not log.exists():
+            return []
+        lines = log.read_text().splitlines()
+        log.unlink()
+        return [json.loads(line)[0 if times else 1:] for line in lines]
+
+
+def board_files(board: Path) -> dict[str, str]:
+    return {p.name: p.read_text() for p in sorted(board.iterdir())}
+
+
+def write_project(project: Path, files: dict[str, str]) -> list[Path]:
+    for p in project.iterdir():
+        p.unlink()
+    for name, text in files.items():
+        (project / name).write_text(text)
+    return sorted(project.iterdir())
+
+
+def run_checks(check, tmp: Path):
+    stub = StubMpremote(tmp / "stub")
+    board = stub.add_board("ttyACM0")
+    project = tmp / "project"
+    project.mkdir()
+    quiet = dict(log=lambda message: None, quiet=True)
+
+    # incremental deploy to an empty board: read the manifest, then one session
+    files = write_project(project, {"main.py": "run()", "util.py": "u = 1", "web_ui.py": "w = 1"})
+    result = up.sync_files_to_pico(files, stub.cmd, None, **quiet)
+    calls = stub.calls()
+    check("first incremental deploy copies everything", result == (3, 0), result)
+    check("  manifest read + one chained session",
+          len(calls) == 2 and calls[0][1:] == ["cat", f":{up.MANIFEST_NAME}"]
+          and calls[1].count("+") == 2 and calls[1][-1] == "soft-reset", calls)
+    check("  board holds the files and the manifest",
+          set(board_files(board)) == {"main.py", "util.py", "web_ui.py", up.MANIFEST_NAME}, list(board_files(board)))
+
+    # the board writes its own data; nothing deployed has changed
+    (board / "routes.bin").write_text("board data")
+    result = up.sync_files_to_pico(files, stub.cmd, None, **quiet)
+    calls = stub.calls()
+    check("unchanged project is a no-op", result == (0, 0), result)
+    check("  only the manifest is read", [c[1] for c in calls] == ["cat"], calls)
+
+    # change one file, delete another
+    files = write_project(project, {"main.py": "run()", "util.py": "u = 2"})
+    result = up.sync_files_to_pico(files, stub.cmd, None, dry_run=True, **quiet)
+    calls = stub.calls()
+    check("dry run reports without touching the board",
+          result == (0, 0) and [c[1] for c in calls] == ["cat"] and "web_ui.py" in board_files(board), calls)
+    result = up.sync_files_to_pico(files, stub.cmd, None, **quiet)
+    calls = stub.calls()
+    session = calls[-1][1:] if calls else []
+    check("changed file copied, deleted file removed", result == (1, 1), result)
+    check("  in one session: cp util.py + rm web_ui.py",
+          len(calls) == 2 and session[:3] == ["cp", str(project / "util.py"), ":"]
+          and session[4:6] == ["rm", ":web_ui.py"], session)
+    on_board = board_files(board)
+    check("  board matches the project", on_board.get("util.py") == "u = 2" and "web_ui.py" not in on_board,
+          list(on_board))
+    check("  routes.bin written by the board is kept", on_board.get("routes.bin") == "board data", list(on_board))
+
+    # a full upload rewrites the manifest, and never leaves a stale one behind
+    files = write_project(project, {"main.py": "run(2)", "util.py": "u = 3"})
+    count = up.upload_files_to_pico(files, stub.cmd, None, **quiet)
+    stub.calls()
+    manifest = json.loads(board_files(board)[up.MANIFEST_NAME])
+    check("full upload records a fresh manifest", count == 2 and manifest == up.build_manifest(files), manifest)
+
+    files = write_project(project, {"main.py": "run(3)", "util.py": "u = 3"})
+    stub.behave("ttyACM0", fail_cp=up.MANIFEST_NAME)
+    try:
+        up.upload_files_to_pico(files, stub.cmd, None, **quiet)
+        raised = False
+    except subprocess.CalledProcessError:
+        raised = True
+    stub.behave("ttyACM0")
+    stub.calls()
+    check("failed manifest write fails the upload", raised)
+    check("  and leaves no stale manifest", up.MANIFEST_NAME not in board_files(board), list(board_files(board)))
+    result = up.sync_files_to_pico(files, stub.cmd, None, **quiet)
+    stub.calls()
+    check("  so the next incremental run copies everything", result == (2, 0), result)
+
+    # end to end through MPREMOTE and the command line
+    env = dict(os.environ, MPREMOTE=stub.cmd)
+    cli = [sys.executable, str(TOOLS.parent / "upload_to_pico.py"), "--incremental", "--device", "/dev/ttyACM1"]
+    board = stub.add_board("ttyACM1")
+    first = subprocess.run(cli, env=env, capture_output=True, text=True)
+    second = subprocess.run(cli, env=env, capture_output=True, text=True)
+    calls = stub.calls()
+    check("CLI --incremental deploys the repo via MPREMOTE",
+          first.returncode == 0 and "main.py" in board_files(board), first.stdout + first.stderr)
+    check("  second run is up to date in one call",
+          second.returncode == 0 and "up to date" in second.stdout and len(calls) == 3, second.stdout)
+
+
+def run_fleet_checks(check, tmp: Path):
+    stub = StubMpremote(tmp / "fleet")
+    boards = {
+        "ttyACM0": stub.add_board("ttyACM0"),
+        "ttyACM1": stub.add_board("ttyACM1", delay=0.5),  # slow
+        "ttyACM2": stub.add_board("ttyACM2", fail=1),  # flaky: first copy fails
+        "ttyACM3": stub.add_board("ttyACM3", fail=99),  # dead
+    }
+    ports = [f"/dev/{name}" for name in boards]
+    found = up.discover_devices(stub.cmd)
+    stub.calls()
+    check("discovery lists the Picos, not the FTDI adapter", found == ports, found)
+
+    # backoff doubles from --backoff; count the sleeps instead of taking them
+    project = tmp / "fleet-project"
+    project.mkdir()
+    files = write_project(project, {"main.py": "run()"})
+    sleeps = []
+    sleep, up.time.sleep = up.time.sleep, sleeps.append
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = up.deploy_device(files, stub.cmd, "/dev/ttyACM3", incremental=True, retries=3, backoff=0.5)
+    finally:
+        up.time.sleep = sleep
+    stub.calls()
+    check("dead board: retries, then gives up", not result["ok"] and result["attempts"] == 4, result)
+    check("  backoff 0.5, 1, 2 s between attempts", sleeps == [0.5, 1.0, 2.0], sleeps)
+    check("  detail is mpremote's error line", result["detail"] == "mpremote: could not enter raw repl",
+          result["detail"])
+
+    # the whole fleet through the command line
+    env = dict(os.environ, MPREMOTE=stub.cmd)
+    cli = [sys.executable, str(TOOLS.parent / "upload_to_pico.py"), "--all", "--incremental",
+           "--jobs", "4", "--retries", "2", "--backoff", "0"]
+    run = subprocess.run(cli, env=env, capture_output=True, text=True)
+    timed = stub.calls(times=True)
+    calls = [c[1:] for c in timed]
+    table = [line for line in run.stdout.splitlines() if not line.startswith("[")]
+    summary = {}
+    for line in table:
+        fields = line.split()
+        if fields and fields[0] in ports:
+            summary[fields[0]] = (fields[1], int(fields[2]))
+    check("fleet run exits 1 when a board fails", run.returncode == 1, run.returncode)
+    check("  summary: one line per board, with tries",
+          summary == {"/dev/ttyACM0": ("ok", 1), "/dev/ttyACM1": ("ok", 1),
+                      "/dev/ttyACM2": ("ok", 2), "/dev/ttyACM3": ("FAILED", 3)}, table)
+    check("  3 of 4 deployed", table[-1:] == ["3 of 4 devices deployed, 1 failed."], table)
+    retried = [line.split("]")[0][1:] for line in run.stdout.splitlines() if "retrying in 0 s" in line]
+    check("  retries: flaky once, dead twice",
+          sorted(retried) == ["/dev/ttyACM2", "/dev/ttyACM3", "/dev/ttyACM3"], retried)
+    check("  the dead board does not stop the others",
+          all("main.py" in board_files(boards[name]) for name in ("ttyACM0", "ttyACM1", "ttyACM2")),
+          {name: list(board_files(b)) for name, b in boards.items()})
+    check("  nothing sent to the FTDI adapter", not any(c[0] == "ttyUSB0" for c in calls), calls)
+    # run one at a time, no other board would be called while the slow one sleeps
+    slow = min(c[0] for c in timed if c[1] == "ttyACM1")
+    meanwhile = sorted({c[1] for c in timed if c[1] != "ttyACM1" and slow < c[0] < slow + 0.5})
+    check("  other boards deploy while the slow one works", len(meanwhile) == 3, meanwhile)
+
+
+def run(verbose=False):
+    results = []
+
+    def check(label, ok, detail=""):
+        results.append(ok)
+        print(f"{label:<48} {'ok' if ok else 'FAIL'}{'  ' + repr(detail) if verbose or not ok else ''}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_checks(check, Path(tmp))
+        run_fleet_checks(check, Path(tmp))
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show details for passing checks too.")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.verbose) else 1)
+
+
+if __name__ == "__main__":
+    main()
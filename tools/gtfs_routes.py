@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Convert GTFS-like CSV feeds for the board, and push/pull its routes.
+
+The feed is streamed through the same parser the board uses
+(route_csv.CsvRouteReader), so files of any size are read line by line.
+Repeated services (the same train/via/dest/track/timing on many trips or
+days) collapse into one route, and --match keeps only the lines that
+mention a station.
+
+Usage:
+    python3 tools/gtfs_routes.py convert feed.csv -o routes.bin [--match Köln]
+    python3 tools/gtfs_routes.py push routes.bin --host trainboard.local
+    python3 tools/gtfs_routes.py export --host trainboard.local -o routes.csv
+"""
+import argparse
+import sys
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import route_csv  # noqa: E402
+import route_store  # noqa: E402
+import timetable as tt  # noqa: E402
+
+READ_CHUNK = 64 * 1024
+
+
+def convert_feed(f, match=None, dedupe=True):
+    """Stream an open binary CSV file into a RouteTable; return (table, reader)."""
+    table = tt.RouteTable()
+    seen = set()
+    needle = match.lower() if match else None
+
+    def on_route(route):
+        if needle and not any(needle in str(route.get(k, "")).lower() for k in ("train", "via", "dest")):
+            return
+        if dedupe:
+            freq = route["frequency"]
+            key = (route.get("train", ""), route.get("via", ""), route.get("dest", ""),
+                   route.get("track", ""), freq, route["offset"] % freq)
+            if key in seen:
+                return
+            seen.add(key)
+        table.append(route)
+
+    reader = route_csv.CsvRouteReader(on_route)
+    while True:
+        chunk = f.read(READ_CHUNK)
+        if not chunk:
+            break
+        reader.feed(chunk)
+    reader.close()
+    return table, reader
+
+
+def write_routes(table, path):
+    """Write as CSV for a .csv path, else in the board's binary route format."""
+    if Path(path).suffix.lower() == ".csv":
+        with open(path, "w", encoding="utf-8", newline="") as out:
+            for line in route_csv.iter_csv(table):
+                out.write(line)
+    else:
+        with open(path, "wb") as out:
+            route_store.dump_routes(table, out)
+
+
+def push(path, host, timeout=30):
+    """Upload a .bin or .csv route file, replacing the board's routes; return its reply."""
+    data = Path(path).read_bytes()
+    if Path(path).suffix.lower() == ".csv":
+        url, ctype = f"http://{host}/api/routes.csv", "text/csv; charset=utf-8"
+    else:
+        url, ctype = f"http://{host}/api/routes.bin", "application/octet-stream"
+    req = urllib.request.Request(url, data=data, method="PUT", headers={"Content-Type": ctype})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.read().decode()
+
+
+def export(host, path, timeout=30):
+    """Download the board's routes as CSV into `path`; return the number of bytes."""
+    total = 0
+    with urllib.request.urlopen(f"http://{host}/api/routes.csv", timeout=timeout) as resp, \
+            open(path, "wb") as out:
+        while True:
+            chunk = resp.read(READ_CHUNK)
+            if not chunk:
+                break
+            out.write(chunk)
+            total += len(chunk)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert", help="Stream a CSV feed into a route file.")
+    p.add_argument("feed", help="CSV feed (our columns or GTFS names).")
+    p.add_argument("-o", "--output", default="routes.bin", help="Output .bin (default) or .csv.")
+    p.add_argument("--match", help="Keep only lines whose train/via/dest contain this text.")
+    p.add_argument("--keep-duplicates", action="store_true", help="Do not collapse repeated services.")
+
+    p = sub.add_parser("push", help="Replace the board's routes with a .bin or .csv file.")
+    p.add_argument("file")
+    p.add_argument("--host", default="trainboard.local")
+
+    p = sub.add_parser("export", help="Download the board's routes as CSV.")
+    p.add_argument("--host", default="trainboard.local")
+    p.add_argument("-o", "--output", default="routes.csv")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "convert":
+            with open(args.feed, "rb") as f:
+                table, reader = convert_feed(f, args.match, not args.keep_duplicates)
+            write_routes(table, args.output)
+            print(f"{reader.lines} lines, {reader.routes} valid, {reader.skipped} skipped"
+                  f" -> {len(table)} routes in {args.output}")
+            for line_no, message in reader.errors:
+                print(f"  line {line_no}: {message}")
+            budget = tt.compile_index(table)
+            if budget is None:
+                print("note: over the board's departure index budget; it will use the slower merge")
+        elif args.command == "push":
+            print(push(args.file, args.host))
+        else:
+            print(f"{export(args.host, args.output)} bytes -> {args.output}")
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Pure-Python stand-in for the Pimoroni `picographics` firmware module.
+
+Put tools/headless on sys.path and `from picographics import PicoGraphics`
+works on a desktop. Drawing goes into a bytearray framebuffer holding one pen
+index per pixel, and every call is counted so renderers can be profiled.
+
+Glyphs are not the real bitmap8 font: each character is a deterministic 5x8
+pattern in a 6 px cell, matching the width display_board assumes. That keeps
+pixel counts realistic and framebuffer digests stable for golden checks.
+"""
+import hashlib
+
+DISPLAY_PICO_DISPLAY = 0
+DISPLAY_PICO_DISPLAY_2 = 1
+DISPLAY_INTERSTATE75_128X64 = 2
+DISPLAY_INTERSTATE75_256X64 = 3
+
+PEN_P8 = 0
+PEN_RGB332 = 1
+PEN_RGB565 = 2
+
+_SIZES = {
+    DISPLAY_PICO_DISPLAY: (240, 135),
+    DISPLAY_PICO_DISPLAY_2: (320, 240),
+    DISPLAY_INTERSTATE75_128X64: (128, 64),
+    DISPLAY_INTERSTATE75_256X64: (256, 64),
+}
+
+GLYPH_W = 6
+GLYPH_H = 8
+
+
+def _glyph(ch):
+    """Horizontal runs (row, x0, x1) of a 5x8 glyph; blank for space."""
+    if ch == " ":
+        return ()
+    h = hashlib.md5(ch.encode()).digest()
+    runs = []
+    for gy, b in enumerate(h[:GLYPH_H]):
+        bits = b & 0x1F
+        gx = 0
+        while gx < 5:
+            if bits & (1 << gx):
+                start = gx
+                while gx < 5 and bits & (1 << gx):
+                    gx += 1
+                runs.append((gy, start, gx))
+            else:
+                gx += 1
+    return tuple(runs)
+
+
+class PicoGraphics:
+    def __init__(self, display=DISPLAY_PICO_DISPLAY_2, pen_type=PEN_RGB332, width=None, height=None,
+                 partial_update=False):
+        w, h = _SIZES.get(display, (320, 240))
+        self.width = width or w
+        self.height = height or h
+        self.fb = bytearray(self.width * self.height)
+        self.palette = [(0, 0, 0)]
+        self.pen = 0
+        self.font = "bitmap8"
+        self.clip = (0, 0, self.width, self.height)
+        self.calls = {}
+        self.pixels_touched = 0
+        self.updates = 0
+        self.partial_updates = 0
+        self.pixels_pushed = 0
+        self._glyphs = {}
+        if partial_update:
+            # only some PicoGraphics displays offer this; expose it on request
+            self.partial_update = self._partial_update
+
+    # ---------- bookkeeping ----------
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def reset_counters(self):
+        self.calls = {}
+        self.pixels_touched = 0
+        self.updates = 0
+        self.partial_updates = 0
+        self.pixels_pushed = 0
+
+    def digest(self):
+        """SHA-256 of the framebuffer plus palette, for golden-image checks."""
+        h = hashlib.sha256(bytes(self.fb))
+        for rgb in self.palette:
+            h.update(bytes(rgb))
+        return h.hexdigest()
+
+    def to_ppm(self):
+        """Return the framebuffer as a binary PPM image."""
+        out = bytearray(f"P6 {self.width} {self.height} 255\n".encode())
+        palette = self.palette
+        for p in self.fb:
+            out += bytes(palette[p])
+        return bytes(out)
+
+    # ---------- PicoGraphics API ----------
+    def get_bounds(self):
+        self._count("get_bounds")
+        return self.width, self.height
+
+    def create_pen(self, r, g, b):
+        self._count("create_pen")
+        self.palette.append((r & 0xFF, g & 0xFF, b & 0xFF))
+        return len(self.palette) - 1
+
+    def set_pen(self, pen):
+        self._count("set_pen")
+        self.pen = pen
+
+    def set_font(self, font):
+        self._count("set_font")
+        self.font = font
+
+    def set_clip(self, x, y, w, h):
+        self._count("set_clip")
+        x0 = max(0, x)
+        y0 = max(0, y)
+        self.clip = (x0, y0, min(self.width, x + w), min(self.height, y + h))
+
+    def remove_clip(self):
+        self._count("remove_clip")
+        self.clip = (0, 0, self.width, self.height)
+
+    def _span(self, x0, x1, y):
+        cx0, cy0, cx1, cy1 = self.clip
+        if y < cy0 or y >= cy1:
+            return
+        x0 = max(x0, cx0)
+        x1 = min(x1, cx1)
+        if x0 >= x1:
+            return
+        row = y * self.width
+        self.fb[row + x0:row + x1] = bytes((self.pen,)) * (x1 - x0)
+        self.pixels_touched += x1 - x0
+
+    def clear(self):
+        self._count("clear")
+        cx0, cy0, cx1, cy1 = self.clip
+        for y in range(cy0, cy1):
+            self._span(cx0, cx1, y)
+
+    def pixel(self, x, y):
+        self._count("pixel")
+        self._span(x, x + 1, y)
+
+    def pixel_span(self, x, y, length):
+        self._count("pixel_span")
+        self._span(x, x + length, y)
+
+    def rectangle(self, x, y, w, h):
+        self._count("rectangle")
+        for yy in range(y, y + h):
+            self._span(x, x + w, yy)
+
+    def line(self, x1, y1, x2, y2, thickness=1):
+        self._count("line")
+        if y1 == y2:
+            self._span(min(x1, x2), max(x1, x2) + 1, y1)
+            return
+        # Bresenham for the general case
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self._span(x1, x1 + 1, y1)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def measure_text(self, text, scale=2, spacing=1, fixed_width=False):
+        self._count("measure_text")
+        return len(text) * GLYPH_W * scale
+
+    def text(self, text, x, y, wordwrap=-1, scale=2, angle=0, spacing=1, fixed_width=False):
+        self._count("text")
+        cx = x
+        span = self._span
+        for ch in str(text):
+            runs = self._glyphs.get(ch)
+            if runs is None:
+                runs = self._glyphs[ch] = _glyph(ch)
+            for gy, x0, x1 in runs:
+                for sy in range(scale):
+                    span(cx + x0 * scale, cx + x1 * scale, y + gy * scale + sy)
+            cx += GLYPH_W * scale
+
+    def update(self):
+        self._count("update")
+        self.updates += 1
+        self.pixels_pushed += self.width * self.height
+
+    def _partial_update(self, x, y, w, h):
+        self._count("partial_update")
+        self.partial_updates += 1
+        self.pixels_pushed += max(0, w) * max(0, h)
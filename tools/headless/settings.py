@@ -0,0 +1,3 @@
+"""Stand-in for the device-only settings module holding Wi-Fi credentials."""
+SSID = "headless"
+PASS = "headless"
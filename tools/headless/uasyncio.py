@@ -0,0 +1,60 @@
+"""CPython stand-in for MicroPython's uasyncio, on top of asyncio.
+
+Adds the MicroPython-only helpers the board code uses (sleep_ms,
+wait_for_ms) and MicroPython's stream API for servers: start_server() and
+open_connection() hand out writers with awrite()/aclose(). Readers are
+asyncio's own StreamReader (readline, read, readexactly, readuntil);
+everything else is asyncio's own API.
+"""
+import asyncio as _asyncio
+from asyncio import *  # noqa: F401,F403
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+async def wait_for_ms(aw, timeout_ms):
+    return await _asyncio.wait_for(aw, timeout_ms / 1000)
+
+
+class Stream:
+    """Writer side of a MicroPython Stream over an asyncio StreamWriter."""
+
+    def __init__(self, writer):
+        self._writer = writer
+
+    def write(self, buf):
+        self._writer.write(buf)
+
+    async def drain(self):
+        await self._writer.drain()
+
+    async def awrite(self, buf, off=0, sz=-1):
+        if off or sz != -1:
+            buf = memoryview(buf)[off:None if sz == -1 else off + sz]
+        self._writer.write(buf)
+        await self._writer.drain()
+
+    async def aclose(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    def get_extra_info(self, name, default=None):
+        return self._writer.get_extra_info(name, default)
+
+
+async def start_server(callback, host, port, backlog=5):
+    """Serve `callback(reader, writer)` the way uasyncio does; returns asyncio's Server."""
+    async def accepted(reader, writer):
+        await callback(reader, Stream(writer))
+
+    return await _asyncio.start_server(accepted, host, port, backlog=backlog)
+
+
+async def open_connection(host, port):
+    reader, writer = await _asyncio.open_connection(host, port)
+    return reader, Stream(writer)
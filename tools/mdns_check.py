@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Check mdns.MdnsResponder against a loopback stand-in for the mDNS group.
+
+Real UDP sockets on 127.0.0.1 play the parts: one for the responder, one
+standing in for 224.0.0.251 (where multicast replies land), a peer on the
+"mDNS port" that sends QM/QU queries, and a legacy resolver on another
+port. Timestamps are passed in, so the rate limit and QU timing are
+checked without sleeping. Replies are decoded and checked for known-answer
+suppression, the QU bit, legacy unicast, rate limiting and name
+compression. Exits 1 if any check fails. Usage:
+    python3 tools/mdns_check.py [-v]
+"""
+import argparse
+import socket
+import sys
+import time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS.parent))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+TICKS_PERIOD = 1 << 30
+time.ticks_diff = lambda a, b: ((a - b + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+
+import mdns  # noqa: E402
+
+INSTANCE = "Trainboard"
+HOST = "trainboard.local"
+IP = bytes([192, 168, 1, 42])
+TYPE_NAMES = {mdns.TYPE_A: "A", mdns.TYPE_PTR: "PTR", mdns.TYPE_TXT: "TXT", mdns.TYPE_SRV: "SRV"}
+
+
+def _name(labels):
+    return ".".join(l.decode() for l in labels)
+
+
+def encode_name(name):
+    return b"".join(bytes([len(p)]) + p.encode() for p in name.split(".")) + b"\x00"
+
+
+def query(questions, known=(), qid=0):
+    """Query packet: questions are (name, type, unicast); known answers (name, type, ttl, rdata)."""
+    pkt = qid.to_bytes(2, "big") + b"\x00\x00" + len(questions).to_bytes(2, "big") \
+        + len(known).to_bytes(2, "big") + b"\x00\x00\x00\x00"
+    for name, qtype, unicast in questions:
+        pkt += encode_name(name) + qtype.to_bytes(2, "big") + (mdns.CLASS_IN | (mdns.QU if unicast else 0)).to_bytes(2, "big")
+    for name, rtype, ttl, rdata in known:
+        pkt += encode_name(name) + rtype.to_bytes(2, "big") + mdns.CLASS_IN.to_bytes(2, "big") \
+            + ttl.to_bytes(4, "big") + len(rdata).to_bytes(2, "big") + rdata
+    return pkt
+
+
+def decode(pkt):
+    """Return (id, questions, answers, additionals); records are (name, type, class, ttl, value)."""
+    qid = int.from_bytes(pkt[0:2], "big")
+    counts = [int.from_bytes(pkt[i:i + 2], "big") for i in (4, 6, 8, 10)]
+    off = 12
+    questions = []
+    for _ in range(counts[0]):
+        labels, off = mdns._read_name(pkt, off)
+        questions.append((_name(labels), int.from_bytes(pkt[off:off + 2], "big")))
+        off += 4
+    sections = []
+    for n in (counts[1], counts[3]):
+        records = []
+        for _ in range(n):
+            labels, off = mdns._read_name(pkt, off)
+            rtype, rclass = int.from_bytes(pkt[off:off + 2], "big"), int.from_bytes(pkt[off + 2:off + 4], "big")
+            ttl = int.from_bytes(pkt[off + 4:off + 8], "big")
+            rdlen = int.from_bytes(pkt[off + 8:off + 10], "big")
+            off += 10
+            if rtype == mdns.TYPE_PTR:
+                value = _name(mdns._read_name(pkt, off)[0])
+            elif rtype == mdns.TYPE_SRV:
+                value = (int.from_bytes(pkt[off + 4:off + 6], "big"), _name(mdns._read_name(pkt, off + 6)[0]))
+            elif rtype == mdns.TYPE_A:
+                value = ".".join(str(b) for b in pkt[off:off + 4])
+            else:
+                value = pkt[off:off + rdlen]
+            records.append((_name(labels), TYPE_NAMES.get(rtype, rtype), rclass, ttl, value))
+            off += rdlen
+        sections.append(records)
+    if off != len(pkt):
+        raise ValueError("trailing bytes")
+    return qid, questions, sections[0], sections[1]
+
+
+class StandIn:
+    def __init__(self):
+        def udp():
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.bind(("127.0.0.1", 0))
+            s.settimeout(0.2)
+            return s
+        self.server, self.group, self.peer, self.legacy = udp(), udp(), udp(), udp()
+        self.responder = mdns.MdnsResponder(
+            INSTANCE, HOST, IP, port=80, txt_kv={"path": "/"},
+            group=self.group.getsockname(), mdns_port=self.peer.getsockname()[1])
+
+    def ask(self, pkt, now, sender=None):
+        """Send a query, let the responder answer it; return {"group"/"unicast": decoded reply}."""
+        sender = sender or self.peer
+        sender.sendto(pkt, self.server.getsockname())
+        self.server.settimeout(1)
+        self.responder.receive(self.server, now)
+        replies = {}
+        for where, sock in (("group", self.group), ("unicast", sender)):
+            sock.settimeout(0.05)
+            try:
+                replies[where] = decode(sock.recvfrom(mdns.MAX_PACKET)[0])
+            except socket.timeout:
+                pass
+        return replies
+
+    def close(self):
+        for s in (self.server, self.group, self.peer, self.legacy):
+            s.close()
+
+
+def uncompressed_size(answers):
+    # the same records with every name written out in full
+    size = 12
+    for name, rtype, _c, _t, value in answers:
+        size += len(encode_name(name)) + 10
+        if rtype == "PTR":
+            size += len(encode_name(value))
+        elif rtype == "SRV":
+            size += 6 + len(encode_name(value[1]))
+        elif rtype == "A":
+            size += 4
+        else:
+            size += len(value)
+    return size
+
+
+def run(verbose=False):
+    t = StandIn()
+    svc = "_http._tcp.local"
+    inst = f"{INSTANCE}.{svc}"
+    ptr_rdata = encode_name(inst)
+    checks = []
+
+    def check(label, ok, detail=""):
+        checks.append(ok)
+        print(f"{label:<48} {'ok' if ok else 'FAIL'}{'  ' + detail if detail and (verbose or not ok) else ''}")
+
+    try:
+        ann = decode(t.responder.announcement())
+        check("announcement: PTR, SRV, TXT, A", [r[1] for r in ann[2]] == ["PTR", "SRV", "TXT", "A"],
+              repr(ann[2]))
+        size = len(t.responder.announcement())
+        check("announcement is name-compressed", size < uncompressed_size(ann[2]),
+              f"{size} bytes vs {uncompressed_size(ann[2])}")
+
+        r = t.ask(query([(svc, mdns.TYPE_PTR, False)]), now=0)
+        g = r.get("group")
+        check("PTR query -> multicast answer", g is not None and "unicast" not in r, repr(r))
+        if g:
+            check("  PTR answer, SRV/TXT/A additional",
+                  [x[1] for x in g[2]] == ["PTR"] and [x[1] for x in g[3]] == ["SRV", "TXT", "A"], repr(g))
+            check("  SRV points at host:80, A holds the address",
+                  g[3][0][4] == (80, HOST) and g[3][2][4] == "192.168.1.42", repr(g[3]))
+        check("same query within 1 s is rate-limited", not t.ask(query([(svc, mdns.TYPE_PTR, False)]), now=500))
+
+        r = t.ask(query([(svc, mdns.TYPE_PTR, False)], [(svc, mdns.TYPE_PTR, 4500, ptr_rdata)]), now=2000)
+        check("known answer with full TTL suppresses reply", not r, repr(r))
+        r = t.ask(query([(svc, mdns.TYPE_PTR, False)], [(svc, mdns.TYPE_PTR, 100, ptr_rdata)]), now=3000)
+        check("known answer below half TTL is refreshed", "group" in r, repr(r))
+        a_rdata = IP
+        r = t.ask(query([(inst, mdns.TYPE_SRV, False)], [(HOST, mdns.TYPE_A, 120, a_rdata)]), now=5000)
+        g = r.get("group")
+        check("known A dropped from SRV additionals",
+              g is not None and [x[1] for x in g[2]] == ["SRV"] and not g[3], repr(r))
+
+        r = t.ask(query([(HOST.upper(), mdns.TYPE_A, True)]), now=6000)
+        check("QU for a fresh record -> unicast, any case", "unicast" in r and "group" not in r, repr(r))
+        r = t.ask(query([(HOST, mdns.TYPE_A, True)]), now=6000 + 31000)
+        check("QU after a quarter TTL -> multicast", "group" in r and "unicast" not in r, repr(r))
+
+        r = t.ask(query([(HOST, mdns.TYPE_A, False)], qid=0x1234), now=40000, sender=t.legacy)
+        u = r.get("unicast")
+        check("legacy resolver -> unicast reply", u is not None and "group" not in r, repr(r))
+        if u:
+            check("  id echoed, question repeated",
+                  u[0] == 0x1234 and u[1] == [(HOST, mdns.TYPE_A)], repr(u))
+            check("  TTL capped, no cache-flush bit",
+                  all(x[3] <= mdns.LEGACY_TTL and x[2] == mdns.CLASS_IN for x in u[2]), repr(u[2]))
+
+        r = t.ask(query([("_services._dns-sd._udp.local", mdns.TYPE_PTR, False)]), now=50000)
+        check("service enumeration", r.get("group") and r["group"][2][0][4] == svc, repr(r))
+        check("other names are not answered", not t.ask(query([("printer.local", mdns.TYPE_A, False)]), now=60000))
+        reply = t.responder.announcement()
+        check("responses and junk are ignored",
+              not t.ask(reply, now=70000) and not t.ask(b"\x00\x01", now=70000))
+        print("stats:", t.responder.stats())
+    finally:
+        t.close()
+    return all(checks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show decoded replies for passing checks too.")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.verbose) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Run main.main() in accelerated, deterministic virtual time on CPython.
+
+The event loop never sleeps: whenever it would wait, the virtual clock jumps
+to the next timer instead. time.ticks_ms()/ticks_us() follow that clock
+(wrapping like MicroPython's 2**30 tick period), the display is the headless
+PicoGraphics, and network/settings come from tools/headless. Only the
+standalone (WEB_ADMIN=False) board is simulated.
+
+Usage:
+    python3 tools/simulate.py [--days 1] [--time-factor 60] [--marquee] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import selectors
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+ROOT = TOOLS.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(TOOLS / "headless"))
+
+TICKS_PERIOD = 1 << 30
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Selector with no real I/O: waiting for `timeout` just advances virtual time."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._map = {}
+
+    def register(self, fileobj, events, data=None):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        key = selectors.SelectorKey(fileobj, fd, events, data)
+        self._map[fd] = key
+        return key
+
+    def unregister(self, fileobj):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        return self._map.pop(fd)
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("simulation stalled: no task is waiting on a timer")
+        if timeout > 0:
+            self._loop.now += timeout
+        return []
+
+    def get_map(self):
+        return self._map
+
+    def close(self):
+        self._map.clear()
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, start=0.0):
+        self.now = start
+        super().__init__(selector=_VirtualSelector(self))
+
+    def time(self):
+        return self.now
+
+
+def install_ticks(loop, tick_offset_ms):
+    """Give the time module MicroPython's ticks API, driven by the loop's virtual clock."""
+    time.ticks_ms = lambda: (int(loop.now * 1000) + tick_offset_ms) % TICKS_PERIOD
+    time.ticks_us = lambda: (int(loop.now * 1_000_000) + tick_offset_ms * 1000) % TICKS_PERIOD
+    time.ticks_add = lambda t, delta: (t + delta) % TICKS_PERIOD
+    time.ticks_diff = lambda a, b: ((a - b + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+
+
+class Probe:
+    """Wraps a method to count calls and add up the real CPU time spent in it."""
+
+    def __init__(self, owner, name, on_call=None):
+        self.calls = 0
+        self.seconds = 0.0
+        original = getattr(owner, name)
+        probe = self
+
+        def wrapper(*args, **kwargs):
+            if on_call:
+                on_call(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                probe.seconds += time.perf_counter() - t0
+                probe.calls += 1
+
+        setattr(owner, name, wrapper)
+
+
+def simulate(days=1.0, time_factor=60.0, marquee=False, trace_memory=True, tick_offset_ms=None):
+    """Run the board for `days` simulated days and return a report dict."""
+    import config
+    config.WEB_ADMIN = False
+    config.TIME_FACTOR = time_factor
+    config.MARQUEE = marquee
+    # main.py imports the announcer under the name it is uploaded with on the board
+    import mdns
+    sys.modules.setdefault("mdns_announce", mdns)
+
+    loop = VirtualTimeLoop()
+    asyncio.set_event_loop(loop)
+    # start near the tick wraparound so long runs exercise it
+    install_ticks(loop, TICKS_PERIOD - 5000 if tick_offset_ms is None else tick_offset_ms)
+
+    import display_board
+    import marquee as marquee_mod
+    import timetable as tt
+
+    minutes_seen = []
+    probes = {
+        "timetable": Probe(tt.TimetableWindow, "advance", lambda _self, now, *a, **k: minutes_seen.append(now)),
+        "generate_timetable": Probe(tt, "generate_timetable"),
+        "render": Probe(display_board.BoardRenderer, "render"),
+        "marquee": Probe(marquee_mod.Marquee, "step"),
+    }
+
+    import main
+    day_s = 24 * 60 * 60 / time_factor
+    end = days * day_s
+
+    async def run():
+        asyncio.ensure_future(main.main())
+        await asyncio.sleep(end)
+        # stop main() and every task it spawned
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if trace_memory:
+        tracemalloc.start()
+    wall0 = time.perf_counter()
+    loop.run_until_complete(run())
+    wall = time.perf_counter() - wall0
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    loop.close()
+
+    # every virtual minute should have been looked at exactly once
+    missed = 0
+    absolute = []
+    day = 0
+    for i, m in enumerate(minutes_seen):
+        if i and m < minutes_seen[i - 1]:
+            day += 24 * 60
+        absolute.append(day + m)
+    for a, b in zip(absolute, absolute[1:]):
+        missed += max(0, b - a - 1)
+
+    display = main.display
+    return {
+        "simulated_days": days,
+        "time_factor": time_factor,
+        "wall_seconds": round(wall, 3),
+        "speedup": round(end / wall, 1) if wall else None,
+        "minute_ticks": len(minutes_seen),
+        "missed_minutes": missed,
+        "renders": probes["render"].calls,
+        "renders_per_day": round(probes["render"].calls / days, 1),
+        "display_updates": display.updates,
+        "partial_updates": display.partial_updates,
+        "timetable_ms": round(probes["timetable"].seconds * 1e3, 2),
+        "generate_timetable_calls": probes["generate_timetable"].calls,
+        "generate_timetable_ms": round(probes["generate_timetable"].seconds * 1e3, 2),
+        "render_ms": round(probes["render"].seconds * 1e3, 2),
+        "marquee_frames": probes["marquee"].calls,
+        "marquee_ms": round(probes["marquee"].seconds * 1e3, 2),
+        "peak_alloc_bytes": peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=1.0, help="Simulated days to run (default 1).")
+    parser.add_argument("--time-factor", type=float, default=60.0, help="TIME_FACTOR to simulate (default 60).")
+    parser.add_argument("--marquee", action="store_true", help="Also run the marquee animation task.")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip peak allocation tracking.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    # route_store reads/writes routes.bin in the working directory
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            report = simulate(args.days, args.time_factor, args.marquee, not args.no_tracemalloc)
+        finally:
+            os.chdir(cwd)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>26}: {value}")
+    sys.exit(1 if report["missed_minutes"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
+import json
 import os
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from shutil import which
+from tempfile import TemporaryDirectory
+
+# Content hashes of what the last deploy copied, kept on the device
+MANIFEST_NAME = ".deploy_manifest"
+
+# USB vendor id of Raspberry Pi boards, for picking Picos out of `mpremote connect list`
+RPI_USB_VID = "2e8a"
 
 
 def find_mpremote_command(project_dir: Path) -> str:
@@ -56,15 +67,26 @@ def gather_project_files(project_dir: Path, self_name: str) -> list[Path]:
     return files
 
 
-def upload_files_to_pico(files: list[Path], mpremote_cmd: str, device: str | None) -> None:
-    """Upload each file to Pico using mpremote cp <src> :<dest>."""
-    if not files:
-        print("No files to upload.")
-        return
-
+def mpremote_base(mpremote_cmd: str, device: str | None) -> list[str]:
+    """Command prefix talking to `device`, or to the board mpremote auto-detects."""
     base_cmd = [mpremote_cmd]
     if device:
-        base_cmd += ["--device", device]
+        base_cmd += ["connect", device]
+    return base_cmd
+
+
+def upload_files_to_pico(files: list[Path], mpremote_cmd: str, device: str | None, log=print,
+                         quiet: bool = False) -> int:
+    """Upload each file to Pico using mpremote cp <src> :<dest>; return how many were copied.
+
+    Raises CalledProcessError when a copy fails. With quiet, mpremote's own
+    output is captured instead of shown.
+    """
+    if not files:
+        log("No files to upload.")
+        return 0
+
+    base_cmd = mpremote_base(mpremote_cmd, device)
 
     # Soft reset first to clear state (best effort)
     try:
@@ -72,21 +94,187 @@ def upload_files_to_pico(files: list[Path], mpremote_cmd: str, device: str | Non
     except Exception:
         pass
 
+    # Drop the old manifest first: if this upload fails part way, the next
+    # --incremental run finds none and copies everything
+    subprocess.run(base_cmd + ["rm", f":{MANIFEST_NAME}"], check=False, capture_output=True)
+
     for path in files:
         dest = f":{path.name}"
         cmd = base_cmd + ["cp", str(path), dest]
-        print(f"Uploading {path.name} -> {dest} ...")
+        log(f"Uploading {path.name} -> {dest} ...")
         try:
-            subprocess.run(cmd, check=True)
+            subprocess.run(cmd, check=True, capture_output=quiet, text=True)
         except subprocess.CalledProcessError as exc:
-            print(f"ERROR uploading {path.name}: {exc}", file=sys.stderr)
-            sys.exit(exc.returncode or 1)
+            log(f"ERROR uploading {path.name}: {exc}")
+            raise
+
+    # Record what is on the device now, so the next --incremental run starts from it
+    with TemporaryDirectory() as tmp:
+        manifest = Path(tmp) / MANIFEST_NAME
+        manifest.write_text(json.dumps(build_manifest(files), sort_keys=True))
+        try:
+            subprocess.run(base_cmd + ["cp", str(manifest), f":{MANIFEST_NAME}"], check=True, capture_output=quiet,
+                           text=True)
+        except subprocess.CalledProcessError as exc:
+            log(f"ERROR writing {MANIFEST_NAME}: {exc}")
+            raise
 
     # Optionally soft reset again so new code runs immediately
     try:
-        subprocess.run(base_cmd + ["soft-reset"], check=False)
+        subprocess.run(base_cmd + ["soft-reset"], check=False, capture_output=quiet)
     except Exception:
         pass
+    return len(files)
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def build_manifest(files: list[Path]) -> dict[str, str]:
+    """Map device file name -> content hash for the given local files."""
+    return {path.name: file_hash(path) for path in files}
+
+
+def read_device_manifest(base_cmd: list[str]) -> dict[str, str]:
+    """Return the manifest left by the last deploy, or {} if there is none (or it is unreadable)."""
+    result = subprocess.run(base_cmd + ["cat", f":{MANIFEST_NAME}"], capture_output=True, text=True)
+    if result.returncode != 0:
+        return {}
+    try:
+        manifest = json.loads(result.stdout)
+    except ValueError:
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    return {str(name): str(digest) for name, digest in manifest.items()}
+
+
+def plan_incremental(files: list[Path], device: dict[str, str]) -> tuple[list[Path], list[str], dict[str, str]]:
+    """Return (files to copy, device files to remove, new manifest).
+
+    Only files a previous deploy recorded are ever removed, so data the
+    board writes itself (routes.bin) is left alone.
+    """
+    local = build_manifest(files)
+    changed = [path for path in files if device.get(path.name) != local[path.name]]
+    removed = sorted(name for name in device if name not in local)
+    return changed, removed, local
+
+
+def sync_files_to_pico(files: list[Path], mpremote_cmd: str, device: str | None, dry_run: bool = False,
+                       log=print, quiet: bool = False) -> tuple[int, int]:
+    """Copy only files whose content changed since the last deploy, and remove deleted ones.
+
+    One mpremote session reads the manifest; one chained session
+    (cp ... + rm ... + cp manifest + soft-reset) applies the changes, and
+    is skipped entirely when nothing changed. The manifest is written last,
+    so an interrupted deploy is redone on the next run. Returns (copied,
+    removed); raises CalledProcessError when the session fails.
+    """
+    base_cmd = mpremote_base(mpremote_cmd, device)
+
+    changed, removed, manifest = plan_incremental(files, read_device_manifest(base_cmd))
+    for path in changed:
+        log(f"Changed: {path.name}")
+    for name in removed:
+        log(f"Removed: {name}")
+    if not changed and not removed:
+        log("Device is up to date.")
+        return 0, 0
+    log(f"{len(changed)} to copy, {len(removed)} to remove, {len(files) - len(changed)} unchanged.")
+    if dry_run:
+        return 0, 0
+
+    with TemporaryDirectory() as tmp:
+        manifest_path = Path(tmp) / MANIFEST_NAME
+        manifest_path.write_text(json.dumps(manifest, sort_keys=True))
+        cmd = list(base_cmd)
+        if changed:
+            cmd += ["cp"] + [str(path) for path in changed] + [":", "+"]
+        if removed:
+            cmd += ["rm"] + [f":{name}" for name in removed] + ["+"]
+        cmd += ["cp", str(manifest_path), f":{MANIFEST_NAME}", "+", "soft-reset"]
+        subprocess.run(cmd, check=True, capture_output=quiet, text=True)
+    return len(changed), len(removed)
+
+
+def discover_devices(mpremote_cmd: str) -> list[str]:
+    """Serial ports of the attached Raspberry Pi boards, per `mpremote connect list`."""
+    result = subprocess.run([mpremote_cmd, "connect", "list"], check=True, capture_output=True, text=True)
+    ports = []
+    for line in result.stdout.splitlines():
+        # <port> <serial> <vid>:<pid> <manufacturer> <product>
+        fields = line.split()
+        if len(fields) >= 3 and fields[2].lower().startswith(RPI_USB_VID + ":"):
+            ports.append(fields[0])
+    return ports
+
+
+def _failure(exc: Exception) -> str:
+    # mpremote's last stderr line says more than the exit status does
+    stderr = getattr(exc, "stderr", None)
+    if isinstance(stderr, str) and stderr.strip():
+        return stderr.strip().splitlines()[-1]
+    return str(exc)
+
+
+def deploy_device(files: list[Path], mpremote_cmd: str, device: str, incremental: bool = False,
+                  dry_run: bool = False, retries: int = 2, backoff: float = 2.0) -> dict:
+    """Deploy to one board of a fleet, retrying with doubling delays; never raises.
+
+    Returns a result dict with the device, ok, attempts, seconds and a
+    one-line detail (what was copied, or why it failed).
+    """
+    def log(message):
+        print(f"[{device}] {message}", flush=True)
+
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            if incremental:
+                copied, removed = sync_files_to_pico(files, mpremote_cmd, device, dry_run, log=log, quiet=True)
+                detail = f"{copied} copied, {removed} removed"
+            else:
+                detail = f"{upload_files_to_pico(files, mpremote_cmd, device, log=log, quiet=True)} copied"
+            ok = True
+        except (subprocess.CalledProcessError, OSError) as exc:
+            detail = _failure(exc)
+            ok = False
+            if attempt <= retries:
+                delay = backoff * 2 ** (attempt - 1)
+                log(f"attempt {attempt} failed ({detail}); retrying in {delay:g} s")
+                time.sleep(delay)
+                continue
+        return {
+            "device": device,
+            "ok": ok,
+            "attempts": attempt,
+            "seconds": time.monotonic() - start,
+            "detail": detail,
+        }
+
+
+def deploy_fleet(files: list[Path], mpremote_cmd: str, devices: list[str], jobs: int = 4, **kwargs) -> list[dict]:
+    """Deploy to every device, at most `jobs` at a time; results in device order.
+
+    One failing board does not stop the others; see deploy_device() for
+    the keyword arguments.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        return list(pool.map(lambda device: deploy_device(files, mpremote_cmd, device, **kwargs), devices))
+
+
+def print_fleet_summary(results: list[dict]) -> None:
+    width = max([len("device")] + [len(r["device"]) for r in results])
+    print(f"{'device':<{width}}  result  tries     time  detail")
+    for r in results:
+        print(f"{r['device']:<{width}}  {'ok' if r['ok'] else 'FAILED':<6}  {r['attempts']:>5}"
+              f"  {r['seconds']:>6.1f} s  {r['detail']}")
+    failed = sum(1 for r in results if not r["ok"])
+    print(f"{len(results) - failed} of {len(results)} devices deployed, {failed} failed.")
 
 
 def main() -> None:
@@ -95,9 +283,34 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Upload project files to Raspberry Pi Pico (MicroPython) using mpremote.")
     parser.add_argument(
         "--device",
-        help="Serial device path for the Pico (e.g., /dev/tty.usbmodemXXXX). If omitted, mpremote auto-detects.",
+        action="append",
+        help="Serial device path for the Pico (e.g., /dev/tty.usbmodemXXXX). If omitted, mpremote auto-detects. "
+        "Repeat to deploy to several boards in parallel.",
         default=None,
     )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Deploy to every attached Raspberry Pi board, in parallel.",
+    )
+    parser.add_argument("--jobs", type=int, default=4, help="Boards deployed at once in fleet mode (default 4).")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per board in fleet mode (default 2).")
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=2.0,
+        help="Seconds before a board's first retry in fleet mode, doubling after that (default 2).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Copy only files changed since the last deploy (per the manifest on the device), in one mpremote session.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --incremental, only list what would be copied and removed.",
+    )
     args = parser.parse_args()
 
     try:
@@ -108,7 +321,32 @@ def main() -> None:
 
     self_name = Path(__file__).name
     files = gather_project_files(project_dir, self_name)
-    upload_files_to_pico(files, mpremote_cmd, args.device)
+    devices = list(args.device or [])
+    if args.all:
+        try:
+            devices += [port for port in discover_devices(mpremote_cmd) if port not in devices]
+        except (subprocess.CalledProcessError, OSError) as exc:
+            print(f"ERROR listing devices: {_failure(exc)}", file=sys.stderr)
+            sys.exit(1)
+        if not devices:
+            print("No boards found.", file=sys.stderr)
+            sys.exit(1)
+
+    if args.all or len(devices) > 1:
+        results = deploy_fleet(files, mpremote_cmd, devices, args.jobs, incremental=args.incremental,
+                               dry_run=args.dry_run, retries=args.retries, backoff=args.backoff)
+        print_fleet_summary(results)
+        sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+    device = devices[0] if devices else None
+    try:
+        if args.incremental:
+            sync_files_to_pico(files, mpremote_cmd, device, args.dry_run)
+        else:
+            upload_files_to_pico(files, mpremote_cmd, device)
+    except subprocess.CalledProcessError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(exc.returncode or 1)
     print("Done.")
 
 
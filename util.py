@@ -1,7 +1,75 @@
-def fit_text(display, s, max_px, scale=1):
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+
+class LRUCache:
+    """Size-bounded least-recently-used cache with hit/miss counters.
+
+    maxsize=0 disables caching (every lookup is a miss), which is handy for
+    before/after measurements.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        data = self._data
+        if key in data:
+            # move to the most-recent end
+            value = data.pop(key)
+            data[key] = value
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        data = self._data
+        if key in data:
+            data.pop(key)
+        elif len(data) >= self.maxsize:
+            if self.maxsize <= 0:
+                return
+            del data[next(iter(data))]
+        data[key] = value
+
+    def clear(self):
+        self._data = OrderedDict()
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+# Fitted/truncated cell text keyed by (text, pixel width, scale, font)
+TEXT_CACHE = LRUCache(128)
+
+
+def invalidate_text_cache():
+    """Drop cached text fits; call when routes or fonts change."""
+    TEXT_CACHE.clear()
+
+
+def fit_text(display, s, max_px, scale=1, font=None):
+    s = s or ""
+    key = ("fit", s, max_px, scale, font)
+    cached = TEXT_CACHE.get(key)
+    if cached is None:
+        cached = _fit_text(display, s, max_px, scale)
+        TEXT_CACHE.put(key, cached)
+    return cached
+
+
+def _fit_text(display, s, max_px, scale):
     # ASCII-safe ellipsis
     ELL = "..."
-    s = s or ""
     # Fast path
     try:
         w = display.measure_text(s, scale)
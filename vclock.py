@@ -0,0 +1,57 @@
+# Virtual clock for the board: sleeps until the next virtual-minute boundary
+import time
+import uasyncio as asyncio
+
+# the old updater polled every 200 ms; kept for the wakeup comparison in stats()
+POLL_MS = 200
+
+
+class VirtualClock:
+    """Simulated time of day running `time_factor` times faster than real time.
+
+    Starts at midnight when created. Elapsed time is accumulated from
+    ticks_diff() deltas, so it stays correct across ticks_ms() wraparound as
+    long as it is read at least once per wrap half-period (days, not
+    minutes, on MicroPython).
+    """
+
+    def __init__(self, time_factor, start_ms=None):
+        self.time_factor = time_factor
+        self._last = time.ticks_ms() if start_ms is None else start_ms
+        self._elapsed = 0
+        # instrumentation
+        self.wakeups = 0
+
+    def elapsed_ms(self):
+        now = time.ticks_ms()
+        self._elapsed += time.ticks_diff(now, self._last)
+        self._last = now
+        return self._elapsed
+
+    def current_minutes(self):
+        sim_minutes = int(self.elapsed_ms() * self.time_factor / 60000)
+        return sim_minutes % (24 * 60)
+
+    def ms_until_next_minute(self):
+        elapsed = self.elapsed_ms()
+        sim_minutes = int(elapsed * self.time_factor / 60000)
+        # first real millisecond at which the simulated minute has ticked over
+        boundary = int((sim_minutes + 1) * 60000 / self.time_factor)
+        while int(boundary * self.time_factor / 60000) <= sim_minutes:
+            boundary += 1
+        return max(0, boundary - elapsed)
+
+    async def wait(self):
+        """Sleep until the next virtual minute.
+
+        Route changes do not go through the clock: web_ui asks the RenderQueue
+        for a frame directly.
+        """
+        await asyncio.sleep_ms(self.ms_until_next_minute())
+        self.wakeups += 1
+
+    def stats(self):
+        return {
+            "wakeups": self.wakeups,
+            "polling_wakeups": self._elapsed // POLL_MS,
+        }
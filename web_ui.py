@@ -1,28 +1,94 @@
+import json
+import random
 import uasyncio as asyncio
 
 import timetable as tt
-from display_board import render_board
+from static_assets import ASSETS
+import route_store
+import route_csv
+from display_board import render_board, COLS
+from util import invalidate_text_cache
 
 
 # ---------- Minimal HTTP helpers ----------
-async def read_request(reader):
-    """Return (method, path, headers_dict, body_bytes)"""
-    # Read request line + headers
-    raw = b""
+# Persistent connections: a client may send several requests over one socket,
+# which saves a TCP handshake per page load/post on the Pico W's radio.
+MAX_CONNECTIONS = 3  # handlers running at once; the rest wait for a slot
+LISTEN_BACKLOG = 5  # queued accepts, so a burst of clients is not refused
+MAX_REQUESTS_PER_CONN = 8
+REQUEST_TIMEOUT_S = 5  # for the first request on a connection
+KEEPALIVE_TIMEOUT_S = 3  # idle wait for the next one
+MAX_HEADER_BYTES = 2048
+MAX_BODY_BYTES = 64 * 1024  # larger bodies get 413; create_handler(max_body=...) overrides
+MAX_IMPORT_BYTES = 256 * 1024  # CSV imports are parsed line by line, so they may be larger
+BODY_CHUNK = 512  # bytes pulled from the socket per read while parsing a body
+MAX_FIELD_BYTES = 512  # one encoded key=value pair of a form
+SAVE_DELAY_MS = 2000  # edits within this window share one write of routes.bin
+
+
+class Semaphore:
+    """Counting semaphore; uasyncio only ships Lock and Event."""
+
+    def __init__(self, value):
+        self.value = value
+        self.waiting = 0
+        self._event = asyncio.Event()
+
+    async def acquire(self):
+        while self.value <= 0:
+            self.waiting += 1
+            try:
+                await self._event.wait()
+            finally:
+                self.waiting -= 1
+            # every waiter wakes on set(); the losers wait for the next release
+            self._event.clear()
+        self.value -= 1
+
+    def release(self):
+        self.value += 1
+        self._event.set()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+async def read_request(reader, timeout=REQUEST_TIMEOUT_S):
+    """Return (method, path, version, headers_dict, body).
+
+    `body` is a RequestBody still waiting in the stream, so the handler can
+    refuse it or parse it piecewise. Returns None if the client closes or
+    stays silent for `timeout` seconds before the headers are complete, which
+    is how keep-alive connections normally end. Raises ValueError for
+    malformed or oversized headers.
+    """
+    size = 0
+    lines = []
     try:
-        raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 2)
-    except Exception:
-        # fallback: read whatever is there
-        chunk = await asyncio.wait_for(reader.read(1024), 1)
-        raw += chunk
-    parts = raw.split(b"\r\n\r\n", 1)
-    head = parts[0].decode("utf-8", "ignore")
-    body = parts[1] if len(parts) == 2 else b""
-
-    lines = head.split("\r\n")
+        while True:
+            ln = await asyncio.wait_for(reader.readline(), timeout)
+            if not ln.endswith(b"\n"):
+                return None  # EOF, possibly mid-headers
+            size += len(ln)
+            if size > MAX_HEADER_BYTES:
+                raise ValueError("headers too large")
+            ln = ln.rstrip(b"\r\n")
+            if not ln:
+                if lines:
+                    break
+                continue  # stray CRLF between requests
+            lines.append(ln.decode("utf-8", "ignore"))
+    except asyncio.TimeoutError:
+        return None
+
     req = lines[0].split()
-    method = req[0] if len(req) > 0 else ""
-    path = req[1] if len(req) > 1 else "/"
+    if len(req) != 3:
+        raise ValueError("bad request line")
+    method, path, version = req
     # headers
     hdrs = {}
     for ln in lines[1:]:
@@ -30,233 +96,804 @@ async def read_request(reader):
             k, v = ln.split(":", 1)
             hdrs[k.strip().lower()] = v.strip()
 
-    # read remaining body if Content-Length indicates more
-    clen = int(hdrs.get("content-length", "0") or "0")
-    if clen > len(body):
-        remaining = clen - len(body)
-        while remaining > 0:
-            chunk = await reader.read(remaining)
-            if not chunk:
-                break
-            body += chunk
-            remaining -= len(chunk)
-    return method, path, hdrs, body
-
-
-def _urldecode(s):
-    s = s.replace("+", " ")
-    out = bytearray()
-    i = 0
-    bs = s.encode() if isinstance(s, str) else s
-    while i < len(bs):
-        c = bs[i]
-        if c == 37 and i + 2 < len(bs):  # '%'
-            try:
-                out.append(int(bs[i + 1:i + 3].decode(), 16))
-                i += 3
-                continue
-            except Exception:
-                pass
-        out.append(c)
-        i += 1
+    # the body is exactly Content-Length bytes; anything after is the next request
+    if "transfer-encoding" in hdrs:
+        raise ValueError("chunked request bodies are not supported")
+    try:
+        clen = int(hdrs.get("content-length", "0") or "0")
+    except ValueError:
+        raise ValueError("bad content-length")
+    if clen < 0:
+        raise ValueError("bad content-length")
+    return method, path, version, hdrs, RequestBody(reader, clen)
+
+
+class RequestBody:
+    """The Content-Length bytes of a request, read from the stream on demand.
+
+    read()/readall() raise EOFError if the client hangs up before sending
+    all of it, and asyncio.TimeoutError if it stalls.
+    """
+
+    def __init__(self, reader, length, timeout=REQUEST_TIMEOUT_S):
+        self.reader = reader
+        self.length = length
+        self.remaining = length
+        self.timeout = timeout
+
+    async def read(self, n=BODY_CHUNK):
+        """Return up to n bytes of the body, or b"" once it is used up."""
+        if self.remaining <= 0:
+            return b""
+        data = await asyncio.wait_for(self.reader.read(min(n, self.remaining)), self.timeout)
+        if not data:
+            raise EOFError("request body cut short")
+        self.remaining -= len(data)
+        return data
+
+    async def readall(self):
+        """Rest of the body in one piece; for small bodies such as JSON."""
+        if self.remaining <= 0:
+            return b""
+        data = await asyncio.wait_for(self.reader.readexactly(self.remaining), self.timeout)
+        self.remaining = 0
+        return data
+
+    async def drain(self):
+        """Skip whatever the handler did not read, to reach the next request."""
+        while self.remaining > 0:
+            await self.read()
+
+
+def _keep_alive(version, headers):
+    conn = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return conn == "keep-alive"
+    return conn != "close"
+
+
+_HEX = b"0123456789abcdefABCDEF"
+
+
+def _unquote(b):
+    """Decode one urlencoded key or value (bytes) to str."""
+    if b"%" not in b and b"+" not in b:
+        # the common case: plain ASCII/UTF-8, nothing to rewrite
+        return b.decode("utf-8", "ignore")
+    b = b.replace(b"+", b" ")
+    parts = b.split(b"%")
+    out = bytearray(parts[0])
+    for part in parts[1:]:
+        if len(part) >= 2 and part[0] in _HEX and part[1] in _HEX:
+            out.append(int(part[:2], 16))
+            out += part[2:]
+        else:
+            # not an escape; keep the % as typed
+            out += b"%"
+            out += part
     return out.decode("utf-8", "ignore")
 
 
+class FormParser:
+    """Incremental application/x-www-form-urlencoded parser.
+
+    feed() takes the body in chunks of any size and calls on_field(key,
+    value) as each pair completes, so only the pair being parsed is held.
+    Raises ValueError if one pair is longer than max_field bytes.
+    """
+
+    def __init__(self, on_field, max_field=MAX_FIELD_BYTES):
+        self.on_field = on_field
+        self.max_field = max_field
+        self._partial = b""  # tail of the previous chunk: a pair cut in half
+        # a form repeats a handful of keys (train%5B%5D, ...); decode each once
+        self._keys = {}
+
+    def _key(self, raw):
+        key = self._keys.get(raw)
+        if key is None:
+            key = _unquote(raw)
+            if len(self._keys) < 16:
+                self._keys[raw] = key
+        return key
+
+    def _emit(self, pair):
+        if not pair:
+            return
+        eq = pair.find(b"=")
+        if eq < 0:
+            self.on_field(self._key(pair), "")
+        else:
+            self.on_field(self._key(pair[:eq]), _unquote(pair[eq + 1:]))
+
+    def feed(self, data):
+        start = 0
+        amp = data.find(b"&")
+        if amp >= 0 and self._partial:
+            self._emit(self._partial + data[:amp])
+            self._partial = b""
+            start = amp + 1
+            amp = data.find(b"&", start)
+        while amp >= 0:
+            self._emit(data[start:amp])
+            start = amp + 1
+            amp = data.find(b"&", start)
+        self._partial = self._partial + data[start:] if self._partial else data[start:]
+        if len(self._partial) > self.max_field:
+            raise ValueError("form field too long")
+
+    def close(self):
+        self._emit(self._partial)
+        self._partial = b""
+
+
 def parse_form(body_bytes):
     """Return dict[str, list[str]] supporting repeated keys like time[], train[]"""
-    qs = body_bytes.decode("utf-8", "ignore")
     out = {}
-    if not qs:
-        return out
-    for pair in qs.split("&"):
-        if not pair:
-            continue
-        if "=" in pair:
-            k, v = pair.split("=", 1)
-        else:
-            k, v = pair, ""
-            
-        k = _urldecode(k)
-        v = _urldecode(v)
-        out.setdefault(k, []).append(v)
+    parser = FormParser(lambda k, v: out.setdefault(k, []).append(v), max_field=len(body_bytes))
+    parser.feed(body_bytes)
+    parser.close()
     return out
 
 
-def http_response(status, headers, body_bytes):
+async def read_form(body, on_field, chunk_size=BODY_CHUNK):
+    """Stream a urlencoded RequestBody through a FormParser; see FormParser for errors."""
+    parser = FormParser(on_field)
+    while True:
+        chunk = await body.read(chunk_size)
+        if not chunk:
+            break
+        parser.feed(chunk)
+    parser.close()
+
+
+def http_response(status, headers, body_bytes, extra=None):
     head = [status]
     for k, v in headers.items():
         head.append(f"{k}: {v}")
+    if extra:
+        for k, v in extra.items():
+            head.append(f"{k}: {v}")
     head.append("")  # blank line
     head_joined = "\r\n".join(head).encode()
     return head_joined + b"\r\n" + body_bytes
 
 
 # ---------- HTML rendering ----------
-def render_page():
-    # Build table rows from ROUTES (backing structure)
-    def esc(x):
-        return (x or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+# The page is streamed: static head, one row per route, static tail. Nothing
+# ever holds the whole page, so GET / costs the same heap for 10 or 1000 routes.
+CHUNK_SIZE = 512
 
-    rows_html = []
-    for i, row in enumerate(tt.ROUTES):
-        rows_html.append(f"""
-<tr>
-  <td><input name="train[]"  value="{esc(row.get('train', ''))}"  required></td>
-  <td><input name="via[]"    value="{esc(row.get('via', ''))}"></td>
-  <td><input name="dest[]"   value="{esc(row.get('dest', ''))}"></td>
-  <td><input name="frequency[]"  value="{esc(str(row.get('frequency', '')))}" style="width:6em" required></td>
-  <td><input name="track[]"  value="{esc(str(row.get('track', '')))}" style="width:4em"></td>
-  <td><input name="offset[]"  value="{esc(str(row.get('offset', '')))}" style="width:6em"></td>
-  <td><button type="button" class="del">Delete</button></td>
-</tr>""")
-    rows = "\n".join(rows_html) or """
+_PAGE_HEAD = """<!doctype html><meta charset="utf-8"><title>Train Board</title>
+<link rel="stylesheet" href="/static/board.css?v=%s">
+<script src="/static/board.js?v=%s" defer></script>
+<h1>Train Board Routes</h1>
+<form method="POST" action="/save">
+  <table id="tt">
+    <thead><tr>
+      <th>Train</th><th>Via</th><th>Destination</th><th>Frequency (min)</th><th>Track</th><th>Offset (min)</th><th></th>
+    </tr></thead>
+    <tbody>
+      """ % (ASSETS["/static/board.css"][1], ASSETS["/static/board.js"][1])
+
+_EMPTY_ROW = """
 <tr>
-  <td><input name="train[]" required></td>
+  <td><input type="hidden" name="id[]"><input name="train[]" required></td>
   <td><input name="via[]"></td>
   <td><input name="dest[]"></td>
   <td><input name="frequency[]" style="width:6em" required></td>
   <td><input name="track[]" style="width:4em"></td>
+  <td><input name="offset[]" style="width:6em"></td>
   <td><button type="button" class="del">Delete</button></td>
 </tr>
 """
-    html = f"""<!doctype html><meta charset="utf-8"><title>Train Board</title>
-<style>
-  body{{font:16px/1.4 system-ui;margin:2rem;}}
-  table{{border-collapse:collapse;width:100%;max-width:900px}}
-  th,td{{border:1px solid #ccc;padding:.4rem;vertical-align:top}}
-  thead th{{background:#f5f5f5}}
-  input{{width:100%}}
-  .actions{{margin-top:1rem;display:flex;gap:1rem}}
-</style>
-<h1>Train Board Routes</h1>
-<form method="POST" action="/save">
-  <table id="tt">
-    <thead><tr>
-      <th>Train</th><th>Via</th><th>Destination</th><th>Frequency (min)</th><th>Track</th><th>Offset (min)</th><th></th>
-    </tr></thead>
-    <tbody>
-      {rows}
+
+_PAGE_TAIL = """
     </tbody>
   </table>
   <div class="actions">
     <button type="button" id="add">Add row</button>
     <button type="submit">Save</button>
   </div>
-</form>
-<script>
-  const tbody = document.querySelector('#tt tbody');
-  function mkRow() {{
-    const tr = document.createElement('tr');
-    tr.innerHTML = `
-      <td><input name="train[]" required></td>
-      <td><input name="via[]"></td>
-      <td><input name="dest[]"></td>
-      <td><input name="frequency[]" style="width:6em" required></td>
-      <td><input name="track[]" style="width:4em"></td>
-      <td><input name="offset[]" style="width:6em"></td>
-      <td><button type="button" class="del">Delete</button></td>`;
-    return tr;
-  }}
-  document.getElementById('add').addEventListener('click', () => {{
-    tbody.appendChild(mkRow());
-  }});
-  tbody.addEventListener('click', (e) => {{
-    if (e.target.classList.contains('del')) {{
-      const tr = e.target.closest('tr');
-      tr.parentNode.removeChild(tr);
-    }}
-  }});
-</script>"""
-    return html.encode()
-
-
-def create_handler(display, fg_pen, bg_pen):
-    async def handle(reader, writer):
+</form>"""
+
+
+# Live mirror of the board; static/live.js fills the table from /events
+BOARD_PAGE = ("""<!doctype html><meta charset="utf-8"><title>Train Board</title>
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<link rel="stylesheet" href="/static/board.css?v=%s">
+<script src="/static/live.js?v=%s" defer></script>
+<table id="board">
+  <thead><tr>%s</tr></thead>
+  <tbody></tbody>
+</table>""" % (ASSETS["/static/board.css"][1], ASSETS["/static/live.js"][1],
+               "".join("<th>%s</th>" % name for name, _w, _rev in COLS))).encode()
+
+
+def _esc(x):
+    return (x or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+def _route_row(row):
+    return f"""
+<tr>
+  <td><input type="hidden" name="id[]" value="{row.get('id')}"><input name="train[]"  value="{_esc(row.get('train', ''))}"  required></td>
+  <td><input name="via[]"    value="{_esc(row.get('via', ''))}"></td>
+  <td><input name="dest[]"   value="{_esc(row.get('dest', ''))}"></td>
+  <td><input name="frequency[]"  value="{_esc(str(row.get('frequency', '')))}" style="width:6em" required></td>
+  <td><input name="track[]"  value="{_esc(str(row.get('track', '')))}" style="width:4em"></td>
+  <td><input name="offset[]"  value="{_esc(str(row.get('offset', '')))}" style="width:6em"></td>
+  <td><button type="button" class="del">Delete</button></td>
+</tr>"""
+
+
+def iter_page(routes=None):
+    """Yield the admin page as str pieces, one table row at a time."""
+    if routes is None:
+        routes = tt.ROUTES
+    yield _PAGE_HEAD
+    empty = True
+    for row in routes:
+        if not empty:
+            yield "\n"
+        empty = False
+        yield _route_row(row)
+    if empty:
+        yield _EMPTY_ROW
+    yield _PAGE_TAIL
+
+
+def render_page():
+    """Whole page as bytes; GET / streams iter_page() instead."""
+    return "".join(iter_page()).encode()
+
+
+# ---------- Page cache ----------
+# The page only changes when the routes do, so small pages are kept encoded
+# until tt.ROUTES_VERSION moves on. Bigger ones are streamed every time.
+PAGE_CACHE_MAX = 8 * 1024
+
+# A fresh prefix per boot so ETags from before a reset never match
+_BOOT_ID = "%08x" % random.getrandbits(32)
+
+_page_cache = None  # (routes version, page bytes or None when too big)
+
+
+def page_etag():
+    return '"%s-%d"' % (_BOOT_ID, tt.ROUTES_VERSION)
+
+
+def cached_page():
+    """Encoded page for the current routes, or None if it exceeds PAGE_CACHE_MAX."""
+    global _page_cache
+    version = tt.ROUTES_VERSION
+    if _page_cache is not None and _page_cache[0] == version:
+        return _page_cache[1]
+    _page_cache = None
+    buf = bytearray()
+    for piece in iter_page():
+        buf += piece.encode()
+        if len(buf) > PAGE_CACHE_MAX:
+            # remember the miss so the next request goes straight to streaming
+            buf = None
+            break
+    _page_cache = (version, None if buf is None else bytes(buf))
+    return _page_cache[1]
+
+
+def _etag_matches(headers, etag):
+    inm = headers.get("if-none-match")
+    return inm is not None and (inm == "*" or etag in inm)
+
+
+async def write_chunked(writer, pieces, chunk_size=CHUNK_SIZE, framed=True):
+    """Send str pieces as an HTTP/1.1 chunked body of about chunk_size bytes per chunk.
+
+    With framed=False the same chunks go out bare, for HTTP/1.0 clients
+    whose body ends when the connection closes.
+    """
+    buf = bytearray()
+    for piece in pieces:
+        buf += piece.encode()
+        if len(buf) >= chunk_size:
+            if framed:
+                await writer.awrite(("%x\r\n" % len(buf)).encode())
+            await writer.awrite(buf)
+            if framed:
+                await writer.awrite(b"\r\n")
+            buf = bytearray()
+    if buf:
+        if framed:
+            await writer.awrite(("%x\r\n" % len(buf)).encode())
+        await writer.awrite(buf)
+        if framed:
+            await writer.awrite(b"\r\n")
+    if framed:
+        await writer.awrite(b"0\r\n\r\n")
+
+
+async def write_streamed(writer, status, headers, pieces, version, conn):
+    """Send a response of unknown length: headers, then `pieces` via write_chunked().
+
+    HTTP/1.0 has no chunked encoding, so those clients get the bare body and
+    `conn` is switched to Connection: close; the handler sees that and closes
+    the socket, which is what ends the body.
+    """
+    hdrs = dict(headers)
+    framed = version != "HTTP/1.0"
+    if framed:
+        hdrs["Transfer-Encoding"] = "chunked"
+    else:
+        conn.clear()
+        conn["Connection"] = "close"
+    await writer.awrite(http_response(status, hdrs, b"", conn))
+    await write_chunked(writer, pieces, framed=framed)
+
+
+# ---------- JSON API ----------
+_TEXT_FIELDS = ("train", "via", "dest", "track")
+
+
+def route_json(i, routes=None):
+    """Route at position i as a JSON-ready dict, id included."""
+    routes = tt.ROUTES if routes is None else routes
+    out = {"id": routes.ids[i]}
+    for key in tt._ROUTE_KEYS:
+        out[key] = routes.field(i, key)
+    return out
+
+
+def route_from_json(obj, base=None):
+    """Validate a JSON route object; fields missing from it come from `base`.
+
+    Raises ValueError with a message for the client.
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("expected a JSON object")
+    route = dict(base) if base else {"train": "", "via": "", "dest": "", "track": "", "offset": 0}
+    for key, value in obj.items():
+        if key in _TEXT_FIELDS:
+            if not isinstance(value, str):
+                raise ValueError(key + " must be a string")
+            route[key] = value.strip()
+        elif key in ("frequency", "offset"):
+            # bool is an int subclass; reject it explicitly
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(key + " must be an integer")
+            route[key] = value
+        elif key != "id":
+            raise ValueError("unknown field " + key)
+    if not 0 < route.get("frequency", 0) <= 0xFFFF:
+        raise ValueError("frequency must be 1..65535 minutes")
+    if not 0 <= route["offset"] <= 0x7FFF:
+        raise ValueError("offset must be 0..32767 minutes")
+    return route
+
+
+def _iter_routes_json():
+    # one table for the whole response, however the routes change while it streams
+    routes = tt.ROUTES.snapshot()
+    yield "["
+    for i in range(len(routes)):
+        yield ("," if i else "") + json.dumps(route_json(i, routes))
+    yield "]"
+
+
+def _json_response(status, obj, conn, extra=None):
+    body = json.dumps(obj).encode()
+    hdrs = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+    if extra:
+        hdrs.update(extra)
+    return http_response(status, hdrs, body, conn)
+
+
+_slots = Semaphore(MAX_CONNECTIONS)
+
+
+def create_handler(display, fg_pen, bg_pen, renderer=None, max_body=MAX_BODY_BYTES,
+                   max_import=MAX_IMPORT_BYTES, events=None):
+    """Return the HTTP handler.
+
+    `renderer` is the RenderQueue that owns the display; when given, saving
+    only requests a frame instead of drawing from the handler. Request bodies
+    over `max_body` bytes (`max_import` for CSV imports) are refused with 413
+    before any of it is read. `events` is the BoardBroadcaster behind
+    /events and /board; without it those pages are 404.
+    """
+    saving = []  # the pending save task, if any
+
+    async def save_soon():
+        # a dispatcher editing route by route gets one flash write per burst, not per request
+        await asyncio.sleep_ms(SAVE_DELAY_MS)
+        saving.clear()
+        try:
+            route_store.save_routes(tt.ROUTES)
+        except OSError as e:
+            print("Saving routes failed:", e)
+
+    def routes_changed():
+        # persist and redraw after any change to tt.ROUTES
+        invalidate_text_cache()
+        if not saving:
+            saving.append(asyncio.create_task(save_soon()))
+        if renderer is not None:
+            # the render task picks up the new routes at the current virtual time
+            renderer.request()
+        else:
+            # Preview from midnight; render_board pulls only the rows it shows
+            render_board(display, tt.iter_departures(tt.ROUTES, 0), fg_pen, bg_pen)
+
+    def replace_routes(routes):
+        next_id = tt.ROUTES.next_id
+        if not isinstance(routes, tt.RouteTable):
+            # new rows are numbered past every id handed out so far, deleted ones included
+            routes = tt.RouteTable(routes, next_id)
+        tt.set_routes(routes)
+        tt.ROUTES.next_id = max(tt.ROUTES.next_id, next_id)
+        routes_changed()
+
+    async def bulk(method, path, version, body, writer, conn):
+        """Whole-table transfer: /api/routes.csv (streamed) and /api/routes.bin (route_store format)."""
+        name = path.split("?", 1)[0]
+        if name not in ("/api/routes.csv", "/api/routes.bin"):
+            await writer.awrite(_json_response("HTTP/1.1 404 Not Found", {"error": "not found"}, conn))
+            return
+        if name == "/api/routes.csv" and method == "GET":
+            await write_streamed(
+                writer, "HTTP/1.1 200 OK",
+                {"Content-Type": "text/csv; charset=utf-8", "Cache-Control": "no-cache",
+                 "Content-Disposition": 'attachment; filename="routes.csv"'},
+                route_csv.iter_csv(tt.ROUTES), version, conn)
+            return
+        if method not in ("POST", "PUT"):
+            allow = "GET, POST, PUT" if name == "/api/routes.csv" else "POST, PUT"
+            await writer.awrite(_json_response(
+                "HTTP/1.1 405 Method Not Allowed", {"error": "use " + allow}, conn, {"Allow": allow}))
+            return
+        if name == "/api/routes.csv":
+            # rows go straight into a new table; ROUTES is only swapped once all parsed.
+            # Rows without an id are numbered past every id handed out so far.
+            table = tt.RouteTable((), tt.ROUTES.next_id)
+            reader = route_csv.CsvRouteReader(table.append)
+            try:
+                while True:
+                    chunk = await body.read()
+                    if not chunk:
+                        break
+                    reader.feed(chunk)
+                reader.close()
+            except ValueError as e:
+                await writer.awrite(_json_response("HTTP/1.1 400 Bad Request", {"error": str(e)}, conn))
+                return
+            summary = reader.summary()
+            if not reader.routes:
+                # an empty or wrongly shaped feed should not wipe the board
+                summary["error"] = "no valid routes"
+                await writer.awrite(_json_response("HTTP/1.1 400 Bad Request", summary, conn))
+                return
+        else:
+            table = route_store.parse_routes(await body.readall())
+            if table is None:
+                await writer.awrite(_json_response(
+                    "HTTP/1.1 400 Bad Request", {"error": "not a valid route file"}, conn))
+                return
+            summary = {"routes": len(table)}
+        replace_routes(table)
+        await writer.awrite(_json_response("HTTP/1.1 200 OK", summary, conn))
+
+    async def api(method, path, version, body, writer, conn):
+        """/api/routes and /api/routes/<id>: one route per request, JSON in and out."""
+        rest = path[len("/api/routes"):].split("?", 1)[0].strip("/")
+        if not rest:
+            if method == "GET":
+                await write_streamed(
+                    writer, "HTTP/1.1 200 OK",
+                    {"Content-Type": "application/json", "Cache-Control": "no-cache"},
+                    _iter_routes_json(), version, conn)
+                return
+            if method != "POST":
+                await writer.awrite(_json_response(
+                    "HTTP/1.1 405 Method Not Allowed", {"error": "use GET or POST"}, conn,
+                    {"Allow": "GET, POST"}))
+                return
+            try:
+                rid = tt.add_route(route_from_json(json.loads(await body.readall())))
+            except ValueError as e:
+                await writer.awrite(_json_response("HTTP/1.1 400 Bad Request", {"error": str(e)}, conn))
+                return
+            routes_changed()
+            await writer.awrite(_json_response(
+                "HTTP/1.1 201 Created", route_json(tt.ROUTES.find(rid)), conn,
+                {"Location": "/api/routes/%d" % rid}))
+            return
+
         try:
-            method, path, headers, body = await read_request(reader)
+            rid = int(rest)
+        except ValueError:
+            rid = -1
+        i = tt.ROUTES.find(rid)
+        if i < 0:
+            await writer.awrite(_json_response("HTTP/1.1 404 Not Found", {"error": "no such route"}, conn))
+            return
+        if method == "GET":
+            await writer.awrite(_json_response("HTTP/1.1 200 OK", route_json(i), conn))
+        elif method in ("PUT", "PATCH"):
+            try:
+                # PUT replaces the route, PATCH only the fields it names
+                base = route_json(i) if method == "PATCH" else None
+                tt.update_route(rid, route_from_json(json.loads(await body.readall()), base))
+            except ValueError as e:
+                await writer.awrite(_json_response("HTTP/1.1 400 Bad Request", {"error": str(e)}, conn))
+                return
+            routes_changed()
+            await writer.awrite(_json_response("HTTP/1.1 200 OK", route_json(tt.ROUTES.find(rid)), conn))
+        elif method == "DELETE":
+            tt.delete_route(rid)
+            routes_changed()
+            await writer.awrite(http_response("HTTP/1.1 204 No Content", {}, b"", conn))
+        else:
+            await writer.awrite(_json_response(
+                "HTTP/1.1 405 Method Not Allowed", {"error": "use GET, PUT, PATCH or DELETE"}, conn,
+                {"Allow": "GET, PUT, PATCH, DELETE"}))
 
-            if method == "GET" and (path == "/" or path.startswith("/index")):
-                body_bytes = render_page()
+    async def event_stream(writer, conn):
+        """Start an SSE response; return the coroutine that streams it, or None.
+
+        A refusal switches `conn` to close, so a client retrying /events does
+        not keep a handler slot for the keep-alive timeout.
+        """
+        ev = events.subscribe()
+        if ev is None:
+            conn.clear()
+            conn["Connection"] = "close"
+            await writer.awrite(http_response(
+                "HTTP/1.1 503 Service Unavailable",
+                {"Retry-After": "30", "Content-Length": "0"},
+                b"",
+                conn,
+            ))
+            return None
+        try:
+            await writer.awrite(http_response(
+                "HTTP/1.1 200 OK",
+                {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"},
+                b"retry: 5000\n\n",
+                {"Connection": "close"},
+            ))
+        except Exception:
+            events.unsubscribe(ev)
+            raise
+        return events.serve(writer, ev)
+
+    async def respond(method, path, version, headers, body, writer, conn):
+        """Answer one request; `conn` holds the Connection/Keep-Alive headers.
+
+        Returns a coroutine when the connection was handed to a long-lived
+        stream (/events), which the caller runs after releasing its slot. A
+        response that needs the connection closed after it switches `conn`
+        to Connection: close.
+        """
+        if method == "GET" and events is not None:
+            name = path.split("?", 1)[0]
+            if name == "/events":
+                return await event_stream(writer, conn)
+            if name == "/board":
+                await writer.awrite(http_response(
+                    "HTTP/1.1 200 OK",
+                    {"Content-Type": "text/html; charset=utf-8", "Cache-Control": "no-cache",
+                     "Content-Length": str(len(BOARD_PAGE))},
+                    BOARD_PAGE,
+                    conn,
+                ))
+                return
+        if path.startswith("/api/routes."):
+            await bulk(method, path, version, body, writer, conn)
+            return
+        if path == "/api/routes" or path.startswith("/api/routes/") or path.startswith("/api/routes?"):
+            await api(method, path, version, body, writer, conn)
+            return
+
+        if method == "GET" and (path == "/" or path.startswith("/index")):
+            etag = page_etag()
+            if _etag_matches(headers, etag):
+                await writer.awrite(http_response(
+                    "HTTP/1.1 304 Not Modified",
+                    {"ETag": etag},
+                    b"",
+                    conn,
+                ))
+                return
+            body_bytes = cached_page()
+            if body_bytes is not None:
                 resp = http_response(
                     "HTTP/1.1 200 OK",
                     {
                         "Content-Type": "text/html; charset=utf-8",
-                        "Connection": "close",
+                        "Cache-Control": "no-cache",
+                        "ETag": etag,
                         "Content-Length": str(len(body_bytes)),
                     },
                     body_bytes,
+                    conn,
                 )
                 await writer.awrite(resp)
-
-            elif method == "POST" and path.startswith("/save"):
-                # Parse and update routes, then regenerate timetable
-                form = parse_form(body)
-                trains = form.get("train[]", [])
-                vias = form.get("via[]", [])
-                dests = form.get("dest[]", [])
-                freqs = form.get("frequency[]", [])
-                tracks = form.get("track[]", [])
-                offsets = form.get("offset[]", [])
-                n = min(len(trains), len(vias), len(dests), len(freqs), len(tracks), len(offsets))
-                routes = []
-                for i in range(n):
-                    tr = trains[i].strip()
-                    vi = vias[i].strip()
-                    de = dests[i].strip()
-                    fr_raw = freqs[i].strip()
-                    tk = tracks[i].strip()
-                    off_raw = offsets[i].strip()
-                    if not (tr or vi or de or fr_raw):
-                        continue
-                    try:
-                        fr = int(fr_raw)
-                    except Exception:
-                        fr = 60
-                    if fr <= 0:
-                        fr = 60
-                    try:
-                        off = int(off_raw)
-                    except Exception:
-                        off = 0
-                    if off < 0:
-                        off = 0
-                    routes.append({
-                        "train": tr,
-                        "via": vi,
-                        "dest": de,
-                        "frequency": fr,
-                        "track": tk,
-                        "offset": off,
-                    })
-                # Update globals
-                tt.ROUTES = routes
-                # Regenerate a small upcoming window from midnight for preview
-                tt.TIMETABLE = tt.generate_timetable(tt.ROUTES, 0, 20)
-                render_board(display, tt.TIMETABLE, fg_pen, bg_pen)
-
-                # 303 redirect back to GET /
-                resp = http_response(
-                    "HTTP/1.1 303 See Other",
+            else:
+                # too big to keep: headers first, then the page in bounded chunks
+                await write_streamed(
+                    writer, "HTTP/1.1 200 OK",
                     {
-                        "Location": "/",
-                        "Connection": "close",
-                        "Content-Length": "0",
+                        "Content-Type": "text/html; charset=utf-8",
+                        "Cache-Control": "no-cache",
+                        "ETag": etag,
                     },
-                    b"",
-                )
-                await writer.awrite(resp)
+                    iter_page(), version, conn)
 
+        elif method == "GET" and path.split("?", 1)[0] in ASSETS:
+            ctype, etag, gz, raw = ASSETS[path.split("?", 1)[0]]
+            etag = '"%s"' % etag
+            if _etag_matches(headers, etag):
+                await writer.awrite(http_response(
+                    "HTTP/1.1 304 Not Modified",
+                    {"ETag": etag},
+                    b"",
+                    conn,
+                ))
+                return
+            hdrs = {
+                "Content-Type": ctype,
+                # the page links these with ?v=<etag>, so a new build is a new URL
+                "Cache-Control": "public, max-age=31536000, immutable",
+                "ETag": etag,
+                "Vary": "Accept-Encoding",
+            }
+            if "gzip" in headers.get("accept-encoding", ""):
+                hdrs["Content-Encoding"] = "gzip"
+                body_bytes = gz
             else:
-                # 404
-                body_bytes = b"Not Found"
-                resp = http_response(
-                    "HTTP/1.1 404 Not Found",
-                    {"Content-Type": "text/plain; charset=utf-8", "Connection": "close",
-                     "Content-Length": str(len(body_bytes))},
-                    body_bytes,
-                )
-                await writer.awrite(resp)
+                body_bytes = raw
+            hdrs["Content-Length"] = str(len(body_bytes))
+            await writer.awrite(http_response("HTTP/1.1 200 OK", hdrs, body_bytes, conn))
 
+        elif method == "POST" and path.startswith("/save"):
+            # Parse and update routes, then regenerate timetable
+            # fields are parsed as they arrive; the raw body is never held whole
+            form = {}
+            try:
+                await read_form(body, lambda k, v: form.setdefault(k, []).append(v))
+            except ValueError as e:
+                await writer.awrite(http_response(
+                    "HTTP/1.1 400 Bad Request",
+                    {"Content-Type": "text/plain; charset=utf-8", "Content-Length": str(len(str(e)))},
+                    str(e).encode(),
+                    conn,
+                ))
+                return
+            ids = form.get("id[]", [])
+            trains = form.get("train[]", [])
+            vias = form.get("via[]", [])
+            dests = form.get("dest[]", [])
+            freqs = form.get("frequency[]", [])
+            tracks = form.get("track[]", [])
+            offsets = form.get("offset[]", [])
+            n = min(len(trains), len(vias), len(dests), len(freqs), len(tracks), len(offsets))
+            if len(ids) != len(trains):
+                ids = []  # page from before ids were posted; number afresh
+            routes = []
+            for i in range(n):
+                tr = trains[i].strip()
+                vi = vias[i].strip()
+                de = dests[i].strip()
+                fr_raw = freqs[i].strip()
+                tk = tracks[i].strip()
+                off_raw = offsets[i].strip()
+                if not (tr or vi or de or fr_raw):
+                    continue
+                try:
+                    fr = int(fr_raw)
+                except Exception:
+                    fr = 60
+                if fr <= 0:
+                    fr = 60
+                try:
+                    off = int(off_raw)
+                except Exception:
+                    off = 0
+                if off < 0:
+                    off = 0
+                routes.append({
+                    "id": ids[i] if ids else "",
+                    "train": tr,
+                    "via": vi,
+                    "dest": de,
+                    "frequency": fr,
+                    "track": tk,
+                    "offset": off,
+                })
+            # Update globals and recompile the departure index; ids posted back are kept
+            replace_routes(routes)
+
+            # 303 redirect back to GET /
+            resp = http_response(
+                "HTTP/1.1 303 See Other",
+                {
+                    "Location": "/",
+                    "Content-Length": "0",
+                },
+                b"",
+                conn,
+            )
+            await writer.awrite(resp)
+
+        else:
+            # 404
+            body_bytes = b"Not Found"
+            resp = http_response(
+                "HTTP/1.1 404 Not Found",
+                {"Content-Type": "text/plain; charset=utf-8",
+                 "Content-Length": str(len(body_bytes))},
+                body_bytes,
+                conn,
+            )
+            await writer.awrite(resp)
+
+    async def handle(reader, writer):
+        stream = None
+        try:
+            async with _slots:
+                served = 0
+                while served < MAX_REQUESTS_PER_CONN:
+                    try:
+                        req = await read_request(
+                            reader, KEEPALIVE_TIMEOUT_S if served else REQUEST_TIMEOUT_S)
+                    except ValueError:
+                        await writer.awrite(http_response(
+                            "HTTP/1.1 400 Bad Request",
+                            {"Content-Length": "0"},
+                            b"",
+                            {"Connection": "close"},
+                        ))
+                        break
+                    if req is None:
+                        break
+                    served += 1
+                    method, path, version, headers, body = req
+                    # hand the slot over rather than idling on it while others wait
+                    keep = (served < MAX_REQUESTS_PER_CONN and not _slots.waiting
+                            and _keep_alive(version, headers))
+                    if keep:
+                        conn = {
+                            "Connection": "keep-alive",
+                            "Keep-Alive": "timeout=%d, max=%d" % (
+                                KEEPALIVE_TIMEOUT_S, MAX_REQUESTS_PER_CONN - served),
+                        }
+                    else:
+                        conn = {"Connection": "close"}
+                    limit = max_import if path.split("?", 1)[0] == "/api/routes.csv" else max_body
+                    if body.length > limit:
+                        # refuse before reading it; the unread body rules out reuse
+                        await writer.awrite(http_response(
+                            "HTTP/1.1 413 Payload Too Large",
+                            {"Content-Length": "0"},
+                            b"",
+                            {"Connection": "close"},
+                        ))
+                        break
+                    try:
+                        stream = await respond(method, path, version, headers, body, writer, conn)
+                        if stream is not None:
+                            break
+                        # the response may have had to give up the connection
+                        keep = keep and conn.get("Connection") != "close"
+                        if keep:
+                            await body.drain()
+                    except (EOFError, asyncio.TimeoutError):
+                        # client went away or stalled mid-body; nothing was applied
+                        break
+                    if not keep:
+                        break
+            if stream is not None:
+                # subscribers are capped by the broadcaster, not by the handler slots
+                await stream
         finally:
             try:
                 await writer.aclose()